@@ -0,0 +1,164 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+import concurrent.futures
+from typing import Dict, Union
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.append(os.getcwd())
+
+import mode_s.process as process
+from mode_s.constants import *
+from mode_s.database import Database
+from mode_s.logger import Logger
+from mode_s.synthetic import generateSQLite
+
+
+# Initialize argparse
+def init_argparse():
+    parser = argparse.ArgumentParser(
+        description="Ingest benchmark of Database.actualizeData on a synthetic local SQLite database."
+    )
+    parser.add_argument("sqlite", metavar="sqlite_path",
+                        help="The SQLite database file to benchmark against")
+    parser.add_argument("--generate", type = float,
+                        help="(Re)generate the database with this many synthetic rows first, e.g. 1e6")
+    parser.add_argument("--addresses", type = int,
+                        help="Number of distinct addresses of the generated data. (default = 2000)", default=SYNTHETIC_CONSTANTS.NUM_ADDRESSES)
+    parser.add_argument("--seed", type = int,
+                        help="Seed of the generated data, the same seed gives the same rows. (default = 2022)", default=SYNTHETIC_CONSTANTS.SEED)
+    parser.add_argument("--partitions", nargs='*', choices=DB_CONSTANTS.PARTITION_MODES,
+                        help="The partition settings to compare. (default = all)", default=DB_CONSTANTS.PARTITION_MODES)
+    parser.add_argument("--result-format", choices=DB_CONSTANTS.FORMATS,
+                        help="In-memory format of the fetched data. (default = rows)", default=DB_CONSTANTS.FORMAT_ROWS)
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream query results from the database workers in chunks.", default=False)
+    parser.add_argument("--fused-fetch", action="store_true",
+                        help="Fetch bar/ivv and location rows in a single pass.", default=False)
+    parser.add_argument("-l", "--limit", type = int,
+                        help="The query row limit. (default = 500000)", default=500000)
+    parser.add_argument("-dl", "--duration-limit", type = float,
+                        help="Only fetch the last minutes of the data. If not set, the whole table is fetched")
+    parser.add_argument("-v", "--verbose",
+                        action="store_true", help="Print the log of the benchmarked runs", default=False)
+    parser.add_argument("--result-path",
+                        help=argparse.SUPPRESS)
+    return parser
+
+
+def peakRSS() -> Dict[str, float]:
+    # In MiB, ru_maxrss is in KiB on Linux and in Bytes on macOS
+    if resource is None:
+        return {"main": float("nan"), "workers": float("nan")}
+    scale = 1024**2 if sys.platform == "darwin" else 1024
+    return {
+        "main": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        "workers": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
+
+
+def runSingle(args) -> Dict[str, Union[str, float, int]]:
+    logger = Logger(args.verbose, args.verbose, False)
+    db_login = {
+        "backend": DB_CONSTANTS.BACKEND_SQLITE,
+        "db_name": args.sqlite,
+        "table_name": SYNTHETIC_CONSTANTS.TABLE_NAME,
+    }
+
+    streamChannel = process.streamChannel()
+    processPoolExecutor = concurrent.futures.ProcessPoolExecutor(
+        max_workers=multiprocessing.cpu_count() + 1,
+        initializer=process.initWorker,
+        initargs=(db_login, *streamChannel)
+    )
+
+    db = Database(logger=logger)
+    db.setLogin(**db_login)
+    db.setStatisticsStrategy(DB_CONSTANTS.STATS_EXACT, 0)
+    db.setProcessExecutor(processPoolExecutor, db_login, streamChannel)
+
+    startTime = time.perf_counter()
+    dbWorking = db.start()
+    db.setDatabaseParameters(limit=args.limit, partition=args.partitions[0], result_format=args.result_format, stream=args.stream,
+                             fused_fetch=args.fused_fetch, duration_limit=args.duration_limit, no_cache=True)
+    fetchTime = time.perf_counter()
+    if dbWorking:
+        dbWorking = db.actualizeData()
+    endTime = time.perf_counter()
+
+    rows = len(db.getData()) if dbWorking else 0
+    processPoolExecutor.shutdown(wait=True)
+    rss = peakRSS()
+    return {
+        "partition": args.partitions[0],
+        "ok": bool(dbWorking),
+        "rows": rows,
+        "wall": endTime - startTime,
+        "fetch": endTime - fetchTime,
+        "rowsPerSecond": rows / (endTime - fetchTime) if endTime > fetchTime else 0,
+        "rssMain": rss["main"],
+        "rssWorkers": rss["workers"],
+    }
+
+
+def runAll(args) -> bool:
+    # Every setting runs in a fresh process, otherwise the peak RSS of one setting would hide the next
+    results = []
+    for partition in args.partitions:
+        with tempfile.TemporaryDirectory() as tempDir:
+            resultPath = os.path.join(tempDir, "result.json")
+            command = [sys.executable, os.path.abspath(__file__), args.sqlite, "--partitions", partition, "--result-format", args.result_format,
+                       "--limit", str(args.limit), "--result-path", resultPath]
+            if args.stream:
+                command.append("--stream")
+            if args.fused_fetch:
+                command.append("--fused-fetch")
+            if args.duration_limit:
+                command += ["--duration-limit", str(args.duration_limit)]
+            if args.verbose:
+                command.append("--verbose")
+            subprocess.run(command)
+            if not os.path.exists(resultPath):
+                print("Benchmark of partition", partition, "failed")
+                continue
+            with open(resultPath, "r") as resultFile:
+                results.append(json.load(resultFile))
+
+    print()
+    print(f"{'partition':<10} {'rows':>12} {'wall [s]':>10} {'fetch [s]':>10} {'rows/s':>12} {'RSS main [MiB]':>15} {'RSS worker [MiB]':>17}")
+    for result in results:
+        print(f"{result['partition']:<10} {result['rows']:>12} {result['wall']:>10.2f} {result['fetch']:>10.2f} {result['rowsPerSecond']:>12.0f}"
+              f" {result['rssMain']:>15.1f} {result['rssWorkers']:>17.1f}" + ("" if result["ok"] else "  (failed)"))
+    return len(results) == len(args.partitions) and all(result["ok"] for result in results)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    args = init_argparse().parse_args()
+
+    if args.result_path:
+        with open(args.result_path, "w") as resultFile:
+            json.dump(runSingle(args), resultFile)
+        sys.exit(0)
+
+    if args.generate:
+        rows = int(args.generate)
+        startTime = time.perf_counter()
+        generateSQLite(args.sqlite, rows, SYNTHETIC_CONSTANTS.TABLE_NAME, Database.validDBColumns["column_bar"], Database.validDBColumns["column_ivv"],
+                       seed=args.seed, numAddresses=args.addresses,
+                       progress=lambda written, total: print(f"\rGenerated {written}/{total} rows", end="", flush=True))
+        print(f"\nGenerated {rows} rows in {time.perf_counter() - startTime:.1f} s into {args.sqlite}")
+    elif not os.path.exists(args.sqlite):
+        print("No database at", args.sqlite, "use --generate to create one")
+        sys.exit(-1)
+
+    sys.exit(0 if runAll(args) else -1)
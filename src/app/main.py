@@ -8,11 +8,12 @@ from PySide2.QtQml import QQmlApplicationEngine, QQmlDebuggingEnabler
 from PySide2.QtWidgets import QApplication
 from PySide2.QtGui import QIcon
 from PySide2.QtCore import *
-from typing import Dict, NamedTuple, Union
+from typing import Dict, List, NamedTuple, Union
 
 sys.path.append(os.getcwd())
 
 import mode_s.engine as ModeSEngine
+import mode_s.process as process
 from mode_s.constants import *
 from mode_s.database import Database
 from mode_s.logger import Logger
@@ -34,6 +35,18 @@ def init_argparse():
                         action="store_true", help="Whether the app should run only on debug mode", default=False)
     parser.add_argument("--local",
                         action="store_true", help="Whether the app should should connect to local database", default=False)
+    parser.add_argument("--sqlite", metavar="sqlite_path",
+                        help="Read from this local SQLite database file instead of the MySQL server. The table has the same name and columns as on the server")
+    parser.add_argument("--table-pattern", metavar="table_pattern",
+                        help="Read from date partitioned tables named after this strftime pattern, e.g. 'tbl_mode_s_%%Y%%m%%d'. Only the partitions overlapping the duration limit are scanned")
+    parser.add_argument("--replicas", nargs='*', metavar="endpoint",
+                        help="Read replicas to distribute the sub queries over, weighted by their measured throughput. 'host[:port]' for MySQL, a database file path with --sqlite", default=[])
+    parser.add_argument("--snapshot", metavar="snapshot_path",
+                        help="Import the filtered table slice into this SQLite database file and exit. Identifications are copied as stored, without the registry. Only used in terminal mode")
+    parser.add_argument("--stats", choices=DB_CONSTANTS.STATS_STRATEGIES,
+                        help="How the table row count is determined at start: 'exact' counts all rows, 'estimate' reads information_schema, 'id_range' uses MIN/MAX(id). (default = id_range)", default=DB_CONSTANTS.STATS_ID_RANGE)
+    parser.add_argument("--stats-ttl", type = float,
+                        help="Seconds the table statistics are reused from the local cache. 0 disables the cache. (default = 600)", default=DB_CONSTANTS.STATS_TTL)
     parser.add_argument("-la", "--latitude-minimal", metavar="latitude_minimal",
                         help="The desired minimal latitude. If not set, all available latitudes are evaluated")
     parser.add_argument("-LA", "--latitude-maximal",
@@ -50,6 +63,38 @@ def init_argparse():
                         help="The desired maximal id. If not set, all available ids are evaluated")
     parser.add_argument("-l", "--limit", type = int,
                         help="The desired limit for the mysql commands. (default = 500000)", default=500000)
+    parser.add_argument("--partition", choices=DB_CONSTANTS.PARTITION_MODES,
+                        help="How a query is split into sub queries. 'offset' pages with LIMIT/OFFSET, 'keyset' scans disjoint id ranges, 'address' shards complete tracks by MOD(address, n). (default = offset)", default=DB_CONSTANTS.PARTITION_OFFSET)
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream query results from the database workers in chunks instead of returning them at once.", default=False)
+    parser.add_argument("--result-format", choices=DB_CONSTANTS.FORMATS,
+                        help="In-memory format of the fetched data. 'columns' decodes rows directly into typed numpy arrays. (default = rows)", default=DB_CONSTANTS.FORMAT_ROWS)
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only pull rows newer than the last fetch when the filter did not change and merge them into the data set.", default=False)
+    parser.add_argument("--trim-window", type = float,
+                        help="Drop rows older than this many minutes from the data set after each sync. If not set, nothing is dropped")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not read or write the local query result cache.", default=False)
+    parser.add_argument("--fused-fetch", action="store_true",
+                        help="Fetch bar/ivv and location rows in a single pass over the table instead of two.", default=False)
+    parser.add_argument("--address-join", action="store_true",
+                        help="Load the used addresses into a temporary table once per worker connection and join against it instead of inlining address lists.", default=False)
+    parser.add_argument("--ident-join", action="store_true",
+                        help="Load the identification registry into a temporary table once per worker connection and join it in SQL instead of patching rows in the database workers.", default=False)
+    parser.add_argument("--aggregate-windows", action="store_true",
+                        help="Let the database compute per minute COUNT/SUM/SUM of squares of bar and ivv instead of transferring raw bar/ivv rows. Window std values are rebuilt from them without median filter.", default=False)
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Size and spread the sub queries of a fetch from the rows/s and latency measured on previous fetches.", default=False)
+    parser.add_argument("--resumable", action="store_true",
+                        help="Checkpoint every finished sub query unit to disk, an interrupted or failed fetch resumes from the finished units.", default=False)
+    parser.add_argument("--retries", type = int,
+                        help="How often failed or timed out sub query units are retried with exponential backoff. (default = 3)", default=DB_CONSTANTS.FETCH_RETRIES)
+    parser.add_argument("--fetch-timeout", type = float,
+                        help="Seconds after which unfinished sub query units of an attempt count as failed. If not set, there is no timeout")
+    parser.add_argument("--statement-timeout", type = float,
+                        help="Seconds after which the database server aborts a single sub query statement (MAX_EXECUTION_TIME). The unit is then retried. If not set, there is no timeout")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Once most sub query units finished, issue stragglers again on another connection and keep whichever copy finishes first.", default=False)
     parser.add_argument("-dl", "--duration-limit", type = float,
                         help="The desired flight duration limit in minutes for the analysis. (default = 10)", default=10)
     parser.add_argument("-n", "--median-n", type = int,
@@ -77,6 +122,16 @@ def getAllArgs(args: NamedTuple) -> Dict[str, str]:
             params[key] = userInput
     return params
 
+def getReplicas(endpoints: List[str], backend: str) -> List[Dict[str, Union[str, int]]]:
+    replicas = []
+    for endpoint in endpoints:
+        if backend == DB_CONSTANTS.BACKEND_SQLITE:
+            replicas.append({"db_name": endpoint})
+            continue
+        host, _, port = endpoint.partition(":")
+        replicas.append({"host_name": host, "db_port": int(port)} if port.isdigit() else {"host_name": host})
+    return replicas
+
 def qt_message_handler(mode, context, message):
     if mode == QtMsgType.QtInfoMsg:
         logger.info(message)
@@ -134,6 +189,16 @@ if __name__ == "__main__":
             "column_ivv": "inertial_vertical_velocity"
         }
 
+    if args.sqlite:
+        db_login["backend"] = DB_CONSTANTS.BACKEND_SQLITE
+        db_login["db_name"] = args.sqlite
+
+    if args.table_pattern:
+        db_login["table_pattern"] = args.table_pattern
+
+    if args.replicas:
+        db_login["replicas"] = getReplicas(args.replicas, db_login.get("backend"))
+
     if db_login["db_port"] is not None and isinstance(db_login["db_port"], str) and db_login["db_port"].isdigit():
         db_login["db_port"] = int(db_login["db_port"])
     else:
@@ -148,18 +213,22 @@ if __name__ == "__main__":
         "Framework for automatic Mode-S data transfer & turbulence prediction")
     logger.debug(args)
 
+    streamChannel = process.streamChannel()
     processPoolExecutor = concurrent.futures.ProcessPoolExecutor(
-        max_workers=multiprocessing.cpu_count() + 1
+        max_workers=multiprocessing.cpu_count() + 1,
+        initializer=process.initWorker,
+        initargs=(db_login, *streamChannel)
     )
 
     db = Database(logger=logger)
     db.setLogin(**db_login)
     if db_column_names:
         db.setValidDBColumnsNames(**db_column_names)
+    db.setStatisticsStrategy(args.stats, args.stats_ttl)
 
     modeSEngine = ModeSEngine.Engine(logger=logger)
 
-    db.setProcessExecutor(processPoolExecutor)
+    db.setProcessExecutor(processPoolExecutor, db_login, streamChannel)
     modeSEngine.setProcessExecutor(processPoolExecutor)
 
     qInstallMessageHandler(qt_message_handler)
@@ -182,11 +251,14 @@ if __name__ == "__main__":
     else:
         dbWorking = db.start()
         db.setDatabaseParameters(**dict(args._get_kwargs()))
+        if args.snapshot:
+            sys.exit(0 if dbWorking and db.snapshot(args.snapshot) else -1)
         if dbWorking:
             dbWorking = db.actualizeData()
         if not dbWorking:
             sys.exit(-1)
         modeSEngine.setDataSet(db.getData())
+        modeSEngine.setWindowAggregates(db.getWindowAggregates())
         modeSEngine.activatePlot(plots=args.plots)
         modeSEngine.setEngineParameters(
             plotAddresses=args.plot_addresses, plotAll=args.plot_all, medianN=args.median_n)
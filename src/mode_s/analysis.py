@@ -73,8 +73,8 @@ class Analysis:
             time = list(map(lambda el: el/60, [point.time for point in plotData[index]["points"]]))
             bar = [point.bar for point in plotData[index]["points"]]
             ivv = [point.ivv for point in plotData[index]["points"]]
-            filteredBar = [float(point.bar) for point in plotData[index]["filteredPoints"]]
-            filteredIvv = [float(point.ivv) for point in plotData[index]["filteredPoints"]]
+            filteredBar = plotData[index]["filteredBars"].tolist()
+            filteredIvv = plotData[index]["filteredIvvs"].tolist()
 
             addressSeries["points"][0]["raw"] = bar
             addressSeries["points"][0]["filtered"] = filteredBar
@@ -0,0 +1,241 @@
+import os
+import abc
+import time
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+from mode_s.constants import DB_CONSTANTS, QUERY
+
+
+class Backend(abc.ABC):
+
+    NAME: str = None
+
+    @abc.abstractmethod
+    def connect(self, login: Dict[str, str]) -> Any:
+        pass
+
+    @abc.abstractmethod
+    def isConnected(self, connection: Any) -> bool:
+        pass
+
+    @abc.abstractmethod
+    def reconnect(self, connection: Any) -> None:
+        pass
+
+    def cursor(self, connection: Any) -> Any:
+        return connection.cursor()
+
+    def preparedCursor(self, connection: Any) -> Any:
+        return connection.cursor()
+
+    def streamingCursor(self, connection: Any) -> Any:
+        return connection.cursor()
+
+    def statement(self, statement: str) -> str:
+        # Generated statements use the %s placeholder, every backend maps it to its own parameter style
+        return statement
+
+    def modulo(self, expression: str) -> str:
+        return f"MOD({expression}, %s)"
+
+    def secondsBetween(self, start: str, end: str) -> str:
+        return f"(TIMESTAMPDIFF(MICROSECOND, {start}, {end}) / 1000000)"
+
+    def ceiling(self, expression: str) -> str:
+        return f"CEIL({expression})"
+
+    def columnNames(self, cursor: Any) -> List[str]:
+        return [column[0] for column in cursor.description]
+
+    def tableNames(self, login: Dict[str, str]) -> QUERY:
+        return QUERY("SELECT TABLE_NAME AS name FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s", (login.get("db_name"),))
+
+    @abc.abstractmethod
+    def setStatementTimeout(self, connection: Any, timeout: Union[float, None]) -> None:
+        # Called before every statement, the server aborts statements running longer than timeout seconds
+        pass
+
+    @abc.abstractmethod
+    def loadUsedAddresses(self, connection: Any, addresses: List[int]) -> None:
+        pass
+
+    @abc.abstractmethod
+    def loadKnownIdents(self, connection: Any, idents: List[Tuple[int, str]]) -> None:
+        pass
+
+
+class MySQLBackend(Backend):
+
+    NAME: str = DB_CONSTANTS.BACKEND_MYSQL
+
+    def __init__(self):
+        self.sessionTimeout: Union[float, None] = None
+
+    def connect(self, login: Dict[str, str]) -> "MySQLConnection":
+        # Imported here, the SQLite backend works without the MySQL driver installed
+        from mysql.connector.connection import MySQLConnection
+
+        self.sessionTimeout = None
+        return MySQLConnection(
+            user=login.get("user_name"),
+            password=login.get("password"),
+            host=login.get("host_name", "127.0.0.1"),
+            port=login.get("db_port", 3306),
+            database=login.get("db_name")
+        )
+
+    def isConnected(self, connection: "MySQLConnection") -> bool:
+        return connection.is_connected()
+
+    def reconnect(self, connection: "MySQLConnection") -> None:
+        self.sessionTimeout = None
+        connection.reconnect(attempts=DB_CONSTANTS.RECONNECT_ATTEMPTS, delay=DB_CONSTANTS.RECONNECT_DELAY)
+
+    def preparedCursor(self, connection: "MySQLConnection") -> Any:
+        return connection.cursor(prepared=True)
+
+    def streamingCursor(self, connection: "MySQLConnection") -> Any:
+        return connection.cursor(buffered=False)
+
+    def columnNames(self, cursor: Any) -> List[str]:
+        return list(cursor.column_names)
+
+    def setStatementTimeout(self, connection: "MySQLConnection", timeout: Union[float, None]) -> None:
+        # MAX_EXECUTION_TIME applies to every SELECT of the session, only sent again when it changes
+        if timeout == self.sessionTimeout:
+            return
+        q = connection.cursor()
+        q.execute("SET SESSION MAX_EXECUTION_TIME = %s", (int(timeout * 1000) if timeout else 0,))
+        q.close()
+        self.sessionTimeout = timeout
+
+    def loadUsedAddresses(self, connection: "MySQLConnection", addresses: List[int]) -> None:
+        q = connection.cursor()
+        q.execute(f"CREATE TEMPORARY TABLE IF NOT EXISTS {DB_CONSTANTS.USED_ADDRESS_TABLE} (address INT UNSIGNED NOT NULL PRIMARY KEY) ENGINE=MEMORY")
+        q.execute(f"TRUNCATE TABLE {DB_CONSTANTS.USED_ADDRESS_TABLE}")
+        for index in range(0, len(addresses), DB_CONSTANTS.USED_ADDRESS_INSERT_SIZE):
+            partialAddresses = addresses[index: index + DB_CONSTANTS.USED_ADDRESS_INSERT_SIZE]
+            q.execute(f"INSERT IGNORE INTO {DB_CONSTANTS.USED_ADDRESS_TABLE} (address) VALUES " + ",".join(f"({int(address)})" for address in partialAddresses))
+        q.close()
+        connection.commit()
+
+    def loadKnownIdents(self, connection: "MySQLConnection", idents: List[Tuple[int, str]]) -> None:
+        q = connection.cursor()
+        q.execute(f"CREATE TEMPORARY TABLE IF NOT EXISTS {DB_CONSTANTS.IDENT_TABLE} (identAddress INT UNSIGNED NOT NULL PRIMARY KEY, identification VARCHAR(32) NOT NULL) ENGINE=MEMORY")
+        q.execute(f"TRUNCATE TABLE {DB_CONSTANTS.IDENT_TABLE}")
+        for index in range(0, len(idents), DB_CONSTANTS.IDENT_INSERT_SIZE):
+            q.executemany(f"INSERT IGNORE INTO {DB_CONSTANTS.IDENT_TABLE} (identAddress, identification) VALUES (%s, %s)", idents[index: index + DB_CONSTANTS.IDENT_INSERT_SIZE])
+        q.close()
+        connection.commit()
+
+
+class SQLiteBackend(Backend):
+
+    NAME: str = DB_CONSTANTS.BACKEND_SQLITE
+
+    def connect(self, login: Dict[str, str]) -> sqlite3.Connection:
+        # db_name is the path of the database file, TIMESTAMP columns come back as datetime like with MySQL
+        if not os.path.exists(login.get("db_name") or ""):
+            raise ConnectionError("SQLite database " + str(login.get("db_name")) + " does not exist.")
+        return sqlite3.connect(login["db_name"], detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+
+    def isConnected(self, connection: sqlite3.Connection) -> bool:
+        try:
+            connection.total_changes
+        except sqlite3.ProgrammingError:
+            return False
+        return True
+
+    def reconnect(self, connection: sqlite3.Connection) -> None:
+        pass
+
+    def statement(self, statement: str) -> str:
+        return statement.replace("%s", "?")
+
+    def modulo(self, expression: str) -> str:
+        return f"({expression} % %s)"
+
+    def secondsBetween(self, start: str, end: str) -> str:
+        return f"ROUND((julianday({end}) - julianday({start})) * 86400.0, 3)"
+
+    def ceiling(self, expression: str) -> str:
+        # No CEIL without the math extension, only used on non negative values
+        return f"(CAST({expression} AS INTEGER) + ({expression} > CAST({expression} AS INTEGER)))"
+
+    def tableNames(self, login: Dict[str, str]) -> QUERY:
+        return QUERY("SELECT name FROM sqlite_master WHERE type = 'table'", ())
+
+    def setStatementTimeout(self, connection: sqlite3.Connection, timeout: Union[float, None]) -> None:
+        # The progress handler interrupts the running statement (including fetching its rows) once the deadline passed
+        if not timeout:
+            connection.set_progress_handler(None, 0)
+            return
+        deadline = time.perf_counter() + timeout
+        connection.set_progress_handler(lambda: time.perf_counter() > deadline, DB_CONSTANTS.SQLITE_PROGRESS_STEPS)
+
+    def loadUsedAddresses(self, connection: sqlite3.Connection, addresses: List[int]) -> None:
+        q = connection.cursor()
+        q.execute(f"CREATE TEMP TABLE IF NOT EXISTS {DB_CONSTANTS.USED_ADDRESS_TABLE} (address INTEGER NOT NULL PRIMARY KEY)")
+        q.execute(f"DELETE FROM {DB_CONSTANTS.USED_ADDRESS_TABLE}")
+        q.executemany(f"INSERT OR IGNORE INTO {DB_CONSTANTS.USED_ADDRESS_TABLE} (address) VALUES (?)", ((int(address),) for address in addresses))
+        q.close()
+        connection.commit()
+
+    def loadKnownIdents(self, connection: sqlite3.Connection, idents: List[Tuple[int, str]]) -> None:
+        q = connection.cursor()
+        q.execute(f"CREATE TEMP TABLE IF NOT EXISTS {DB_CONSTANTS.IDENT_TABLE} (identAddress INTEGER NOT NULL PRIMARY KEY, identification TEXT NOT NULL)")
+        q.execute(f"DELETE FROM {DB_CONSTANTS.IDENT_TABLE}")
+        q.executemany(f"INSERT OR IGNORE INTO {DB_CONSTANTS.IDENT_TABLE} (identAddress, identification) VALUES (?, ?)", idents)
+        q.close()
+        connection.commit()
+
+    def createTable(self, connection: sqlite3.Connection, tableName: str, columnBar: str, columnIvv: str) -> None:
+        q = connection.cursor()
+        q.execute(f"""CREATE TABLE IF NOT EXISTS {tableName} (
+            id INTEGER PRIMARY KEY,
+            identification TEXT,
+            address INTEGER NOT NULL,
+            timestamp TIMESTAMP NOT NULL,
+            latitude REAL,
+            longitude REAL,
+            {columnBar} REAL,
+            {columnIvv} REAL)""")
+        q.execute(f"CREATE INDEX IF NOT EXISTS idx_{tableName}_address_timestamp ON {tableName} (address, timestamp)")
+        q.execute(f"CREATE INDEX IF NOT EXISTS idx_{tableName}_timestamp ON {tableName} (timestamp)")
+        q.close()
+        connection.commit()
+
+    def importRows(self, path: str, tableName: str, columnBar: str, columnIvv: str, rows: Sequence[Dict[str, Union[int, float, str]]]) -> int:
+        connection = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES)
+        try:
+            self.createTable(connection, tableName, columnBar, columnIvv)
+            q = connection.cursor()
+            q.executemany(
+                f"INSERT INTO {tableName} (identification, address, timestamp, latitude, longitude, {columnBar}, {columnIvv}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((self.__identification(row.get("identification")), row["address"], self.__timestamp(row["timestamp"]),
+                  row.get("latitude"), row.get("longitude"), row.get("bar"), row.get("ivv")) for row in rows)
+            )
+            importedRows = q.rowcount
+            q.close()
+            connection.commit()
+        finally:
+            connection.close()
+        return importedRows
+
+    def __identification(self, identification: Union[str, None]) -> Union[str, None]:
+        return None if identification == DB_CONSTANTS.NO_IDENTIFICATION else identification
+
+    def __timestamp(self, timestamp: int) -> str:
+        # Rows carry local time nanoseconds (QDateTime), stored back as the local wall clock time MySQL returned
+        return datetime.fromtimestamp(timestamp / 10**9).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def getBackend(login: Dict[str, str]) -> Backend:
+    backendName = login.get("backend") or DB_CONSTANTS.BACKEND_MYSQL
+    if backendName == DB_CONSTANTS.BACKEND_SQLITE:
+        return SQLiteBackend()
+    if backendName == DB_CONSTANTS.BACKEND_MYSQL:
+        return MySQLBackend()
+    raise ConnectionError("Unknown database backend " + str(backendName))
@@ -0,0 +1,176 @@
+import numpy as np
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Sequence, Tuple, Union
+
+from mode_s.constants import DB_CONSTANTS
+
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class ColumnBatch:
+
+    DTYPES: Dict[str, type] = {
+        "address": np.int64,
+        "timestamp": np.int64,  # in Nanoseconds since epoch
+        "bar": np.float32,
+        "ivv": np.float32,
+        "latitude": np.float64,
+        "longitude": np.float64,
+        "id": np.int64,  # only fetched by the incremental sync
+    }
+
+    OFFSET_STEP_MSECS: int = 15 * 60 * 1000
+
+    def __init__(self, columns: Dict[str, np.ndarray] = {}, valid: Dict[str, np.ndarray] = {}, identifications: Dict[int, str] = {}):
+        size = len(next(iter(columns.values()))) if columns else 0
+        self.columns: Dict[str, np.ndarray] = {}
+        self.valid: Dict[str, np.ndarray] = {}
+        self.identifications: Dict[int, str] = dict(identifications)
+
+        for column, dtype in ColumnBatch.DTYPES.items():
+            if column in columns:
+                self.columns[column] = np.asarray(columns[column], dtype=dtype)
+                if column in valid:
+                    self.valid[column] = np.asarray(valid[column], dtype=bool)
+                elif np.issubdtype(dtype, np.floating):
+                    self.valid[column] = ~np.isnan(self.columns[column])
+                else:
+                    self.valid[column] = np.ones(size, dtype=bool)
+            else:
+                self.columns[column] = np.full(size, np.nan if np.issubdtype(dtype, np.floating) else 0, dtype=dtype)
+                self.valid[column] = np.zeros(size, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.columns["address"])
+
+    def __getitem__(self, index: int) -> Dict[str, Union[int, float, str]]:
+        return self.row(index)
+
+    def __iter__(self) -> Iterator[Dict[str, Union[int, float, str]]]:
+        for index in range(len(self)):
+            yield self.row(index)
+
+    def row(self, index: int) -> Dict[str, Union[int, float, str]]:
+        address = int(self.columns["address"][index])
+        entry = {"identification": self.identifications.get(address, DB_CONSTANTS.NO_IDENTIFICATION)}
+        for column, values in self.columns.items():
+            if not self.valid[column][index]:
+                entry[column] = None
+            elif np.issubdtype(values.dtype, np.floating):
+                entry[column] = float(values[index])
+            else:
+                entry[column] = int(values[index])
+        return entry
+
+    def toRows(self) -> List[Dict[str, Union[int, float, str]]]:
+        return [self.row(index) for index in range(len(self))]
+
+    def clear(self) -> None:
+        self.columns = {column: values[:0] for column, values in self.columns.items()}
+        self.valid = {column: mask[:0] for column, mask in self.valid.items()}
+        self.identifications = {}
+
+    def select(self, selection: Union[np.ndarray, slice]) -> "ColumnBatch":
+        return ColumnBatch(
+            {column: values[selection] for column, values in self.columns.items()},
+            {column: mask[selection] for column, mask in self.valid.items()},
+            self.identifications
+        )
+
+    def withoutColumns(self, *columns: str) -> "ColumnBatch":
+        batch = self.select(slice(None))
+        for column in columns:
+            batch.valid[column] = np.zeros(len(batch), dtype=bool)
+        return batch
+
+    def sortedByAddress(self) -> "ColumnBatch":
+        return self.select(np.argsort(self.columns["address"], kind="stable"))
+
+    def addresses(self) -> np.ndarray:
+        return np.unique(self.columns["address"])
+
+    @staticmethod
+    def concatenate(batches: Sequence["ColumnBatch"]) -> "ColumnBatch":
+        batches = [batch for batch in batches if batch is not None]
+        if not batches:
+            return ColumnBatch()
+
+        identifications = {}
+        for batch in batches:
+            identifications.update(batch.identifications)
+
+        return ColumnBatch(
+            {column: np.concatenate([batch.columns[column] for batch in batches]) for column in ColumnBatch.DTYPES},
+            {column: np.concatenate([batch.valid[column] for batch in batches]) for column in ColumnBatch.DTYPES},
+            identifications
+        )
+
+    @staticmethod
+    def fromRows(rows: Sequence[Dict[str, Any]]) -> "ColumnBatch":
+        columns = {}
+        valid = {}
+        identifications = {}
+        for column, dtype in ColumnBatch.DTYPES.items():
+            values = [row.get(column) for row in rows]
+            valid[column] = np.array([value is not None for value in values], dtype=bool)
+            filler = np.nan if np.issubdtype(dtype, np.floating) else 0
+            columns[column] = np.array([filler if value is None else value for value in values], dtype=dtype)
+
+        for row in rows:
+            identification = row.get("identification")
+            if identification and identification != DB_CONSTANTS.NO_IDENTIFICATION:
+                identifications.setdefault(row.get("address"), identification)
+
+        return ColumnBatch(columns, valid, identifications)
+
+    @staticmethod
+    def fromTuples(rows: Sequence[Tuple[Any, ...]], elements: List[str], knownIdents: Dict[int, str] = {}) -> "ColumnBatch":
+        if not rows:
+            return ColumnBatch({element: [] for element in elements if element in ColumnBatch.DTYPES})
+
+        rawColumns = dict(zip(elements, zip(*rows)))
+        columns = {}
+        valid = {}
+        for column, values in rawColumns.items():
+            if column not in ColumnBatch.DTYPES:
+                continue
+            if column == "timestamp":
+                columns[column], valid[column] = ColumnBatch.__toNanoseconds(values)
+            else:
+                dtype = ColumnBatch.DTYPES[column]
+                valid[column] = np.array([value is not None for value in values], dtype=bool)
+                if np.issubdtype(dtype, np.floating):
+                    columns[column] = np.array(values, dtype=np.float64).astype(dtype)
+                else:
+                    columns[column] = np.array([0 if value is None else value for value in values], dtype=dtype)
+
+        identifications = {}
+        if "identification" in rawColumns and "address" in rawColumns:
+            for address, identification in zip(rawColumns["address"], rawColumns["identification"]):
+                if identification and identification.strip():
+                    identifications.setdefault(address, identification.strip())
+        elif knownIdents and "address" in columns:
+            for address in np.unique(columns["address"]).tolist():
+                if knownIdents.get(address):
+                    identifications[address] = knownIdents[address]
+
+        return ColumnBatch(columns, valid, identifications)
+
+    @staticmethod
+    def __toNanoseconds(values: Sequence[datetime]) -> Tuple[np.ndarray, np.ndarray]:
+        # Same local time interpretation as QDateTime(datetime).toMSecsSinceEpoch()
+        mask = np.array([value is not None for value in values], dtype=bool)
+        utcMSecs = np.array(values, dtype="datetime64[ms]").astype(np.int64)
+        if not mask.any():
+            return np.zeros(len(values), dtype=np.int64), mask
+
+        # Offsets only change on quarter hours, one lookup per quarter hour covers every value of the range
+        buckets, inverse = np.unique(utcMSecs[mask] // ColumnBatch.OFFSET_STEP_MSECS, return_inverse=True)
+        offsets = np.array([int((EPOCH + timedelta(milliseconds=bucket * ColumnBatch.OFFSET_STEP_MSECS)).timestamp() * 1000) - bucket * ColumnBatch.OFFSET_STEP_MSECS
+                            for bucket in buckets.tolist()], dtype=np.int64)
+
+        localMSecs = np.zeros(len(values), dtype=np.int64)
+        localMSecs[mask] = utcMSecs[mask] + offsets[inverse]
+        return localMSecs * 10**6, mask
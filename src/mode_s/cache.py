@@ -0,0 +1,135 @@
+import numpy as np
+
+import os
+import hashlib
+from typing import Dict, List, Union
+
+from mode_s.batch import ColumnBatch
+from mode_s.logger import Logger
+from mode_s.constants import DB_CONSTANTS, MODE_S_CONSTANTS, QUERY
+
+
+class QueryCache:
+
+    def __init__(self, logger: Logger, path: str = MODE_S_CONSTANTS.APP_CACHE_PATH, maxSize: int = DB_CONSTANTS.CACHE_MAX_SIZE):
+        self.logger: Logger = logger
+        self.path: str = path
+        self.maxSize: int = maxSize
+
+    def key(self, queries: List[QUERY], elements: List[str], *stamps) -> str:
+        keyStr = "\n".join(str(query) for query in queries) + "\n" + ",".join(elements) + "\n" + "|".join(str(stamp) for stamp in stamps)
+        return hashlib.sha1(keyStr.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, knownIdents: Dict[int, str] = {}) -> Union[List[Dict[str, Union[int, str]]], ColumnBatch, None]:
+        entryPath = self.__entryPath(key)
+        if not os.path.exists(entryPath):
+            return None
+
+        try:
+            with np.load(entryPath, allow_pickle=False) as entry:
+                if str(entry["format"]) == DB_CONSTANTS.FORMAT_COLUMNS:
+                    results = self.__loadBatch(entry)
+                else:
+                    results = self.__loadRows(entry, knownIdents)
+            os.utime(entryPath)
+        except Exception as esc:
+            self.logger.warning("Could not read cache entry " + key + " :: " + str(esc))
+            self.__remove(entryPath)
+            return None
+
+        return results
+
+    def put(self, key: str, results: Union[List[Dict[str, Union[int, str]]], ColumnBatch], elements: List[str]) -> None:
+        if isinstance(results, ColumnBatch):
+            arrays = self.__dumpBatch(results)
+        else:
+            arrays = self.__dumpRows(results, elements)
+
+        entryPath = self.__entryPath(key)
+        tempPath = entryPath + ".tmp.npz"
+        try:
+            np.savez(tempPath, **arrays)
+            os.replace(tempPath, entryPath)
+        except OSError as ose:
+            self.logger.warning("Could not write cache entry " + key + " :: " + str(ose))
+            self.__remove(tempPath)
+            return
+
+        self.__evict()
+
+    def remove(self, key: str) -> None:
+        self.__remove(self.__entryPath(key))
+
+    def clear(self) -> None:
+        for entryPath in self.__entries():
+            self.__remove(entryPath)
+
+    def __entryPath(self, key: str) -> str:
+        return os.path.join(self.path, key + ".npz")
+
+    def __entries(self) -> List[str]:
+        if not os.path.isdir(self.path):
+            return []
+        return [os.path.join(self.path, name) for name in os.listdir(self.path) if name.endswith(".npz") and not name.endswith(".tmp.npz")]
+
+    def __evict(self) -> None:
+        # Least recently used entries go first, a hit refreshes the modification time of its entry
+        entries = sorted(self.__entries(), key=lambda entryPath: os.path.getmtime(entryPath), reverse=True)
+        totalSize = 0
+        for entryPath in entries:
+            totalSize += os.path.getsize(entryPath)
+            if totalSize > self.maxSize:
+                self.logger.debug("Evicting cache entry", os.path.basename(entryPath))
+                self.__remove(entryPath)
+
+    def __remove(self, entryPath: str) -> None:
+        try:
+            os.remove(entryPath)
+        except OSError:
+            pass
+
+    def __dumpRows(self, rows: List[Dict[str, Union[int, str]]], elements: List[str]) -> Dict[str, np.ndarray]:
+        arrays = {"format": np.array(DB_CONSTANTS.FORMAT_ROWS), "elements": np.array(elements, dtype=str)}
+        for element in elements:
+            values = [row.get(element) for row in rows]
+            validValues = [value for value in values if value is not None]
+            arrays["valid_" + element] = np.array([value is not None for value in values], dtype=bool)
+            if validValues and all(isinstance(value, str) for value in validValues):
+                arrays["column_" + element] = np.array(["" if value is None else value for value in values], dtype=str)
+            elif all(isinstance(value, int) for value in validValues):
+                arrays["column_" + element] = np.array([0 if value is None else value for value in values], dtype=np.int64)
+            else:
+                arrays["column_" + element] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        return arrays
+
+    def __loadRows(self, entry: Dict[str, np.ndarray], knownIdents: Dict[int, str]) -> List[Dict[str, Union[int, str]]]:
+        elements = entry["elements"].tolist()
+        absentColumns = [column for column in DB_CONSTANTS.USED_COLUMNS if column not in elements]
+        columns = {element: entry["column_" + element].tolist() for element in elements}
+        valid = {element: entry["valid_" + element].tolist() for element in elements}
+
+        rows = []
+        for index in range(len(entry["valid_" + elements[0]]) if elements else 0):
+            row = {abs: None for abs in absentColumns}
+            for element in elements:
+                row[element] = columns[element][index] if valid[element][index] else None
+            if row.get("identification") is None:
+                row["identification"] = knownIdents.get(row.get("address")) or DB_CONSTANTS.NO_IDENTIFICATION
+            rows.append(row)
+        return rows
+
+    def __dumpBatch(self, batch: ColumnBatch) -> Dict[str, np.ndarray]:
+        arrays = {"format": np.array(DB_CONSTANTS.FORMAT_COLUMNS)}
+        for column in ColumnBatch.DTYPES:
+            arrays["column_" + column] = batch.columns[column]
+            arrays["valid_" + column] = batch.valid[column]
+        arrays["ident_addresses"] = np.array(list(batch.identifications.keys()), dtype=np.int64)
+        arrays["ident_names"] = np.array(list(batch.identifications.values()), dtype=str)
+        return arrays
+
+    def __loadBatch(self, entry: Dict[str, np.ndarray]) -> ColumnBatch:
+        return ColumnBatch(
+            {column: entry["column_" + column] for column in ColumnBatch.DTYPES if "column_" + column in entry},
+            {column: entry["valid_" + column] for column in ColumnBatch.DTYPES if "valid_" + column in entry},
+            dict(zip(entry["ident_addresses"].tolist(), entry["ident_names"].tolist()))
+        )
@@ -7,20 +7,107 @@ class ENGINE_CONSTANTS:
     KDE_BANDWIDTH = 0.5
     KDE_FIELD_WIDTH = 180*(10**3)
     MEDIAN_N = 1
+    MEDIAN_PROCESS_POINTS = 10**6   # tracks sharing a kernel size are filtered in the process pool above this many points
+    EXCEEDANCE_BUCKETS = [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100]   # in % over the threshold, the last one takes the rest
+    EXCEEDANCE_SIZE_RATIO = 10
+    KDE_POINTS = 1000
     
 class DB_CONSTANTS:
     USED_COLUMNS = ["identification", "address", "timestamp",
                      "latitude", "longitude",  "bar", "ivv"]
 
     CONNECTIONS_TOTAL = 0
+    RECONNECT_ATTEMPTS = 3
+    RECONNECT_DELAY = 1
+
+    STREAM_CHUNK_SIZE = 5000
+    STREAM_QUEUE_SIZE = 64
+    STREAM_TIMEOUT = 1
+
+    MAX_PREPARED_STATEMENTS = 32   # per worker connection, the least recently used one is closed beyond it
+
+    CACHE_MAX_SIZE = 512 * 1024**2
+    CHECKPOINT_MAX_SIZE = 4 * 1024**3
+
+    FETCH_RETRIES = 3
+    FETCH_BACKOFF = 1              # in Seconds, doubled on every retry
+    FETCH_BACKOFF_MAX = 30         # in Seconds
+
+    HEDGE_QUANTILE = 0.75          # share of finished units before stragglers are hedged
+    HEDGE_FACTOR = 2               # straggler: running longer than this times the median unit latency
+    HEDGE_MIN_SECONDS = 1
+    HEDGE_POLL = 0.1               # in Seconds
+    REPLICA_MAX_FAILURES = 2       # consecutive failures before an endpoint is ejected
+    REPLICA_EJECT_SECONDS = 60
+    SQLITE_PROGRESS_STEPS = 10000  # virtual machine steps between two statement deadline checks
+
+    PLANNER_TARGET_SECONDS = 2     # wanted duration of a single sub query
+    PLANNER_SMOOTHING = 0.5        # weight of the newest measurement
+    PLANNER_TOLERANCE = 0.05       # throughput loss still counted as an improvement
 
     MAX_ROW_BEFORE_LONG_DURATION = 200000
     PREFERRED_NUMBER_THREADS = 20
     MAX_NUMBER_THREADS = 40
     MIN_NUMBER_THREADS = 10
     
+    LOGIN_KEYS = ["backend", "host_name", "db_port", "db_name", "user_name", "password", "replicas"]
+
     NO_IDENTIFICATION = "Unknown"
     EMPTY_FILTER = "WHERE"
+
+    PARTITION_OFFSET = "offset"
+    PARTITION_KEYSET = "keyset"
+    PARTITION_ADDRESS = "address"
+    PARTITION_MODES = [PARTITION_OFFSET, PARTITION_KEYSET, PARTITION_ADDRESS]
+
+    STATS_EXACT = "exact"          # COUNT(*) over the whole table
+    STATS_ESTIMATE = "estimate"    # information_schema row estimate
+    STATS_ID_RANGE = "id_range"    # MAX(id) - MIN(id) + 1
+    STATS_STRATEGIES = [STATS_EXACT, STATS_ESTIMATE, STATS_ID_RANGE]
+    STATS_TTL = 600                # in Seconds
+
+    BACKEND_MYSQL = "mysql"
+    BACKEND_SQLITE = "sqlite"
+    BACKENDS = [BACKEND_MYSQL, BACKEND_SQLITE]
+
+    IDENT_TTL = 600                # in Seconds, the registry is only scanned again after it
+    IDENT_TABLE = "tmp_known_idents"
+    IDENT_INSERT_SIZE = 1000
+
+    USED_ADDRESS_TABLE = "tmp_used_addresses"
+    USED_ADDRESS_INSERT_SIZE = 1000
+
+    FORMAT_ROWS = "rows"
+    FORMAT_COLUMNS = "columns"
+    FORMATS = [FORMAT_ROWS, FORMAT_COLUMNS]
+    
+class SYNTHETIC_CONSTANTS:
+    SEED = 2022
+    NUM_ADDRESSES = 2000
+    END = "2022-06-01 12:00:00"      # local time of the newest generated row
+    SPAN = 24 * 60                   # in Minutes
+    TURBULENCE_RATE = 0.1
+
+    MEAN_INTERVAL = 1.5              # in Seconds between two messages of one address
+    GAP_PROBABILITY = 0.002
+    GAP_SECONDS = (20, 180)
+
+    PHASE_RATES = [2000, 0, 0, -1500]    # climb, cruise, descent in ft/min
+    TREND_STEP = 15
+    BAR_NOISE = 60
+    IVV_NOISE = 25
+    TURBULENCE_SECONDS = (60, 300)
+    TURBULENCE_BAR_NOISE = 450
+    TURBULENCE_IVV_NOISE = 80
+
+    LATITUDES = (50.5, 54.0)
+    LONGITUDES = (8.0, 13.0)
+    SPEED = 2e-3                     # in Degrees per Second
+    BDS60_SHARE = 0.5
+    IDENTIFIED_SHARE = 0.85
+    IDENTIFICATION_SHARE = 0.05
+
+    TABLE_NAME = "tbl_mode_s"
     
 class MODE_S_CONSTANTS:
     APP_DATA_PATH: str = os.path.join(os.path.expanduser("~"), ".mode_s")
@@ -31,6 +118,17 @@ class MODE_S_CONSTANTS:
     if not os.path.exists(APP_DUMP_PATH):
         os.mkdir(APP_DUMP_PATH)
 
+    APP_CACHE_PATH: str = os.path.join(APP_DATA_PATH, "cache")
+    if not os.path.exists(APP_CACHE_PATH):
+        os.mkdir(APP_CACHE_PATH)
+
+    APP_CHECKPOINT_PATH: str = os.path.join(APP_DATA_PATH, "checkpoint")
+    if not os.path.exists(APP_CHECKPOINT_PATH):
+        os.mkdir(APP_CHECKPOINT_PATH)
+
+    # The engine data set is mapped by the pool workers from here, tmpfs where available so it never touches the disk
+    SHARED_DATASET_PATH: str = "/dev/shm" if os.path.isdir("/dev/shm") else APP_DUMP_PATH
+
     STD_SERIES: str           = "std"
     EXCEEDS_SERIES: str       = "exceeds"
     HEATMAP_SERIES: str       = "heatmap"
@@ -52,10 +150,13 @@ class MODE_S_CONSTANTS:
     FILTERED_DUMP: str      = os.path.join(APP_DUMP_PATH, "filtered.dump.json")
     LOCATION_DUMP: str      = os.path.join(APP_DUMP_PATH, "location.dump.json")
     DATABASE_DUMP: str      = os.path.join(APP_DUMP_PATH, "database.dump.json")
+    TABLE_STATS_DUMP: str   = os.path.join(APP_DUMP_PATH, "table_stats.dump.json")
     INDENT_MAPPING: str     = os.path.join(APP_DUMP_PATH, "addresses.dump.json")
     TURBULENCE_DUMP: str    = os.path.join(APP_DUMP_PATH, "turbulence.dump.json")
     OCCURRENCE_DUMP: str    = os.path.join(APP_DUMP_PATH, "occurrence.dump.json")
     KDE_EXCEEDS_DUMP: str   = os.path.join(APP_DUMP_PATH, "kde_exceeds.dump.json")
+    IDENT_REGISTRY_DUMP: str = os.path.join(APP_DUMP_PATH, "ident_registry.dump.json")
+    WORKER_STATE_DUMP: str  = os.path.join(APP_DUMP_PATH, "worker_state.{}.dump.pickle")
 
 
 class LOGGER_CONSTANTS:
@@ -97,3 +198,8 @@ class LOCATION_DATA(NamedTuple):
     time: float
     longitude: float
     latitude: float
+
+
+class QUERY(NamedTuple):
+    statement: str  # with %s placeholders
+    params: tuple
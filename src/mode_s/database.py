@@ -1,15 +1,31 @@
 from PySide2.QtCore import QDateTime
 
-from mysql.connector.connection import MySQLConnection
+import numpy as np
 
+import os
+import time
+import uuid
+import queue
+import atexit
+import pickle
+import hashlib
+import sqlite3
+import threading
 import multiprocessing
 import concurrent.futures
-from typing import List, Dict, Union
+from typing import List, Dict, Tuple, Union
 from datetime import datetime
 
 import mode_s.process as process
+from mode_s.batch import ColumnBatch
+from mode_s.backend import Backend, SQLiteBackend, getBackend
+from mode_s.cache import QueryCache
+from mode_s.planner import QueryPlanner
+from mode_s.replicas import ReplicaPool
+from mode_s.tablestats import TableStatistics
+from mode_s.idents import IdentificationRegistry
 from mode_s.logger import Logger
-from mode_s.constants import DB_CONSTANTS, LOGGER_CONSTANTS
+from mode_s.constants import DB_CONSTANTS, MODE_S_CONSTANTS, LOGGER_CONSTANTS, QUERY
 
 
 class DatabaseError(BaseException):
@@ -23,20 +39,46 @@ class Database:
     preferedNumberThreads = DB_CONSTANTS.PREFERRED_NUMBER_THREADS
     maxNumberThreads = DB_CONSTANTS.MAX_NUMBER_THREADS
     minNumberThreads = DB_CONSTANTS.MIN_NUMBER_THREADS
+    partitionMode: str = DB_CONSTANTS.PARTITION_OFFSET
+    streamResults: bool = False
+    streamChunkSize: int = DB_CONSTANTS.STREAM_CHUNK_SIZE
+    resultFormat: str = DB_CONSTANTS.FORMAT_ROWS
+    incrementalSync: bool = False
+    trimWindow: float = None
+    syncSignature: str = None
+    highWaterMarks: Dict[str, Tuple[int, int]] = {}
+    useCache: bool = True
+    fusedFetch: bool = False
+    addressJoin: bool = False
+    identJoin: bool = False
+    adaptivePlanning: bool = False
+    aggregateWindows: bool = False
+    windowAggregates: Dict[int, Dict[str, Union[str, np.ndarray]]] = {}
+    resumableFetch: bool = False
+    fetchRetries: int = DB_CONSTANTS.FETCH_RETRIES
+    fetchTimeout: float = None
+    statementTimeout: float = None
+    hedgeRequests: bool = False
+    cancelled: bool = False
+    partitions: List[Tuple[str, int, int]] = []     # table name, start timestamp (in Nanoseconds) and row count of every partition
+    durationLimit: float = None
     
     limit: int = ROW_COUNT
     
-    data: List[Dict[str, Union[str, int]]] = []  
+    data: Union[List[Dict[str, Union[str, int]]], ColumnBatch] = []  
     executors: List[concurrent.futures.ThreadPoolExecutor] = []
     pExecutor: concurrent.futures.ProcessPoolExecutor = None
+    streamChannel: Tuple[multiprocessing.Queue, object] = None
     
     addresses: List[int] = []
     usedAddresses: List[int] = []
-    knownIdents: Dict[str, int] = {}
+    knownIdents: Dict[int, str] = {}
+    workerStateVersion: int = 0
+    poolLogin: Dict[str, Union[str, int, list]] = None
 
-    strFilter: str = DB_CONSTANTS.EMPTY_FILTER
+    strFilter: QUERY = QUERY(DB_CONSTANTS.EMPTY_FILTER, ())
     filterOn: bool = False 
-    filterDictList: List[str] = []
+    filterDictList: List[Dict[str, Union[str, tuple]]] = []
     
     backgroundFutures: List[concurrent.futures.Future] = []
     
@@ -46,7 +88,8 @@ class Database:
         "db_name": None,
         "user_name": None,
         "table_name": None,
-        "password": None
+        "password": None,
+        "backend": DB_CONSTANTS.BACKEND_MYSQL
     }
     
     validDBColumns: Dict[str, str] = {
@@ -56,6 +99,18 @@ class Database:
     
     def __init__(self, logger: Logger):        
         self.logger: Logger = logger
+        self.queryCache: QueryCache = QueryCache(logger)
+        self.fetchCheckpoint: QueryCache = QueryCache(logger, MODE_S_CONSTANTS.APP_CHECKPOINT_PATH, DB_CONSTANTS.CHECKPOINT_MAX_SIZE)
+        self.stateLock: threading.Lock = threading.Lock()
+        self.streamLock: threading.Lock = threading.Lock()
+        self.queryPlanner: QueryPlanner = QueryPlanner(logger)
+        self.backend: Backend = getBackend(self.login)
+        self.tableStatistics: TableStatistics = TableStatistics(logger, self.__query)
+        self.replicaPool: ReplicaPool = ReplicaPool(logger)
+        self.identRegistry: IdentificationRegistry = IdentificationRegistry(logger)
+        # One state file per instance, concurrent runs never read each other's state
+        self.workerStatePath: str = MODE_S_CONSTANTS.WORKER_STATE_DUMP.format(f"{os.getpid()}.{uuid.uuid4().hex}")
+        atexit.register(self.__removeWorkerState)
     
     def start(self) -> bool:
         self.logger.info("Starting database")
@@ -74,15 +129,23 @@ class Database:
             self.logger.critical(ex)
             started = False
 
-        executor.shutdown()
+        # Statistics and known addresses keep loading in the background, waitUntilReady synchronizes
+        executor.shutdown(wait=False)
         return started
     
-    def setProcessExecutor(self, ex: concurrent.futures.ProcessPoolExecutor):
+    def setProcessExecutor(self, ex: concurrent.futures.ProcessPoolExecutor, login: Dict[str, Union[str, int, list]] = None,
+                           streamChannel: Tuple[multiprocessing.Queue, object] = None):
+        # login and streamChannel are what the pool initializer gave the workers, tasks only carry the login once it differs from it
         self.pExecutor = ex
+        self.poolLogin = self.__connectionLogin(login) if login is not None else None
+        self.streamChannel = streamChannel
         
     def getData(self) -> List[Dict[str, Union[str, int]]]:
         return self.data
     
+    def getWindowAggregates(self) -> Dict[int, Dict[str, Union[str, np.ndarray]]]:
+        return self.windowAggregates if self.aggregateWindows else {}
+
     def getMapping(self, addresses:List[int]) -> Dict[int, str]:
         mapping = {}
         unknownIdents = []
@@ -97,6 +160,7 @@ class Database:
         return mapping 
     
     def cancel(self) -> True:
+        self.cancelled = True
         for ex in self.executors:
             ex.shutdown(wait=False)
         return True
@@ -111,11 +175,13 @@ class Database:
             self.login[el] = loginData[el]
             
         try:
+            self.backend = getBackend(self.login)
+            self.replicaPool.setEndpoints(self.login)
             self.__testDBConnection()
             self.logger.log("Login Info")
             for el in loginData:
                 self.logger.log(f"{el}  \t: {self.login[el]}")
-        except DatabaseError as dbe:
+        except (DatabaseError, ConnectionError) as dbe:
             self.logger.critical(dbe)
             Done = False
         finally:
@@ -161,65 +227,229 @@ class Database:
         self.logger.log("Database number of threads || Min:", self.minNumberThreads,
                         "| Max:", self.maxNumberThreads, "| Preferred:", self.preferedNumberThreads, "||")
 
+        if params.get("partition") in DB_CONSTANTS.PARTITION_MODES:
+            self.partitionMode = params["partition"]
+        else:
+            if params.get("partition"):
+                self.logger.warning("Unknown partition mode " + str(params["partition"]) + ". Possible values: " + str(DB_CONSTANTS.PARTITION_MODES))
+            self.partitionMode = DB_CONSTANTS.PARTITION_OFFSET
+
+        self.logger.log("Using partition mode:", self.partitionMode)
+
+        self.streamResults = bool(params.get("stream"))
+        if params.get("stream_chunk_size"):
+            self.streamChunkSize = int(params["stream_chunk_size"])
+        else:
+            self.streamChunkSize = DB_CONSTANTS.STREAM_CHUNK_SIZE
+        if self.streamResults:
+            self.logger.log("Streaming query results in chunks of", self.streamChunkSize, "rows")
+
+        if params.get("result_format") in DB_CONSTANTS.FORMATS:
+            self.resultFormat = params["result_format"]
+        else:
+            self.resultFormat = DB_CONSTANTS.FORMAT_ROWS
+        self.logger.log("Using result format:", self.resultFormat)
+
+        self.incrementalSync = bool(params.get("incremental"))
+        self.trimWindow = params.get("trim_window")
+        if self.incrementalSync:
+            self.logger.log("Incremental sync on. Only rows newer than the last fetch are pulled")
+        if self.trimWindow:
+            self.logger.log("Trimming rows older than", self.trimWindow, "minutes after each sync")
+
+        self.useCache = not params.get("no_cache")
+        self.logger.log("Query result cache:", "on" if self.useCache else "off")
+
+        self.fusedFetch = bool(params.get("fused_fetch"))
+        if self.fusedFetch:
+            self.logger.log("Fetching bar/ivv and location rows in a single pass")
+
+        self.addressJoin = bool(params.get("address_join"))
+        if self.addressJoin:
+            self.logger.log("Joining used addresses from a session table instead of inlining them")
+
+        identJoin = bool(params.get("ident_join"))
+        if identJoin != self.identJoin:
+            self.identJoin = identJoin
+            self.__publishWorkerState()
+        if self.identJoin:
+            self.logger.log("Joining identifications in SQL from a session table loaded with the registry")
+
+        self.aggregateWindows = bool(params.get("aggregate_windows"))
+        if self.aggregateWindows and self.partitions:
+            # Windows start at the first row of an address, a track crossing a partition boundary would get two starts
+            self.logger.warning("Window aggregates are not supported on partitioned tables. Fetching raw bar/ivv rows")
+            self.aggregateWindows = False
+        if self.aggregateWindows:
+            self.logger.log("Fetching per minute bar/ivv aggregates instead of raw bar/ivv rows")
+
+        self.resumableFetch = bool(params.get("resumable"))
+        if self.resumableFetch:
+            self.logger.log("Checkpointing fetched units to", MODE_S_CONSTANTS.APP_CHECKPOINT_PATH)
+        self.fetchRetries = DB_CONSTANTS.FETCH_RETRIES if params.get("retries") is None else int(params["retries"])
+        self.fetchTimeout = params.get("fetch_timeout")
+        self.logger.log("Retrying failed units up to", self.fetchRetries, "times" + (f", timeout per attempt {self.fetchTimeout} s" if self.fetchTimeout else ""))
+
+        self.hedgeRequests = bool(params.get("hedge"))
+        if self.hedgeRequests:
+            self.logger.log("Hedging straggling units on another connection")
+        if params.get("statement_timeout") != self.statementTimeout:
+            self.statementTimeout = params.get("statement_timeout")
+            self.__publishWorkerState()
+        if self.statementTimeout:
+            self.logger.log("Server side statement timeout:", self.statementTimeout, "s")
+
+        self.adaptivePlanning = bool(params.get("adaptive"))
+        if self.adaptivePlanning:
+            self.logger.log("Sizing sub queries from measured throughput")
+
+        self.durationLimit = params.get("duration_limit")
         if params.get("duration_limit"):
             self.logger.log("Setting duration limit to", params["duration_limit"] ,"minutes")
             lastPossibleTimestamp = self.LAST_DB_UPDATE.addSecs(-params["duration_limit"] * 60).toString("yyyy-MM-dd hh:mm:ss")
-            self.strFilter = self.__addFilter(f"{self.login['table_name']}.timestamp >= '{lastPossibleTimestamp}'", attribute="timestamp")
+            self.strFilter = self.__addFilter(f"{self.login['table_name']}.timestamp >= %s", attribute="timestamp", params=(lastPossibleTimestamp,))
             self.logger.debug("Last possible timestamp  " + lastPossibleTimestamp)
 
         if params.get("latitude_min"):
-            self.strFilter = self.__addFilter(f"{self.login['table_name']}.latitude >= {params['latitude_min']}", attribute="latitude")
+            self.strFilter = self.__addFilter(f"{self.login['table_name']}.latitude >= %s", attribute="latitude", params=(params["latitude_min"],))
             self.logger.log("Setting minimal latitude to", params["latitude_min"])
         if params.get("latitude_max"):
-            self.strFilter = self.__addFilter(f"{self.login['table_name']}.latitude <= {params['latitude_max']}", attribute="latitude")
+            self.strFilter = self.__addFilter(f"{self.login['table_name']}.latitude <= %s", attribute="latitude", params=(params["latitude_max"],))
             self.logger.log("Setting maximal latitude to", params["latitude_max"])
         if params.get("longitude_min"):
-            self.strFilter = self.__addFilter(f"{self.login['table_name']}.longitude >= {params['longitude_min']}", attribute="longitude")
+            self.strFilter = self.__addFilter(f"{self.login['table_name']}.longitude >= %s", attribute="longitude", params=(params["longitude_min"],))
             self.logger.log("Setting minimal longitude to", params["longitude_min"])
         if params.get("longitude_max"):
-            self.strFilter = self.__addFilter(f"{self.login['table_name']}.longitude <= {params['longitude_max']}", attribute="longitude")
+            self.strFilter = self.__addFilter(f"{self.login['table_name']}.longitude <= %s", attribute="longitude", params=(params["longitude_max"],))
             self.logger.log("Setting maximal longitude to", params["longitude_max"])
         if params.get("id_min"):
-            self.strFilter = self.__addFilter(f"{self.login['table_name']}.id >= {params['id_min']}", attribute="id")
+            self.strFilter = self.__addFilter(f"{self.login['table_name']}.id >= %s", attribute="id", params=(params["id_min"],))
             self.logger.log("Setting minimal  to", params["id_min"])
         if params.get("id_max"):
-            self.strFilter = self.__addFilter(f"{self.login['table_name']}.id <=  {params['id_max']}", attribute="id")
+            self.strFilter = self.__addFilter(f"{self.login['table_name']}.id <= %s", attribute="id", params=(params["id_max"],))
             self.logger.log("Setting maximal  to", params["id_max"])
             
-        self.logger.info("Setting query filter to: " + self.strFilter)
+        self.logger.info("Setting query filter to: " + self.strFilter.statement + " with parameters " + str(self.strFilter.params))
 
     def resetFilter(self):
         self.filterOn = False
         
-    def getFromDB(self, attributes: List[str] = [], options: Dict[str, str] = {"default_filter_on": False, "select_distinct": False, "not_null_values": []}) -> List[Dict[str, Union[int, str]]]:
-        # option={..., "limit":50000}
+    def getFromDB(self, attributes: List[str] = [], options: Dict[str, str] = {"default_filter_on": False, "select_distinct": False, "not_null_values": []}) -> Union[List[Dict[str, Union[int, str]]], ColumnBatch]:
+        # option={..., "limit":50000, "columnar": False}
+        attributes = self.__withIdentification(attributes, options)
         self.logger.debug("Getting attributes", ", ".join(attrib for attrib in attributes), "from Database")
         allResults = []
+        stream = False
+        self.cancelled = False
         try:
-            queries = self.__generateQueries(attributes, options) 
-            threadedQueries = []
-            maxProcesses = min(len(queries), multiprocessing.cpu_count() + 1) or 1
-            queriesPerProcess = int(len(queries) / maxProcesses)
-            for i in range(maxProcesses):
-                DB_CONSTANTS.CONNECTIONS_TOTAL += 1
-                startIndex = i*queriesPerProcess
-                endIndex = None if i == maxProcesses - 1 else startIndex + queriesPerProcess
-                pack = queries[startIndex : endIndex]
-                if not pack:
-                    continue
-                connectionTotal = DB_CONSTANTS.CONNECTIONS_TOTAL
-                threadedQueries.append(self.pExecutor.submit(process.query, pack, attributes, self.knownIdents, connectionTotal, self.login))
-                
-            for completedQuery in concurrent.futures.as_completed(threadedQueries):
-                try:
-                    results = completedQuery.result()
-                except ConnectionError as de:
-                    self.logger.critical("Error occurred while getting attributes " + str(attributes))
-                    self.logger.critical(str(de))
-                except Exception as esc:
-                    self.logger.warning("Error occurred while getting attributes " + str(attributes) + "\nERROR: " + str(esc))
+            planKey = self.queryPlanner.key(attributes)
+            plan = None
+            if self.adaptivePlanning:
+                plan = self.queryPlanner.plan(planKey, options.get("limit") or self.limit, self.minNumberThreads, self.maxNumberThreads)
+
+            # A resumable pull freezes its sub queries on the id range of its start, a retry runs the same units even if rows were inserted since
+            pullKey = self.__pullKey(attributes, options) if self.resumableFetch and self.ROW_COUNT != 0 else None
+            frozenPull = self.__loadPull(pullKey) if pullKey else None
+            idBounds = None
+            if frozenPull is not None:
+                queries, units, idBounds = frozenPull
+                self.logger.log(f"Resuming the pull frozen on ids {idBounds[0]} .. {idBounds[1]}")
+            else:
+                if pullKey:
+                    idBounds = self.__idBounds()
+                    options = dict(options, id_bounds=idBounds)
+                if self.partitions:
+                    # Every partition overlapping the time range gets its own sub queries, all of them go through the same units
+                    tables = self.__prunedPartitions(options.get("since"))
+                    queries = []
+                    if self.__isIdentRun(options):
+                        for table, _ in tables:
+                            queries.extend(self.__generateQueries(attributes, options, plan[0] if plan else None, table))
+                    else:
+                        # Partitions are walked in the order of the rows, each one gets what is left of the limit after the filtered rows of the previous ones,
+                        # the way a single table query would go on reading them
+                        remaining = int(options.get("limit") or self.limit)
+                        for table, _ in (reversed(tables) if attributes == ["timestamp"] else tables):
+                            if remaining <= 0:
+                                break
+                            partitionRows = self.__filteredRows(attributes, options, table)
+                            if partitionRows == 0:
+                                continue
+                            queries.extend(self.__generateQueries(attributes, dict(options, limit=remaining), plan[0] if plan else None, table))
+                            remaining -= partitionRows
                 else:
-                    allResults.extend(results)
+                    queries = self.__generateQueries(attributes, options, plan[0] if plan else None)
+            columnar = options.get("columnar", False)
+
+            # The table statistics may be older than the last insert, the probe keeps cached results from going stale
+            reusable = self.useCache and options.get("cache", True)
+            latestId = self.__latestId() if reusable and self.ROW_COUNT != 0 else None
+            cacheKey = self.__cacheKey(queries, attributes, columnar, latestId) if options.get("cache", True) else None
+            # Rows without an identification get the one of the registry, unless the raw table values are asked for
+            patchIdentifications = not options.get("raw_identification")
+            knownIdents = self.knownIdents if patchIdentifications else {}
+            if cacheKey is not None:
+                cachedResults = self.queryCache.get(cacheKey, knownIdents)
+                if cachedResults is not None:
+                    self.logger.success(f"Query results loaded from cache. Size: {len(cachedResults)}")
+                    return cachedResults
+
+            stream = options.get("stream", self.streamResults) and self.__acquireStream()
+            chunkQueue = self.streamChannel[0] if stream else None
+            if frozenPull is None:
+                maxProcesses = min(len(queries), plan[1] if plan else multiprocessing.cpu_count() + 1) or 1
+                queriesPerProcess = int(len(queries) / maxProcesses)
+                units = [queries[i*queriesPerProcess : None if i == maxProcesses - 1 else (i + 1)*queriesPerProcess] for i in range(maxProcesses)]
+                units = [unit for unit in units if unit]
+                if pullKey:
+                    self.__storePull(pullKey, queries, units, idBounds)
+
+            # A unit is one pack of sub queries run on one worker connection, finished units survive failures of the others
+            unitResults = {}
+            unitKeys = self.__checkpointKeys(units, attributes, columnar, idBounds)
+            for index, unitKey in enumerate(unitKeys):
+                checkpointedResults = self.fetchCheckpoint.get(unitKey, knownIdents)
+                if checkpointedResults is not None:
+                    unitResults[index] = checkpointedResults
+            if unitResults:
+                self.logger.log(f"Resuming fetch from checkpoint. {len(unitResults)}/{len(units)} units already fetched")
+
+            packDone = {}
+            startTime = time.perf_counter()
+            pendingUnits = [index for index in range(len(units)) if index not in unitResults]
+            attempt = 0
+            while pendingUnits:
+                if attempt > 0:
+                    if self.cancelled or attempt > self.fetchRetries:
+                        break
+                    backoff = min(DB_CONSTANTS.FETCH_BACKOFF * 2**(attempt - 1), DB_CONSTANTS.FETCH_BACKOFF_MAX)
+                    self.logger.warning(f"Retrying {len(pendingUnits)}/{len(units)} failed units in {backoff} s (attempt {attempt}/{self.fetchRetries})")
+                    time.sleep(backoff)
+                pendingUnits = self.__runUnits(units, pendingUnits, unitResults, unitKeys, attributes, columnar, chunkQueue, packDone, patchIdentifications)
+                attempt += 1
+
+            complete = not pendingUnits
+            if not complete:
+                self.logger.critical(f"{len(pendingUnits)}/{len(units)} units of the query for attributes {attributes} could not be fetched"
+                                     + (". Fetching again resumes from the checkpoint" if unitKeys else ""))
+            elif unitKeys:
+                for unitKey in unitKeys:
+                    self.fetchCheckpoint.remove(unitKey)
+                self.__removePull(pullKey)
+
+            orderedResults = [unitResults[index] for index in sorted(unitResults)]
+            if columnar:
+                allResults = ColumnBatch.concatenate(orderedResults)
+            else:
+                allResults = [row for results in orderedResults for row in results]
+
+            # Only clean single attempt fetches are meaningful throughput measurements
+            if complete and attempt == 1 and len(packDone) == len(units):
+                packSeconds = [packDone[index] - startTime for index in range(len(units))]
+                self.queryPlanner.record(planKey, len(allResults), max(packSeconds), packSeconds, len(queries))
+
+            if cacheKey is not None and complete and queries:
+                self.queryCache.put(cacheKey, allResults, attributes)
 
             limit = options.get("limit") or self.limit
                     
@@ -229,8 +459,10 @@ class Database:
         except DatabaseError as de:
             self.logger.critical(str(de))
             return []
-        # finally:
-        #     self.pExecutor.shutdown()
+        finally:
+            if stream:
+                self.streamLock.release()
+            # self.pExecutor.shutdown()
             
         return allResults
     
@@ -239,8 +471,8 @@ class Database:
         executor = self.__executor()
         valid = True
         try:
-            idAndAddress__future = executor.submit(self.getFromDB, ["identification", "address"], options={
-                                                 "select_distinct": True, "not_null_values": ["identification", "address"]})
+            pendingFutures = list(self.backgroundFutures)
+            idAndAddress__future = executor.submit(self.__getKnownAddresses, pendingFutures)
             idAndAddress__future.add_done_callback(self.__actualizeKnownAddresses)
 
             self.backgroundFutures.append(idAndAddress__future)
@@ -252,28 +484,48 @@ class Database:
             self.logger.warning("Error occurred while actualizing known addresses \nERROR: " + str(esc))
             valid = False
         finally:
-            executor.shutdown()
+            executor.shutdown(wait=False)
 
         return valid
     
     def actualizeData(self) -> bool:
         self.logger.info("Actualizing database")
+        self.cancelled = False
         self.logger.progress(LOGGER_CONSTANTS.DATABASE, "Actualizing Database [0/2]")
         executor = self.__executor()
         valid = True
         try:
-            barAndIvv = self.getFromDB(["address", "timestamp", "bar", "ivv"], options={
-                "not_null_values": [self.validDBColumns["column_bar"], self.validDBColumns["column_ivv"]], "limit": int(int(self.limit) / 2)})
-            
-            self.logger.progress(LOGGER_CONSTANTS.DATABASE, "Actualizing Database [1/2]")
-            
-            self.__updatedUsedAddresses(barAndIvv)
+            columnar = self.resultFormat == DB_CONSTANTS.FORMAT_COLUMNS
+            signature = self.__syncSignature()
+            delta = self.incrementalSync and self.syncSignature == signature and len(self.data) > 0 and bool(self.highWaterMarks)
+            if delta:
+                self.logger.log("Incremental sync of rows newer than the last fetch")
+
+            if self.aggregateWindows:
+                barAndIvv, latAndLon = self.__fetchAggregated(columnar, delta, executor)
+            elif self.fusedFetch:
+                barAndIvv, latAndLon = self.__fetchFused(columnar, delta)
+            else:
+                barAndIvv, latAndLon = self.__fetchSeparately(columnar, delta, executor)
+
+            if not delta:
+                self.highWaterMarks = {"bar_ivv": (0, 0), "location": (0, 0)}
+            self.highWaterMarks["bar_ivv"] = self.__highWaterMark(barAndIvv, self.highWaterMarks["bar_ivv"])
+            self.highWaterMarks["location"] = self.__highWaterMark(latAndLon, self.highWaterMarks["location"])
+            self.syncSignature = signature
 
-            latAndlon__future = executor.submit(self.getFromDB, ["address", "timestamp", "latitude", "longitude"], options={
-                "not_null_values": ["latitude", "longitude"], "limit": int(int(self.limit) / 2)})
+            previousData = self.data if delta else []
+            if columnar:
+                self.data = ColumnBatch.concatenate([previousData, barAndIvv, latAndLon] if delta else [barAndIvv, latAndLon])
+            else:
+                self.data = previousData
+                self.data.extend(barAndIvv)
+                self.data.extend(latAndLon)
 
-            self.data = barAndIvv
-            self.data.extend(latAndlon__future.result())
+            if delta:
+                self.logger.log(f"Merged {len(barAndIvv) + len(latAndLon)} new rows")
+            if self.trimWindow:
+                self.data = self.__trimData(self.data)
 
             self.logger.progress(LOGGER_CONSTANTS.DATABASE, "Actualizing Database [2/2]")
             self.logger.success(f"Data actualized. Size: {len(self.data)}")
@@ -295,51 +547,494 @@ class Database:
 
         return valid
 
+    def snapshot(self, path: str) -> bool:
+        self.logger.info("Importing the filtered table slice into SQLite database " + path)
+        attributes = ["identification", "address", "timestamp", "latitude", "longitude", "bar", "ivv"]
+        # The identifications are copied as stored, without the ones the registry knows for the same address
+        rows = self.getFromDB(attributes, options={"default_filter_on": True, "all_addresses": True, "limit": self.limit, "cache": False, "raw_identification": True})
+        if not rows:
+            self.logger.warning("No rows to import into " + path)
+            return False
+
+        try:
+            importedRows = SQLiteBackend().importRows(path, self.login["table_name"], self.validDBColumns["column_bar"], self.validDBColumns["column_ivv"], rows)
+        except sqlite3.Error as sqle:
+            self.logger.critical("Could not import rows into " + path + " :: " + str(sqle))
+            return False
+
+        self.logger.success(f"Imported {importedRows} rows into {path}")
+        return True
+
+    def __fetchSeparately(self, columnar: bool, delta: bool, executor: concurrent.futures.ThreadPoolExecutor) -> Tuple[Union[List[Dict[str, Union[int, str]]], ColumnBatch], Union[List[Dict[str, Union[int, str]]], ColumnBatch]]:
+        barAndIvvOptions = {"not_null_values": [self.validDBColumns["column_bar"], self.validDBColumns["column_ivv"]], "limit": int(int(self.limit) / 2), "columnar": columnar}
+        if delta: barAndIvvOptions["since"] = self.highWaterMarks["bar_ivv"][0]
+        barAndIvv = self.getFromDB(self.__syncAttributes(["address", "timestamp", "bar", "ivv"]), options=barAndIvvOptions)
+        if delta: barAndIvv = self.__newerThan(barAndIvv, self.highWaterMarks["bar_ivv"])
+        
+        self.logger.progress(LOGGER_CONSTANTS.DATABASE, "Actualizing Database [1/2]")
+        
+        self.__updatedUsedAddresses(barAndIvv, keepPrevious=delta)
+
+        latAndLonOptions = {"not_null_values": ["latitude", "longitude"], "limit": int(int(self.limit) / 2), "columnar": columnar}
+        if delta: latAndLonOptions["since"] = self.highWaterMarks["location"][0]
+        latAndlon__future = executor.submit(self.getFromDB, self.__syncAttributes(["address", "timestamp", "latitude", "longitude"]), options=latAndLonOptions)
+        latAndLon = latAndlon__future.result()
+        if delta: latAndLon = self.__newerThan(latAndLon, self.highWaterMarks["location"])
+
+        return barAndIvv, latAndLon
+
+    def __fetchAggregated(self, columnar: bool, delta: bool, executor: concurrent.futures.ThreadPoolExecutor) -> Tuple[Union[List[Dict[str, Union[int, str]]], ColumnBatch], Union[List[Dict[str, Union[int, str]]], ColumnBatch]]:
+        # Aggregates are small, they are always computed over the whole filter, only location rows are synced incrementally
+        self.windowAggregates = self.__fetchWindowAggregates(int(int(self.limit) / 2))
+        barAndIvv = ColumnBatch() if columnar else []
+
+        self.logger.progress(LOGGER_CONSTANTS.DATABASE, "Actualizing Database [1/2]")
+
+        self.__updatedUsedAddresses([{"address": address} for address in self.windowAggregates], keepPrevious=delta)
+
+        latAndLonOptions = {"not_null_values": ["latitude", "longitude"], "limit": int(int(self.limit) / 2), "columnar": columnar}
+        if delta: latAndLonOptions["since"] = self.highWaterMarks["location"][0]
+        latAndLon = executor.submit(self.getFromDB, self.__syncAttributes(["address", "timestamp", "latitude", "longitude"]), options=latAndLonOptions).result()
+        if delta: latAndLon = self.__newerThan(latAndLon, self.highWaterMarks["location"])
+
+        return barAndIvv, latAndLon
+
+    def __fetchWindowAggregates(self, limit: int) -> Dict[int, Dict[str, Union[str, np.ndarray]]]:
+        attributes = ["address", "bucket", "count", "sumBar", "sumBar2", "sumIvv", "sumIvv2", "duration", "startTime"]
+        queries = self.__generateAggregateQueries(limit)
+
+        rows = []
+        threadedQueries = []
+        for query in queries:
+            DB_CONSTANTS.CONNECTIONS_TOTAL += 1
+            threadedQueries.append(self.pExecutor.submit(process.query, [query], attributes, DB_CONSTANTS.CONNECTIONS_TOTAL, self.__workerState(),
+                                                         endpoint=self.replicaPool.choose(), login=self.__taskLogin()))
+
+        for completedQuery in concurrent.futures.as_completed(threadedQueries):
+            try:
+                rows.extend(completedQuery.result())
+            except Exception as esc:
+                self.logger.critical("Error occurred while getting window aggregates: " + str(esc))
+
+        rowsPerAddress: Dict[int, List[Dict[str, Union[int, str]]]] = {}
+        for row in rows:
+            rowsPerAddress.setdefault(row["address"], []).append(row)
+
+        aggregates = {}
+        for address, addressRows in rowsPerAddress.items():
+            aggregates[address] = {"identification": self.knownIdents.get(address) or addressRows[0]["identification"]}
+            aggregates[address]["duration"] = max(float(row["duration"]) for row in addressRows)
+            aggregates[address]["startTime"] = self.__aggregateOrigin(addressRows[0]["startTime"])
+            aggregates[address]["bucket"] = np.array([int(row["bucket"]) for row in addressRows], dtype=np.int64)
+            for moment in attributes[2:-2]:
+                aggregates[address][moment] = np.array([float(row[moment]) for row in addressRows], dtype=np.float64)
+
+        self.logger.success(f"Window aggregates fetched: {len(rows)} buckets for {len(aggregates)} addresses")
+        return aggregates
+
+    def __aggregateOrigin(self, startTime: Union[int, str]) -> int:
+        # The window origin in ns like the row timestamps, SQLite gives MIN(timestamp) back as text
+        if isinstance(startTime, str):
+            startTime = QDateTime(datetime.fromisoformat(startTime)).toMSecsSinceEpoch() * 10**6
+        return int(startTime)
+
+    def __generateAggregateQueries(self, limit: int) -> List[QUERY]:
+        # COUNT, SUM and SUM of squares per address and 60 s window, windows start at the first bar/ivv row of each address
+        table = self.login["table_name"]
+        bar = f"{table}.{self.validDBColumns['column_bar']}"
+        ivv = f"{table}.{self.validDBColumns['column_ivv']}"
+
+        where = self.__adaptDefaultFilter("address", "timestamp", "bar", "ivv") if self.filterOn else QUERY(DB_CONSTANTS.EMPTY_FILTER, ())
+        where = self.__addFilter(f"{bar} IS NOT NULL", attribute="bar", target=where)
+        where = self.__addFilter(f"{ivv} IS NOT NULL", attribute="ivv", target=where)
+
+        # Same rows as the raw fetch, the first limit rows in time
+        cutoffTimestamp = self.__limitCutoff(where, limit)
+        if cutoffTimestamp is not None:
+            where = self.__addFilter(f"{table}.timestamp < %s", attribute="timestamp", target=where, params=(cutoffTimestamp,))
+            self.logger.log("Window aggregates limited to the first", limit, "bar/ivv rows, up to", cutoffTimestamp)
+
+        seconds = self.backend.secondsBetween("starts.startTime", f"{table}.timestamp")
+        selectStr = (f"SELECT {table}.address AS address, {self.backend.ceiling(seconds + ' / 60')} AS bucket, COUNT(*) AS count, "
+                     f"SUM({bar}) AS sumBar, SUM({bar} * {bar}) AS sumBar2, SUM({ivv}) AS sumIvv, SUM({ivv} * {ivv}) AS sumIvv2, MAX({seconds}) AS duration, MIN(starts.startTime) AS startTime ")
+
+        numShards = min(self.maxNumberThreads, multiprocessing.cpu_count() + 1)
+        queries = []
+        for i in range(numShards):
+            shardWhere = self.__addFilter(self.backend.modulo(f"{table}.address") + " = %s", attribute="address", target=where, params=(numShards, i))
+            fromStr = (f"FROM {table} JOIN (SELECT {table}.address AS startAddress, MIN({table}.timestamp) AS startTime FROM {table} "
+                       f"{shardWhere.statement} GROUP BY {table}.address) starts ON starts.startAddress = {table}.address ")
+            queries.append(QUERY(selectStr + fromStr + shardWhere.statement + f" GROUP BY {table}.address, bucket",
+                                 shardWhere.params + shardWhere.params))
+
+        for query in queries:
+            self.logger.debug(query.statement, query.params)
+        return queries
+
+    def __fetchFused(self, columnar: bool, delta: bool) -> Tuple[Union[List[Dict[str, Union[int, str]]], ColumnBatch], Union[List[Dict[str, Union[int, str]]], ColumnBatch]]:
+        # One scan for rows with bar/ivv OR lat/lon, split afterwards instead of two fan outs over the same table
+        fusedOptions = {
+            "not_null_groups": [
+                {"attributes": ["bar", "ivv"], "not_null_values": [self.validDBColumns["column_bar"], self.validDBColumns["column_ivv"]]},
+                {"attributes": ["latitude", "longitude"], "not_null_values": ["latitude", "longitude"]}
+            ],
+            "limit": int(self.limit),
+            "columnar": columnar,
+            "all_addresses": True
+        }
+        if delta: fusedOptions["since"] = min(mark[0] for mark in self.highWaterMarks.values())
+        fused = self.getFromDB(self.__syncAttributes(["address", "timestamp", "bar", "ivv", "latitude", "longitude"]), options=fusedOptions)
+
+        self.logger.progress(LOGGER_CONSTANTS.DATABASE, "Actualizing Database [1/2]")
+
+        barAndIvv, latAndLon = self.__splitFused(fused)
+        if delta:
+            barAndIvv = self.__newerThan(barAndIvv, self.highWaterMarks["bar_ivv"])
+            latAndLon = self.__newerThan(latAndLon, self.highWaterMarks["location"])
+
+        self.__updatedUsedAddresses(barAndIvv, keepPrevious=delta)
+
+        usedAddresses = set(self.usedAddresses)
+        if isinstance(latAndLon, ColumnBatch):
+            latAndLon = latAndLon.select(np.isin(latAndLon.columns["address"], list(usedAddresses)))
+        else:
+            latAndLon = [el for el in latAndLon if el["address"] in usedAddresses]
+
+        self.logger.log(f"Fused fetch split into {len(barAndIvv)} bar/ivv rows and {len(latAndLon)} location rows")
+        return barAndIvv, latAndLon
+
+    def __splitFused(self, fused: Union[List[Dict[str, Union[int, str]]], ColumnBatch]) -> Tuple[Union[List[Dict[str, Union[int, str]]], ColumnBatch], Union[List[Dict[str, Union[int, str]]], ColumnBatch]]:
+        if isinstance(fused, ColumnBatch):
+            barAndIvvMask = fused.valid["bar"] & fused.valid["ivv"]
+            locationMask = fused.valid["latitude"] & fused.valid["longitude"]
+            return fused.select(barAndIvvMask).withoutColumns("latitude", "longitude"), fused.select(locationMask).withoutColumns("bar", "ivv")
+
+        barAndIvv = []
+        latAndLon = []
+        for el in fused:
+            hasBarAndIvv = el["bar"] is not None and el["ivv"] is not None
+            hasLocation = el["latitude"] is not None and el["longitude"] is not None
+            if hasBarAndIvv:
+                barAndIvv.append(el if not hasLocation else {**el, "latitude": None, "longitude": None})
+            if hasLocation:
+                latAndLon.append(el if not hasBarAndIvv else {**el, "bar": None, "ivv": None})
+
+        return barAndIvv, latAndLon
+
+    def __getKnownAddresses(self, pendingFutures: List[concurrent.futures.Future]) -> Dict[int, str]:
+        # The cache key of this scan needs the table statistics fetched in the background
+        concurrent.futures.wait(pendingFutures)
+        return self.identRegistry.refresh(self.login, self.LAST_DB_UPDATE.toMSecsSinceEpoch() * 10**6, lambda since: self.getFromDB(["identification", "address"], options={
+                                          "select_distinct": True, "not_null_values": ["identification", "address"], "since": since}))
+
+    def __cacheKey(self, queries: List[QUERY], attributes: List[str], columnar: bool, latestId: int) -> Union[str, None]:
+        if not self.useCache or self.ROW_COUNT == 0:
+            return None
+        return self.queryCache.key(queries, attributes, *self.__fetchStamps(queries, columnar, latestId))
+
+    def __checkpointKeys(self, units: List[List[QUERY]], attributes: List[str], columnar: bool, idBounds: Tuple[int, int]) -> List[str]:
+        if not self.resumableFetch or self.ROW_COUNT == 0:
+            return []
+        # The frozen statements and id range only, the table statistics and the latest id move with every insert
+        return [self.fetchCheckpoint.key(unit, attributes, self.login["host_name"], self.login["db_name"], idBounds, *self.__statementStamps(unit, columnar))
+                for unit in units]
+
+    def __fetchStamps(self, queries: List[QUERY], columnar: bool, latestId: int) -> tuple:
+        # Results of the same statements are only reusable while the table did not change
+        return (self.login["host_name"], self.login["db_name"], self.ROW_COUNT, self.LAST_DB_UPDATE.toMSecsSinceEpoch(), latestId,
+                *self.__statementStamps(queries, columnar))
+
+    def __statementStamps(self, queries: List[QUERY], columnar: bool) -> tuple:
+        usedAddressStamp = hash(tuple(self.usedAddresses)) if any(DB_CONSTANTS.USED_ADDRESS_TABLE in query.statement for query in queries) else None
+        identStamp = self.identRegistry.highWaterMark if any(DB_CONSTANTS.IDENT_TABLE in query.statement for query in queries) else None
+        return DB_CONSTANTS.FORMAT_COLUMNS if columnar else DB_CONSTANTS.FORMAT_ROWS, usedAddressStamp, identStamp
+
+    def __latestId(self) -> int:
+        tables = [table for table, _, _ in self.partitions] or [self.login["table_name"]]
+        return max(self.tableStatistics.latestId({**self.login, "table_name": table}) for table in tables)
+
+    def __idBounds(self) -> Tuple[int, int]:
+        tables = [table for table, _, _ in self.partitions] or [self.login["table_name"]]
+        bounds = [self.tableStatistics.idBounds({**self.login, "table_name": table}) for table in tables]
+        return min(minId for minId, _ in bounds), max(maxId for _, maxId in bounds)
+
+    def __pullKey(self, attributes: List[str], options: Dict[str, str]) -> str:
+        # Everything that decides the statements of a pull but the moving timestamps of the table
+        pullStr = "\n".join([self.login["host_name"] or "", self.login["db_name"] or "", self.__syncSignature(), str(self.durationLimit), ",".join(attributes),
+                              ",".join(f"{key}={options[key]}" for key in sorted(options)), ",".join(table for table, _, _ in self.partitions)])
+        return hashlib.sha1(pullStr.encode("utf-8")).hexdigest()
+
+    def __pullPath(self, pullKey: str) -> str:
+        return os.path.join(MODE_S_CONSTANTS.APP_CHECKPOINT_PATH, pullKey + ".pull")
+
+    def __loadPull(self, pullKey: str) -> Union[Tuple[List[QUERY], List[List[QUERY]], Tuple[int, int]], None]:
+        try:
+            with open(self.__pullPath(pullKey), "rb") as pullFile:
+                pull = pickle.load(pullFile)
+        except FileNotFoundError:
+            return None
+        except Exception as esc:
+            self.logger.warning("Could not read the frozen pull " + pullKey + " :: " + str(esc))
+            self.__removePull(pullKey)
+            return None
+        return pull["queries"], pull["units"], pull["idBounds"]
+
+    def __storePull(self, pullKey: str, queries: List[QUERY], units: List[List[QUERY]], idBounds: Tuple[int, int]) -> None:
+        tempPath = self.__pullPath(pullKey) + ".tmp"
+        try:
+            with open(tempPath, "wb") as pullFile:
+                pickle.dump({"queries": queries, "units": units, "idBounds": idBounds}, pullFile)
+            os.replace(tempPath, self.__pullPath(pullKey))
+        except OSError as ose:
+            self.logger.warning("Could not freeze the pull " + pullKey + " :: " + str(ose))
+
+    def __removePull(self, pullKey: str) -> None:
+        try:
+            os.remove(self.__pullPath(pullKey))
+        except OSError:
+            pass
+
+    def __syncSignature(self) -> str:
+        # Every filter but the moving timestamp one decides whether previously fetched rows are still valid
+        filters = sorted(filterDict["filter"].strip() + str(filterDict["params"]) for filterDict in self.filterDictList if filterDict["attribute"] != "timestamp")
+        return " | ".join([self.login["table_name"] or "", self.validDBColumns["column_bar"], self.validDBColumns["column_ivv"], self.resultFormat] + filters)
+
+    def __syncAttributes(self, attributes: List[str]) -> List[str]:
+        # Ids tell rows of the same second apart, only the incremental sync needs them
+        return attributes + ["id"] if self.incrementalSync else attributes
+
+    def __highWaterMark(self, data: Union[List[Dict[str, Union[int, str]]], ColumnBatch], previous: Tuple[int, int]) -> Tuple[int, int]:
+        # Latest timestamp and highest id merged so far
+        if isinstance(data, ColumnBatch):
+            timestamps = data.columns["timestamp"][data.valid["timestamp"]].tolist()
+            ids = data.columns["id"][data.valid["id"]].tolist()
+        else:
+            timestamps = [el["timestamp"] for el in data if el["timestamp"] is not None]
+            ids = [el["id"] for el in data if el.get("id") is not None]
+        return (max(timestamps + [previous[0]]), max(ids + [previous[1]]))
+
+    def __newerThan(self, data: Union[List[Dict[str, Union[int, str]]], ColumnBatch], mark: Tuple[int, int]) -> Union[List[Dict[str, Union[int, str]]], ColumnBatch]:
+        # The since filter works on whole seconds. Rows of that second are new if they are later than the mark or were inserted after the last merged id
+        timestamp, rowId = mark
+        if isinstance(data, ColumnBatch):
+            return data.select((data.columns["timestamp"] > timestamp) | (data.valid["id"] & (data.columns["id"] > rowId)))
+        return [el for el in data if el["timestamp"] is not None and (el["timestamp"] > timestamp or (el.get("id") is not None and el["id"] > rowId))]
+
+    def __trimData(self, data: Union[List[Dict[str, Union[int, str]]], ColumnBatch]) -> Union[List[Dict[str, Union[int, str]]], ColumnBatch]:
+        cutoff = max(mark[0] for mark in self.highWaterMarks.values()) - int(self.trimWindow * 60 * 10**9)
+        sizeBefore = len(data)
+        if isinstance(data, ColumnBatch):
+            data = data.select(data.columns["timestamp"] >= cutoff)
+        else:
+            data = [el for el in data if el["timestamp"] is not None and el["timestamp"] >= cutoff]
+
+        if len(data) < sizeBefore:
+            self.logger.log(f"Trimmed {sizeBefore - len(data)} rows older than {self.trimWindow} minutes")
+        return data
+
+    def __acquireStream(self) -> bool:
+        # The queue is shared by the whole pool, only one fetch at a time reads it. A concurrent fetch (e.g. the identification scan) is not streamed
+        if self.streamChannel is None:
+            self.logger.warning("The process pool was started without a stream channel. Fetching without streaming")
+            return False
+        return self.streamLock.acquire(blocking=False)
+
+    def __abandonStream(self, chunkQueue: multiprocessing.Queue) -> None:
+        # Workers of every call so far stop at their next chunk, the queued chunks are dropped so no worker stays blocked on a full queue
+        self.streamChannel[1].value = DB_CONSTANTS.CONNECTIONS_TOTAL + 1
+        while True:
+            try:
+                chunkQueue.get_nowait()
+            except queue.Empty:
+                break
+
+    def __runUnits(self, units: List[List[QUERY]], indexes: List[int], unitResults: Dict[int, Union[List[Dict[str, Union[int, str]]], ColumnBatch]], unitKeys: List[str],
+                   attributes: List[str], columnar: bool, chunkQueue: queue.Queue, packDone: Dict[int, float], patchIdentifications: bool = True) -> List[int]:
+        # Runs the given units once and returns the indexes of the failed or timed out ones
+        startTime = time.perf_counter()
+        futures = {}
+        for index in indexes:
+            futures.update(self.__submitUnit(index, units[index], attributes, columnar, chunkQueue, patchIdentifications))
+
+        deadline = startTime + self.fetchTimeout if self.fetchTimeout else None
+        streamedChunks = self.__consumeStream(chunkQueue, futures, columnar, deadline) if chunkQueue is not None else {}
+
+        # Streamed units can not be hedged, their chunks are already consumed at this point
+        hedging = self.hedgeRequests and chunkQueue is None
+        hedgeFutures = set()
+        hedgeWins = 0
+        latencies = []
+        failedUnits = []
+        pending = set(futures)
+        while pending:
+            timeout = DB_CONSTANTS.HEDGE_POLL if hedging else None
+            if deadline:
+                timeout = max(min(timeout or self.fetchTimeout, deadline - time.perf_counter()), 0)
+            done, pending = concurrent.futures.wait(pending, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+
+            for completedQuery in done:
+                index, connectionTotal, endpoint, submitTime = futures[completedQuery]
+                try:
+                    results = completedQuery.result()
+                except Exception as esc:
+                    self.replicaPool.record(endpoint, 0, 0, succeeded=False)
+                    if any(futures[future][0] == index for future in pending):
+                        self.logger.warning(f"One copy of unit {index} failed, waiting for the other one :: " + str(esc))
+                    else:
+                        failedUnits.append(index)
+                        self.__logUnitError(attributes, esc)
+                    continue
+
+                if chunkQueue is not None:
+                    # Rows were already appended to one list per call, columnar chunks are joined once and dropped
+                    results = streamedChunks.pop(connectionTotal, [])
+                    if columnar:
+                        results = ColumnBatch.concatenate(results)
+                unitResults[index] = results
+                packDone[index] = time.perf_counter()
+                self.replicaPool.record(endpoint, len(results), packDone[index] - submitTime)
+                latencies.append(packDone[index] - startTime)
+                if completedQuery in hedgeFutures:
+                    hedgeWins += 1
+                if unitKeys:
+                    self.fetchCheckpoint.put(unitKeys[index], results, attributes)
+
+                # First copy wins, the other one is cancelled or its result ignored
+                for future in [future for future in pending if futures[future][0] == index]:
+                    future.cancel()
+                    pending.discard(future)
+
+            if pending and deadline and time.perf_counter() >= deadline:
+                # Running worker processes can not be interrupted, their results are ignored and the unit is fetched again
+                timedOut = {futures[future][0] for future in pending}
+                for future in pending:
+                    self.replicaPool.record(futures[future][2], 0, 0, succeeded=False)
+                self.logger.warning(f"{len(timedOut)} units did not finish within {self.fetchTimeout} s")
+                failedUnits.extend(timedOut)
+                break
+
+            if hedging and pending and len(latencies) >= max(int(DB_CONSTANTS.HEDGE_QUANTILE * len(indexes)), 1):
+                threshold = max(DB_CONSTANTS.HEDGE_FACTOR * float(np.median(latencies)), DB_CONSTANTS.HEDGE_MIN_SECONDS)
+                if time.perf_counter() - startTime > threshold:
+                    hedgedUnits = {futures[future][0] for future in hedgeFutures}
+                    for future in list(pending):
+                        index = futures[future][0]
+                        if index in hedgedUnits:
+                            continue
+                        self.logger.log(f"Hedging straggling unit {index} after {time.perf_counter() - startTime:.2f} s (median {np.median(latencies):.2f} s)")
+                        hedge = self.__submitUnit(index, units[index], attributes, columnar, None, patchIdentifications, exclude=[futures[future][2]])
+                        futures.update(hedge)
+                        hedgeFutures.update(hedge)
+                        pending.update(hedge)
+
+        self.__logTailLatency(latencies, len(indexes), len(hedgeFutures), hedgeWins)
+        if len(self.replicaPool.endpoints) > 1:
+            self.logger.log("Endpoint throughput ||", self.replicaPool.summary(), "||")
+        return failedUnits
+
+    def __submitUnit(self, index: int, unit: List[QUERY], attributes: List[str], columnar: bool, chunkQueue: queue.Queue, patchIdentifications: bool = True,
+                     exclude: List[int] = []) -> Dict[concurrent.futures.Future, Tuple[int, int, int, float]]:
+        # Returns the future with its unit index, query id, endpoint and submit time
+        DB_CONSTANTS.CONNECTIONS_TOTAL += 1
+        connectionTotal = DB_CONSTANTS.CONNECTIONS_TOTAL
+        endpoint = self.replicaPool.choose(exclude)
+        login = self.__taskLogin()
+        if chunkQueue is not None:
+            future = self.pExecutor.submit(process.streamQuery, unit, attributes, connectionTotal, self.__workerState(), self.streamChunkSize, columnar, endpoint=endpoint, login=login,
+                                           patchIdentifications=patchIdentifications)
+        elif columnar:
+            future = self.pExecutor.submit(process.queryColumnar, unit, attributes, connectionTotal, self.__workerState(), endpoint=endpoint, login=login,
+                                           patchIdentifications=patchIdentifications)
+        else:
+            future = self.pExecutor.submit(process.query, unit, attributes, connectionTotal, self.__workerState(), endpoint=endpoint, login=login,
+                                           patchIdentifications=patchIdentifications)
+        return {future: (index, connectionTotal, endpoint, time.perf_counter())}
+
+    def __logUnitError(self, attributes: List[str], esc: Exception) -> None:
+        if isinstance(esc, ConnectionError):
+            self.logger.critical("Error occurred while getting attributes " + str(attributes))
+            self.logger.critical(str(esc))
+        else:
+            self.logger.warning("Error occurred while getting attributes " + str(attributes) + "\nERROR: " + str(esc))
+
+    def __logTailLatency(self, latencies: List[float], numUnits: int, hedged: int, hedgeWins: int) -> None:
+        if not latencies:
+            return
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        self.logger.log(f"Unit latency over {len(latencies)}/{numUnits} units || p50: {p50:.2f} s | p90: {p90:.2f} s | p99: {p99:.2f} s | max: {max(latencies):.2f} s"
+                        f" | max/p50: {max(latencies) / p50 if p50 else 0:.1f} | hedged: {hedged} | hedges won: {hedgeWins} ||")
+
+    def __consumeStream(self, chunkQueue: queue.Queue, futures: Dict[concurrent.futures.Future, Tuple[int, int, int, float]], columnar: bool = False,
+                        deadline: float = None) -> Dict[int, Union[List[Dict[str, Union[int, str]]], List[ColumnBatch]]]:
+        # Chunks are tagged with the query id of their worker call, chunks of calls from earlier attempts are dropped
+        # Row chunks are merged into the rows of their call as they arrive, so no chunk outlives the next queue read
+        streamedChunks = {unit[1]: [] for unit in futures.values()}
+        pendingWorkers = len(futures)
+        while pendingWorkers > 0:
+            if deadline and time.perf_counter() > deadline:
+                self.logger.warning("Stream did not finish in time")
+                self.__abandonStream(chunkQueue)
+                break
+            try:
+                queryId, chunk = chunkQueue.get(timeout=DB_CONSTANTS.STREAM_TIMEOUT)
+            except queue.Empty:
+                if all(future.done() for future in futures):
+                    self.logger.warning("Stream ended before every database worker finished")
+                    self.__abandonStream(chunkQueue)
+                    break
+                continue
+
+            if queryId not in streamedChunks:
+                continue
+            if chunk is None:
+                pendingWorkers -= 1
+                continue
+
+            if columnar:
+                streamedChunks[queryId].append(chunk)
+            else:
+                streamedChunks[queryId].extend(chunk)
+
+        return streamedChunks
 
     def __executor(self) -> concurrent.futures.ThreadPoolExecutor: 
         ex = concurrent.futures.ThreadPoolExecutor(thread_name_prefix="database_workerThread")
         self.executors.append(ex)
         return ex
 
+    def setStatisticsStrategy(self, strategy: str = DB_CONSTANTS.STATS_ID_RANGE, ttl: float = DB_CONSTANTS.STATS_TTL) -> bool:
+        if strategy not in DB_CONSTANTS.STATS_STRATEGIES:
+            self.logger.warning("Unknown table statistics strategy " + str(strategy) + ". Using " + self.tableStatistics.strategy)
+            return False
+        self.tableStatistics.strategy = strategy
+        self.tableStatistics.ttl = ttl
+        self.logger.log("Table statistics strategy:", strategy, "cached for", ttl, "s")
+        return True
+
     def __testDBConnection(self):
-        db = MySQLConnection(
-            user=self.login.get("user_name"),
-            password=self.login.get("password"),
-            host=self.login.get("host_name", "127.0.0.1"),
-            port=self.login.get("db_port", 3306),
-            database=self.login.get("db_name")
-        )
+        db = self.backend.connect(self.login)
         
-        if db.is_connected():
+        if self.backend.isConnected(db):
             self.logger.success("Database accessible")
             db.close()
         else:
             raise DatabaseError("Database not accessible")  
     
-    def __getDBRowCount(self):
-        count= self.__query(f"SELECT COUNT(*) AS rowCount FROM {self.login['table_name']}", ["rowCount"])
-        self.ROW_COUNT = count[0]["rowCount"]
-
-        if self.ROW_COUNT == 0:
-            raise DatabaseError(f"Row count of Table {self.login['table_name']} should not be 0 !")
-        self.logger.log(f"Row Count for table {self.login['table_name']}: " + str(self.ROW_COUNT))
-
-    def __query(self, query: str, elements: List[str] = []) -> List[Dict[str, Union[int, str]]]:
+    def __query(self, query: str, elements: List[str] = [], params: tuple = (), usedAddresses: List[int] = None) -> List[Dict[str, Union[int, str]]]:
         allResults = []
         try:
-            db = MySQLConnection(
-                user=self.login.get("user_name"),
-                password=self.login.get("password"),
-                host=self.login.get("host_name", "127.0.0.1"),
-                port=self.login.get("db_port", 3306),
-                database=self.login.get("db_name")
-            )
+            db = self.backend.connect(self.login)
             
-            if not db.is_connected():
+            if not self.backend.isConnected(db):
                 raise DatabaseError(f"Database inaccessible")
 
-            q = db.cursor(dictionary=True)
-            q.execute(query)
+            if usedAddresses is not None:
+                # Probes of fetches joining the used addresses need the session table of the workers
+                self.backend.loadUsedAddresses(db, usedAddresses)
+
+            q = self.backend.cursor(db)
+            q.execute(self.backend.statement(query), params)
+            columnNames = self.backend.columnNames(q)
 
             absentColumns = []
             for el in DB_CONSTANTS.USED_COLUMNS:
@@ -347,6 +1042,7 @@ class Database:
                     absentColumns.append(el)
 
             for row in q:
+                row = dict(zip(columnNames, row))
                 entry = {abs: None for abs in absentColumns}
                 for el in elements:
                     value = row.get(el)
@@ -371,7 +1067,48 @@ class Database:
         finally:
             return allResults
     
-    def __generateQueries(self, attributes: List[str], options: Dict[str, str]) -> List[str]:
+    def __queryFilter(self, attributes: List[str], options: Dict[str, str]) -> QUERY:
+        # The row id of the incremental sync is selected only, it does not pull in the id filters
+        filterAttributes = [attrib for attrib in attributes if attrib != "id"]
+        where = QUERY(DB_CONSTANTS.EMPTY_FILTER, ())
+        if options.get("default_filter_on") is not None or self.filterOn:
+            where = self.__adaptDefaultFilter(*filterAttributes)
+        
+        notNullGroups = options.get("not_null_groups") or []
+        if notNullGroups:
+            groupAttributes = [attrib for group in notNullGroups for attrib in group["attributes"]]
+            filterOn = options.get("default_filter_on") is not None or self.filterOn
+            where = self.__adaptDefaultFilter(*[attrib for attrib in filterAttributes if attrib not in groupAttributes]) if filterOn else QUERY(DB_CONSTANTS.EMPTY_FILTER, ())
+            groupFilters = []
+            groupParams = ()
+            for group in notNullGroups:
+                groupFilter = self.__adaptDefaultFilter(*group["attributes"]) if filterOn else QUERY(DB_CONSTANTS.EMPTY_FILTER, ())
+                for attrib in group["not_null_values"]:
+                    groupFilter = self.__addFilter(f"{attrib} IS NOT NULL", attribute=attrib, target=groupFilter)
+                groupFilters.append("(" + groupFilter.statement[len(DB_CONSTANTS.EMPTY_FILTER):].strip() + ")")
+                groupParams += groupFilter.params
+            where = self.__addFilter("(" + " OR ".join(groupFilters) + ")", target=where, params=groupParams)
+
+        if options.get("not_null_values") is not None and len(options["not_null_values"]) > 0:
+            if self.__isIdentRun(options):
+                where = QUERY(DB_CONSTANTS.EMPTY_FILTER, ())
+            
+            for index, attrib in enumerate(options["not_null_values"]):
+                where = self.__addFilter(f"{attrib} IS NOT NULL", attribute=attrib, target=where)
+
+        # Also applies to the identification scan, the registry only reads rows newer than its last scan
+        if options.get("since"):
+            sinceTimestamp = QDateTime.fromMSecsSinceEpoch(int(options["since"] / 10**6)).toString("yyyy-MM-dd hh:mm:ss")
+            where = self.__addFilter(f"{self.login['table_name']}.timestamp >= %s", attribute="timestamp", target=where, params=(sinceTimestamp,))
+
+        # Rows inserted after the start of a resumable pull stay out of it
+        if options.get("id_bounds"):
+            where = self.__addFilter(f"{self.login['table_name']}.id >= %s", attribute="id", target=where, params=(options["id_bounds"][0],))
+            where = self.__addFilter(f"{self.login['table_name']}.id <= %s", attribute="id", target=where, params=(options["id_bounds"][1],))
+
+        return where
+
+    def __generateQueries(self, attributes: List[str], options: Dict[str, str], plannedSubQueries: int = None, table: str = None) -> List[QUERY]:
         selectStr = "SELECT "
         try:
             if options["select_distinct"]:
@@ -384,22 +1121,16 @@ class Database:
                 selectStr += f"{self.validDBColumns['column_bar']} AS bar"
             elif attrib == "ivv":
                 selectStr += f"{self.validDBColumns['column_ivv']} AS ivv"
+            elif attrib == "id":
+                selectStr += f"{self.login['table_name']}.id AS id"
+            elif attrib == "identification" and self.__joinsIdents(options):
+                selectStr += f"COALESCE({self.login['table_name']}.identification, {DB_CONSTANTS.IDENT_TABLE}.identification) AS identification"
             else:
                 selectStr += attrib
             selectStr += ", " if index < (len(attributes) - 1) else " "
 
-        whereStr = DB_CONSTANTS.EMPTY_FILTER
-        if options.get("default_filter_on") is not None or self.filterOn:
-            whereStr = self.__adaptDefaultFilter(*attributes)
-        
-        ident_run = False
-        if options.get("not_null_values") is not None and len(options["not_null_values"]) > 0:
-            if "identification" in options["not_null_values"] and "address" in options["not_null_values"]:
-                ident_run = True
-                whereStr = DB_CONSTANTS.EMPTY_FILTER
-            
-            for index, attrib in enumerate(options["not_null_values"]):
-                whereStr = self.__addFilter(f"{attrib} IS NOT NULL", attribute=attrib, target=whereStr)
+        where = self.__queryFilter(attributes, options)
+        ident_run = self.__isIdentRun(options)
 
         try:
             limit = options["limit"] if int(options["limit"]) <= self.ROW_COUNT else self.ROW_COUNT
@@ -409,6 +1140,8 @@ class Database:
         dividing = int(limit) > DB_CONSTANTS.MAX_ROW_BEFORE_LONG_DURATION
         numThread = max(int(int(limit) / DB_CONSTANTS.MAX_ROW_BEFORE_LONG_DURATION), self.preferedNumberThreads) if dividing else self.minNumberThreads
         numThread = min(numThread, self.maxNumberThreads)
+        if plannedSubQueries:
+            numThread = plannedSubQueries
 
         limitPerThread = int(int(limit)/numThread)
         if limitPerThread == 0: 
@@ -417,12 +1150,15 @@ class Database:
         
         rest = int(limit) % numThread
 
+        # Pagination bounds are bound parameters, all the sub queries share one prepared statement
         if not ident_run:
-            offsetStr = [(" LIMIT " + str(limitPerThread) + " OFFSET " + str(i * limitPerThread)) for i in range(numThread) ]
-            if rest : offsetStr.append(" LIMIT " + str(rest) + " OFFSET " + str(numThread * limitPerThread))
+            offsets = [QUERY(" LIMIT %s OFFSET %s", (limitPerThread, i * limitPerThread)) for i in range(numThread)]
+            if rest : offsets.append(QUERY(" LIMIT %s OFFSET %s", (rest, numThread * limitPerThread)))
         else:
-            offsetStr = [""] 
+            offsets = [QUERY("", ())]
             
+        addressSharding = not ident_run and self.partitionMode == DB_CONSTANTS.PARTITION_ADDRESS and numThread > 1
+
         orderStr = ""
         if not ident_run:
             orderStr = " ORDER BY timestamp "
@@ -430,59 +1166,148 @@ class Database:
                 orderStr += "DESC "
             else:
                 orderStr += "ASC "
+        if addressSharding:
+            orderStr = " ORDER BY address ASC, timestamp ASC "
 
-        self.logger.log(str(len(offsetStr))  + " sub queries for attributes", ", ".join(attrib for attrib in attributes))
+        self.logger.log(str(len(offsets))  + " sub queries for attributes", ", ".join(attrib for attrib in attributes))
+
+        usedAddressJoin = self.addressJoin and bool(self.usedAddresses) and not options.get("all_addresses") and not ident_run
+        fromStr = f" FROM {self.__tableExpression(table)} "
+        if usedAddressJoin:
+            # The workers load usedAddresses into this session table, the query text stays the same whatever the address count
+            fromStr += f"JOIN {DB_CONSTANTS.USED_ADDRESS_TABLE} USING (address) "
+        identJoinStr = self.__identJoin() if "identification" in attributes and self.__joinsIdents(options) else ""
+        fromStr += identJoinStr
 
         allUsedAddressFilter = []
-        if self.usedAddresses and len(self.usedAddresses) >= numThread:
+        inlineAddresses = not usedAddressJoin and self.usedAddresses and len(self.usedAddresses) >= numThread and not options.get("all_addresses")
+        if inlineAddresses and addressSharding:
+            # Grouped by MOD(address, n), a track never spans two sub queries
+            for i in range(numThread):
+                partialAddressList = [address for address in self.usedAddresses if address % numThread == i]
+                if not partialAddressList:
+                    continue
+                allUsedAddressFilter.append(self.__addFilter(" address IN (" + ",".join(
+                    "%s" for _ in partialAddressList) + ") ", target=where, params=tuple(partialAddressList)))
+            offsets = QUERY(" LIMIT %s", (int(limit / 2),)) # Same Limit for all
+        elif inlineAddresses:
             numAddressPerQuery = int(len(self.usedAddresses)/numThread)
             for i in range(numThread):
                 startIndex = i*numAddressPerQuery
                 endIndex = None if i == numThread - 1 else startIndex + numAddressPerQuery
                 partialAddressList = self.usedAddresses[startIndex: endIndex]
                 addressFilter = self.__addFilter(" address IN (" + ",".join(
-                    str(address) for address in partialAddressList) + ") ", target=whereStr)
+                    "%s" for _ in partialAddressList) + ") ", target=where, params=tuple(partialAddressList))
 
                 allUsedAddressFilter.append(addressFilter)
-                offsetStr = f" LIMIT {int(limit / 2)}" # Same Limit for all
+                offsets = QUERY(" LIMIT %s", (int(limit / 2),)) # Same Limit for all
                 
                 if endIndex is None and rest > 0:
                     allUsedAddressFilter.append(addressFilter) #Adding duplicate
     
         if allUsedAddressFilter:
-            queries = [(selectStr + f" FROM {self.login['table_name']} " + usedAddressFilter + orderStr + offsetStr) for usedAddressFilter in allUsedAddressFilter]
+            queries = [QUERY(selectStr + fromStr + usedAddressFilter.statement + orderStr + offsets.statement, usedAddressFilter.params + offsets.params) for usedAddressFilter in allUsedAddressFilter]
+        elif not ident_run and not usedAddressJoin and self.partitionMode == DB_CONSTANTS.PARTITION_KEYSET and len(offsets) > 1:
+            queries = self.__generateKeysetQueries(selectStr, where, numThread, int(limit), int(limit) >= self.__tableRows(table), table, identJoinStr)
+        elif addressSharding:
+            queries = self.__generateAddressShardQueries(selectStr, fromStr, where, orderStr, numThread, int(limit), usedAddressJoin, table)
         else:
-            queries = [(selectStr + f" FROM {self.login['table_name']} " + whereStr + orderStr + offset) for offset in offsetStr]
-
-        # queries = [(selectStr + f" FROM {self.login['table_name']} " + whereStr + orderStr + offset) for offset in offsetStr]
+            # Without any filter (e.g. a snapshot of the whole table) the bare WHERE is left out
+            whereStr = "" if where.statement == DB_CONSTANTS.EMPTY_FILTER else where.statement
+            queries = [QUERY(selectStr + fromStr + whereStr + orderStr + offset.statement, where.params + offset.params) for offset in offsets]
 
         for query in queries:
-            self.logger.debug(query)
+            self.logger.debug(query.statement, query.params)
+
+        return queries
+
+    def __generateKeysetQueries(self, selectStr: str, where: QUERY, numThread: int, limit: int, fullFetch: bool, table: str = None, joinStr: str = "") -> List[QUERY]:
+        # Disjoint id ranges instead of OFFSET pages: each sub query is an index range scan, no row is read to be discarded
+        tableExpression = self.__tableExpression(table)
+        probeFilter = "" if where.statement == DB_CONSTANTS.EMPTY_FILTER else where.statement
+        bounds = self.__query(f"SELECT MIN(id) AS minId, MAX(id) AS maxId FROM {tableExpression} {probeFilter}", ["minId", "maxId"], where.params)
+        if not bounds or bounds[0]["minId"] is None or bounds[0]["maxId"] is None:
+            self.logger.warning("Could not probe id bounds for keyset partitioning. No sub query generated")
+            return []
+
+        minId = int(bounds[0]["minId"])
+        maxId = int(bounds[0]["maxId"])
+        if not fullFetch:
+            # The id of the limit-th matching row closes the walk, the ranges hold the same first rows as the OFFSET pages
+            cutoff = self.__query(f"SELECT id FROM {tableExpression} {probeFilter} ORDER BY id ASC LIMIT 1 OFFSET %s", ["id"], where.params + (limit - 1,))
+            if cutoff and cutoff[0]["id"] is not None:
+                maxId = int(cutoff[0]["id"])
+
+        # Consecutive id spans from the first matching row, no range has a LIMIT that could cut it
+        numRanges = max(1, min(numThread, maxId - minId + 1))
+        idsPerRange = (maxId - minId + 1) / numRanges
+        self.logger.debug(f"Keyset partitioning between ids {minId} and {maxId} in {numRanges} ranges")
+
+        queries = []
+        for i in range(numRanges):
+            lowerId = minId + int(i * idsPerRange)
+            upperId = minId + int((i + 1) * idsPerRange) if i < numRanges - 1 else maxId + 1
+            rangeFilter = self.__addFilter(f"{self.login['table_name']}.id >= %s", attribute="id", target=where, params=(lowerId,))
+            rangeFilter = self.__addFilter(f"{self.login['table_name']}.id < %s", attribute="id", target=rangeFilter, params=(upperId,))
+            queries.append(QUERY(selectStr + f" FROM {tableExpression} " + joinStr + rangeFilter.statement + " ORDER BY id ASC", rangeFilter.params))
 
         return queries
 
+    def __generateAddressShardQueries(self, selectStr: str, fromStr: str, where: QUERY, orderStr: str, numThread: int, limit: int, usedAddressJoin: bool, table: str = None) -> List[QUERY]:
+        # MOD(address, n) shards of the rows the OFFSET pages would return: every shard holds whole tracks and has no LIMIT
+        tableName = self.login["table_name"]
+        if limit < self.__tableRows(table):
+            cutoffTimestamp = self.__limitCutoff(where, limit, table, usedAddressJoin)
+            if cutoffTimestamp is not None:
+                where = self.__addFilter(f"{tableName}.timestamp < %s", attribute="timestamp", target=where, params=(cutoffTimestamp,))
+        self.logger.debug(f"Address sharding in {numThread} shards")
+
+        queries = []
+        for i in range(numThread):
+            shardFilter = self.__addFilter(self.backend.modulo(f"{tableName}.address") + " = %s", attribute="address", target=where, params=(numThread, i))
+            queries.append(QUERY(selectStr + fromStr + shardFilter.statement + orderStr, shardFilter.params))
+
+        return queries
+
+    def __filteredRows(self, attributes: List[str], options: Dict[str, str], table: str) -> int:
+        # Rows of one partition the sub queries would read without a limit
+        where = self.__queryFilter(attributes, options)
+        # Joined or inlined, the used addresses restrict the rows the same way
+        usedAddresses = self.usedAddresses if self.usedAddresses and not options.get("all_addresses") else None
+        fromStr = f"FROM {self.__tableExpression(table)} " + (f"JOIN {DB_CONSTANTS.USED_ADDRESS_TABLE} USING (address) " if usedAddresses else "")
+        probeFilter = "" if where.statement == DB_CONSTANTS.EMPTY_FILTER else where.statement
+        count = self.__query(f"SELECT COUNT(*) AS rowCount {fromStr}{probeFilter}", ["rowCount"], where.params, usedAddresses)
+        return int(count[0]["rowCount"]) if count and count[0]["rowCount"] else 0
+
+    def __limitCutoff(self, where: QUERY, limit: int, table: str = None, usedAddressJoin: bool = False) -> Union[str, None]:
+        # One probe for the timestamp of the limit-th row in time, the rows before the returned bound are the first limit rows
+        fromStr = f"FROM {self.__tableExpression(table)} " + (f"JOIN {DB_CONSTANTS.USED_ADDRESS_TABLE} USING (address) " if usedAddressJoin else "")
+        probeFilter = "" if where.statement == DB_CONSTANTS.EMPTY_FILTER else where.statement
+        cutoff = self.__query(f"SELECT timestamp {fromStr}{probeFilter} ORDER BY timestamp ASC LIMIT 1 OFFSET %s", ["timestamp"], where.params + (max(limit - 1, 0),),
+                              self.usedAddresses if usedAddressJoin else None)
+        if not cutoff or cutoff[0]["timestamp"] is None:
+            return None
+        # Timestamps come back in Milliseconds, every row of that Millisecond is kept
+        return QDateTime.fromMSecsSinceEpoch(int(cutoff[0]["timestamp"] / 10**6) + 1).toString("yyyy-MM-dd hh:mm:ss.zzz")
+
     def __actualizeKnownAddresses(self, future: concurrent.futures.Future):
-        id_address: List[Dict[str, Union[int, str]]] = future.result()
-        self.addresses = []
-        self.knownIdents = {}
-        skippedAddresses = []
-        for el in id_address:
-            address = el["address"]
-            if address in self.addresses and not el["identification"].isalnum():
-                skippedAddresses.append(address)
-                continue
-            self.addresses.append(address)
-            self.knownIdents[address] = el["identification"]
+        self.knownIdents = dict(future.result())
+        self.addresses = list(self.knownIdents)
+        self.__publishWorkerState()
 
-        if len(skippedAddresses) > 0:
-            self.logger.warning("Skipping following addresses: " + str(skippedAddresses) + " :: Already added or invalid identification")
         self.logger.info("Known Addresses: " + str(len(self.addresses)))
     
-    def __updatedUsedAddresses(self, halfData: List[Dict[str, Union[int, str]]]) -> None:
-        self.usedAddresses = []
-        for el in halfData:
-            if el["address"] in self.usedAddresses: continue
-            self.usedAddresses.append(el["address"])
+    def __updatedUsedAddresses(self, halfData: Union[List[Dict[str, Union[int, str]]], ColumnBatch], keepPrevious: bool = False) -> None:
+        previousAddresses = self.usedAddresses if keepPrevious else []
+        self.usedAddresses = list(previousAddresses)
+        knownAddresses = set(previousAddresses)
+        if isinstance(halfData, ColumnBatch):
+            self.usedAddresses.extend(address for address in halfData.addresses().tolist() if address not in knownAddresses)
+        else:
+            for el in halfData:
+                if el["address"] in knownAddresses: continue
+                knownAddresses.add(el["address"])
+                self.usedAddresses.append(el["address"])
             
         if not self.usedAddresses:
             self.logger.warning("No address to update")
@@ -490,51 +1315,177 @@ class Database:
         
         # self.strFilter = self.__addFilter(" address IN (" + ",".join(str(address)
         #                  for address in self.usedAddresses) + ") ", attribute="address")
+
+        if self.addressJoin:
+            self.__publishWorkerState()
             
         self.logger.log("Updated database filter")
-        self.logger.debug(f"New filter is: {self.strFilter}")
+        self.logger.debug(f"New filter is: {self.strFilter.statement}", self.strFilter.params)
+
+    def __publishWorkerState(self) -> None:
+        # Workers of the process pool keep their own connection and only reload this state when its version changes
+        # Background callbacks publish too, the lock keeps the newest values in the highest version
+        with self.stateLock:
+            # With the identification join the workers load the registry into a session table once instead of patching rows
+            state = {"version": self.workerStateVersion + 1, "knownIdents": {} if self.identJoin else self.knownIdents,
+                     "joinedIdents": [(address, identification) for address, identification in self.knownIdents.items() if identification] if self.identJoin else [],
+                     "usedAddresses": list(self.usedAddresses) if self.addressJoin else [], "statementTimeout": self.statementTimeout}
+            tempPath = self.workerStatePath + ".tmp"
+            try:
+                with open(tempPath, "wb") as stateFile:
+                    pickle.dump(state, stateFile)
+                os.replace(tempPath, self.workerStatePath)
+            except OSError as ose:
+                self.logger.warning("Could not publish state for database workers: " + str(ose))
+                return
+
+            self.workerStateVersion = state["version"]
+        self.logger.debug("Published database worker state version", self.workerStateVersion)
 
-    def __getLattestDBTimeStamp(self):
-        time = self.getFromDB( ["timestamp"], options = {"not_null_values": ["timestamp"], "limit": 1})
-        if time:
-            self.LAST_DB_UPDATE = QDateTime.fromMSecsSinceEpoch(int(time[0]["timestamp"]) / 10**6)
+    def __workerState(self) -> Tuple[str, int]:
+        return (self.workerStatePath, self.workerStateVersion) if self.workerStateVersion else (None, 0)
+
+    def __removeWorkerState(self) -> None:
+        for path in (self.workerStatePath, self.workerStatePath + ".tmp"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as ose:
+                self.logger.warning("Could not remove state of database workers: " + str(ose))
+
+    def __connectionLogin(self, login: Dict[str, Union[str, int, list]]) -> Dict[str, Union[str, int, list]]:
+        # The keys the workers connect with
+        connectionLogin = {key: login.get(key) for key in DB_CONSTANTS.LOGIN_KEYS}
+        connectionLogin["backend"] = connectionLogin["backend"] or DB_CONSTANTS.BACKEND_MYSQL
+        return connectionLogin
+
+    def __taskLogin(self) -> Union[Dict[str, Union[str, int, list]], None]:
+        # Once the login differs from the one of the pool initializer, every task carries it in memory
+        login = self.__connectionLogin(self.login)
+        if login != self.poolLogin:
+            self.poolLogin = None
+        return login if self.poolLogin is None else None
+
+    def __isIdentRun(self, options: Dict[str, str]) -> bool:
+        notNullValues = options.get("not_null_values") or []
+        return "identification" in notNullValues and "address" in notNullValues
+
+    def __joinsIdents(self, options: Dict[str, str]) -> bool:
+        return self.identJoin and not self.__isIdentRun(options) and not options.get("raw_identification")
+
+    def __withIdentification(self, attributes: List[str], options: Dict[str, str]) -> List[str]:
+        # The joined identification replaces the registry the workers patched rows with
+        if self.__joinsIdents(options) and "address" in attributes and "identification" not in attributes:
+            return attributes + ["identification"]
+        return attributes
+
+    def __identJoin(self) -> str:
+        # The workers load the registry into this session table, every address gets the identification the registry kept
+        return f"LEFT JOIN {DB_CONSTANTS.IDENT_TABLE} ON {DB_CONSTANTS.IDENT_TABLE}.identAddress = {self.login['table_name']}.address "
+
+    def __tableRows(self, table: str = None) -> int:
+        for name, _, rows in self.partitions:
+            if name == table:
+                return rows
+        return self.ROW_COUNT
+
+    def __tableExpression(self, table: str = None) -> str:
+        # A partition is aliased to the table name, filters qualified with the table name apply to every partition
+        if table is None or table == self.login["table_name"]:
+            return self.login["table_name"]
+        return f"{table} AS {self.login['table_name']}"
+
+    def __loadPartitions(self) -> None:
+        self.partitions = []
+        pattern = self.login.get("table_pattern")
+        if not pattern:
+            return
+
+        statement, params = self.backend.tableNames(self.login)
+        for row in self.__query(statement, ["name"], params):
+            try:
+                # Names are wall clock times of the database like the row timestamps, both are read in the local time zone unless the pattern has a %z
+                start = datetime.strptime(row["name"], pattern).astimezone()
+            except ValueError:
+                continue
+            self.partitions.append((row["name"], int(start.timestamp() * 1000) * 10**6, 0))
+        self.partitions.sort(key=lambda partition: partition[1])
+
+        if not self.partitions:
+            raise DatabaseError(f"No table matches the partition pattern {pattern}")
+        self.logger.log(f"{len(self.partitions)} partitions matching {pattern}: {self.partitions[0][0]} .. {self.partitions[-1][0]}")
+
+    def __prunedPartitions(self, since: int = None) -> List[Tuple[str, int]]:
+        # A partition covers its start up to the start of the next one, only the ones overlapping [since, last update] are scanned
+        lowerBound = since or 0
+        if self.durationLimit:
+            lowerBound = max(lowerBound, self.LAST_DB_UPDATE.addSecs(-self.durationLimit * 60).toMSecsSinceEpoch() * 10**6)
+        upperBound = self.LAST_DB_UPDATE.toMSecsSinceEpoch() * 10**6
+
+        tables = []
+        for index, (table, start, rows) in enumerate(self.partitions):
+            end = self.partitions[index + 1][1] if index + 1 < len(self.partitions) else None
+            if (end is None or end > lowerBound) and start <= upperBound and rows > 0:
+                tables.append((table, rows))
+        if not tables and self.partitions:
+            tables = [(self.partitions[-1][0], self.partitions[-1][2])]
+        self.logger.log(f"Scanning {len(tables)}/{len(self.partitions)} partitions:", ", ".join(table for table, _ in tables))
+        return tables
+
+    def __getDBInformation(self):
+        self.__loadPartitions()
+        if self.partitions:
+            # Row count over all partitions, latest update from the newest one
+            for index, (table, start, _) in enumerate(self.partitions):
+                partitionRows, lastUpdate = self.tableStatistics.collect({**self.login, "table_name": table})
+                self.partitions[index] = (table, start, partitionRows)
+            rowCount = sum(rows for _, _, rows in self.partitions)
+        else:
+            rowCount, lastUpdate = self.tableStatistics.collect(self.login)
+        self.ROW_COUNT = rowCount
+
+        if self.ROW_COUNT == 0:
+            raise DatabaseError(f"Row count of Table {self.login['table_name']} should not be 0 !")
+        self.logger.log(f"Row Count for table {self.login['table_name']}: " + str(self.ROW_COUNT))
+
+        if lastUpdate:
+            self.LAST_DB_UPDATE = QDateTime.fromMSecsSinceEpoch(int(lastUpdate / 10**6))
             self.logger.log(f"Latest database {self.login['db_name']} update: " + self.LAST_DB_UPDATE.toString("yyyy-MM-dd hh:mm:ss"))
         else:
             self.logger.warning("Could not fetch latest database update. Using current date as latest update")
 
-    def __getDBInformation(self):
-        self.__getDBRowCount()
-        self.__getLattestDBTimeStamp()
-
     def __backgroundWorkFinished(self, future: concurrent.futures.Future):
         future.result()
         self.logger.progress(LOGGER_CONSTANTS.DATABASE, LOGGER_CONSTANTS.END_PROGRESS_BAR)
 
-    def __addFilter(self, filter, attribute=None, target=None):
+    def __addFilter(self, filter, attribute=None, target=None, params=()) -> QUERY:
         if target is None:
             self.filterOn = True
             target = self.strFilter
-            self.filterDictList.append({"attribute": attribute, "filter": filter})
+            self.filterDictList.append({"attribute": attribute, "filter": filter, "params": tuple(params)})
 
-        if target != DB_CONSTANTS.EMPTY_FILTER:
-            target += " AND "
+        statement = target.statement
+        if statement != DB_CONSTANTS.EMPTY_FILTER:
+            statement += " AND "
 
-        target += f" {filter} "
+        statement += f" {filter} "
         
-        self.logger.debug(f"Adding filter for attribute {attribute}: {filter}")
+        self.logger.debug(f"Adding filter for attribute {attribute}: {filter}", tuple(params))
         
-        return target
+        return QUERY(statement, target.params + tuple(params))
             
     def __resetFilter(self):
-        self.strFilter = DB_CONSTANTS.EMPTY_FILTER
+        self.strFilter = QUERY(DB_CONSTANTS.EMPTY_FILTER, ())
         self.filterOn = False
+        self.filterDictList = []
 
-    def __adaptDefaultFilter(self, *attributes) -> str:
-        adaptedFilter = DB_CONSTANTS.EMPTY_FILTER
+    def __adaptDefaultFilter(self, *attributes) -> QUERY:
+        adaptedFilter = QUERY(DB_CONSTANTS.EMPTY_FILTER, ())
         for filterDict in self.filterDictList:
             if filterDict["attribute"] in attributes:
-                adaptedFilter = self.__addFilter(filter=filterDict["filter"], target=adaptedFilter, attribute=filterDict["attribute"])
-        if adaptedFilter == DB_CONSTANTS.EMPTY_FILTER:
+                adaptedFilter = self.__addFilter(filter=filterDict["filter"], target=adaptedFilter, attribute=filterDict["attribute"], params=filterDict["params"])
+        if adaptedFilter.statement == DB_CONSTANTS.EMPTY_FILTER:
             self.logger.debug("No adapted filter")
         
         self.logger.debug(f"Using this adapted filter: {adaptedFilter}")
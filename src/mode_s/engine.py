@@ -5,15 +5,17 @@ import os
 import json
 import concurrent.futures
 from collections import Counter
-from typing import Any, List, Dict, Union
+from typing import Any, List, Dict, Tuple, Union
 
 import numpy as np
-from scipy.signal import medfilt
-from sklearn.neighbors import KernelDensity
 
 import mode_s.process as process
+from mode_s.batch import ColumnBatch
+from mode_s.shared import SharedDataset
+from mode_s.windows import SlidingWindows
+from mode_s.exceedance import exceedanceHistogram, kdeDensities
 from mode_s.logger import Logger
-from mode_s.constants import ENGINE_CONSTANTS, MODE_S_CONSTANTS, LOGGER_CONSTANTS
+from mode_s.constants import ENGINE_CONSTANTS, MODE_S_CONSTANTS, LOGGER_CONSTANTS, DB_CONSTANTS
 from mode_s.constants import DATA, WINDOW_POINT, WINDOW_DATA, LOCATION_DATA
 
 
@@ -25,7 +27,12 @@ class Engine:
 
     maxNumberThreads: int = ENGINE_CONSTANTS.MAX_NUMBER_THREADS_ENGINE
 
-    data: List[Dict[str, Union[str, float]]] = []
+    data: Union[List[Dict[str, Union[str, float]]], ColumnBatch] = []
+    groupIndex: Dict[int, Tuple[int, int]] = {}
+    groupCounts: Dict[int, int] = {}
+    windowAggregates: Dict[int, Dict[str, Union[str, np.ndarray]]] = {}
+    sharedDataset: SharedDataset = None
+    datasetHandle: Dict[str, Union[str, int, Dict[str, int]]] = None
     plots: Dict[str, bool] = {}
 
     executors: List[concurrent.futures.Executor] = []
@@ -41,6 +48,7 @@ class Engine:
 
     def __init__(self, logger: Logger):
         self.logger: Logger = logger
+        self.sharedDataset = SharedDataset(logger)
 
     def setProcessExecutor(self, ex: concurrent.futures.ProcessPoolExecutor):
         self.pExecutor = ex
@@ -48,6 +56,8 @@ class Engine:
     def cancel(self) -> True:
         for ex in self.executors:
             ex.shutdown(wait=False)
+        self.datasetHandle = None
+        self.sharedDataset.release()
         return True
 
     def setEngineParameters(self, **params):
@@ -105,13 +115,25 @@ class Engine:
 
         self.plots = plots
 
-    def setDataSet(self, dataset: List[Dict[str, Union[str, int]]]):
-        self.data = sorted(dataset, key=lambda el: el["address"])
+    def setDataSet(self, dataset: Union[List[Dict[str, Union[str, int]]], ColumnBatch]):
+        if isinstance(dataset, ColumnBatch):
+            self.data = dataset.sortedByAddress()
+        else:
+            self.data = sorted(dataset, key=lambda el: el["address"])
+        self.__buildGroupIndex()
+        # Published on first use by a pool stage
+        self.datasetHandle = None
+        self.sharedDataset.release()
 
         # import json
         # with open("engine.dump.json", "w") as dbd:
         #     json.dump(self.data, dbd)
 
+    def setWindowAggregates(self, aggregates: Dict[int, Dict[str, Union[str, np.ndarray]]]):
+        self.windowAggregates = aggregates or {}
+        if self.windowAggregates:
+            self.logger.log("Using window aggregates of", len(self.windowAggregates), "addresses for sliding intervals")
+
     def compute(self, usePlotter=True) -> None:
         try:
             self.logger.info("Starting Engine")
@@ -123,7 +145,7 @@ class Engine:
                     self.logger.progress(LOGGER_CONSTANTS.ENGINE, LOGGER_CONSTANTS.END_PROGRESS_BAR)
                     raise EngineError("Engine has no data to compute")
                 else:
-                    self.data = dumpDB
+                    self.setDataSet(dumpDB)
             if usePlotter and not any(self.plots.values()):
                 return
 
@@ -170,12 +192,18 @@ class Engine:
                 
             self.logger.progress(LOGGER_CONSTANTS.ENGINE, "Computing [2/11]")
                 
-            data = self.prepareBarAndIvvAndTime(addressesToPlot)
+            if self.windowAggregates:
+                # Bar and ivv were aggregated by the database, there are no raw rows to plot or filter
+                self.logger.info("Using window aggregates. Skipping the raw and filtered bar and ivv stages")
+                data = []
+            else:
+                data = self.prepareBarAndIvvAndTime(addressesToPlot)
 
             if activePlots["bar_ivv"]:
                 if usePlotter:
-                    self.logger.info("Plotting bar and ivv on time")
-                    plotted.append(Plotter.plotBarAndIvv(data))
+                    if not self.windowAggregates:
+                        self.logger.info("Plotting bar and ivv on time")
+                        plotted.append(Plotter.plotBarAndIvv(data))
                 else:
                     self.logger.info("Getting lineSeries for raw bar & ivv")
                     lineSeriesBarIvv = Analysis.getLineSeriesBarAndIvv(data)
@@ -184,13 +212,16 @@ class Engine:
             self.logger.progress(LOGGER_CONSTANTS.ENGINE, "Computing [3/11]")
 
             if usePlotter:
-                if activePlots["filtered"] and not activePlots["std"]:
+                if activePlots["filtered"] and not activePlots["std"] and not self.windowAggregates:
                     self.prepareMedianFilter(data)
                     self.logger.info("Plotting filtered bar and ivv on time")
                     plotted.append(Plotter.plotFilteredBarAndIvv(data))
 
             if activePlots["interval"]:
-                slidingIntervals = self.prepareSlidingInterval(data)
+                if self.windowAggregates:
+                    slidingIntervals = self.prepareSlidingIntervalFromAggregates(addressesToPlot)
+                else:
+                    slidingIntervals = self.prepareSlidingInterval(data)
                 if usePlotter:
                     self.logger.info("Plotting sliding Intervals")
                     plotted.append(Plotter.plotSlidingInterval(slidingIntervals))
@@ -211,9 +242,12 @@ class Engine:
 
                 self.logger.progress(LOGGER_CONSTANTS.ENGINE, "Computing [5/11]")
 
-                slidingIntervalForStd = self.prepareSlidingIntervalForStd(data) 
+                if self.windowAggregates:
+                    slidingIntervalForStd = self.prepareSlidingIntervalForStdFromAggregates(addressesToPlot)
+                else:
+                    slidingIntervalForStd = self.prepareSlidingIntervalForStd(data) 
                 if usePlotter:
-                    if activePlots["filtered"]:
+                    if activePlots["filtered"] and not self.windowAggregates:
                         self.logger.info("Plotting filtered data and standard deviations")
                         plotted.append(Plotter.plotFilteredAndStd(filteredData=data, stdData=slidingIntervalForStd))
                     else:
@@ -249,7 +283,9 @@ class Engine:
             if activePlots["heat_map"]:
                 if not activePlots["filtered"] and not activePlots["std"]:
                     self.prepareMedianFilter(data)
-                if not activePlots["std"]:
+                if not activePlots["std"] and self.windowAggregates:
+                    slidingIntervalForStd = self.prepareSlidingIntervalForStdFromAggregates(addressesToPlot)
+                elif not activePlots["std"]:
                     slidingIntervalForStd = self.prepareSlidingIntervalForStd(data)
                 if not activePlots["location"]:
                     location = self.prepareLocation(addressesToPlot)
@@ -327,7 +363,10 @@ class Engine:
 
     def prepareOccurrencesForAddresses(self, returnValue="datapoint") -> Union[List[Union[int, str]], List[int]]:
         self.logger.log("Computing Occurrences for Addresses")
-        dataPointsCounter = Counter([entry["address"] for entry in self.data])
+        dataPointsCounter = Counter(self.groupCounts)
+        if self.windowAggregates:
+            # The data set only holds the location rows, the bar/ivv rows are counted in the aggregates
+            dataPointsCounter.update({address: int(aggregate["count"].sum()) for address, aggregate in self.windowAggregates.items()})
         if returnValue != "datapoint":
             return [mostCommonAddress[0] for mostCommonAddress in dataPointsCounter.most_common() if mostCommonAddress[1] > self.minDataPoints]
 
@@ -343,14 +382,17 @@ class Engine:
         maxProcesses = min(len(addresses), multiprocessing.cpu_count() + 1) or 1
         addressesPerProcess = int(len(addresses) / maxProcesses)
         
-        executor = self.__executor()
+        executor = self.pExecutor or self.__executor()
+        dataset = self.__publishedDataset()
         for i in range(maxProcesses):
             startIndex = i*addressesPerProcess
             endIndex = startIndex + addressesPerProcess if i < maxProcesses - 1 else None
             pack = addresses[startIndex : endIndex]
             if not pack:
                 continue
-            addressData__futures.append(executor.submit(process.getRawData, pack, self.data))
+            groupSlices = self.__groupSlices(pack)
+            identifications = {address: self.__identification(address, groupStart) for address, (groupStart, groupEnd) in groupSlices.items()}
+            addressData__futures.append(executor.submit(process.getRawData, pack, dataset, groupSlices, identifications))
             
         for completedThread in concurrent.futures.as_completed(addressData__futures):
             try:
@@ -362,123 +404,226 @@ class Engine:
                 self.logger.critical(
                     "Error occurred while computing raw data for addresses\n" + str(type) + "::" + str(value))
             else:
+                for rawData in addressData:
+                    rawData["points"] = list(map(DATA._make, zip(rawData["times"].tolist(), rawData["bars"].tolist(), rawData["ivvs"].tolist())))
                 plotData.extend(addressData)
-            finally:
-                executor.shutdown()
-        
+
+        if executor is not self.pExecutor:
+            executor.shutdown()
 
         return plotData
 
     def prepareMedianFilter(self, data: List[Dict[str, Union[str, List[DATA]]]]) -> None:
         self.logger.log("Filtering data with n set to: " + str(self.medianN))
-        executor = self.__executor()
-        filteredAddressData__futures = [executor.submit(
-            self.__applyMedianFilter, addressData) for addressData in data]
+        validData = []
+        for addressData in data:
+            if not addressData["points"]:
+                self.logger.warning("Skipping address " + str(addressData["address"]) + " : Invalid bar or ivv for median filter")
+                continue
+            validData.append(addressData)
+        if not validData:
+            return
+
+        # bar and ivv of all tracks one after another, filtered into one preallocated array
+        lengths = np.array([len(addressData["points"]) for addressData in validData], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        values = np.empty((int(offsets[-1]), 2), dtype=np.float64)
+        for addressData, start, end in zip(validData, offsets[:-1].tolist(), offsets[1:].tolist()):
+            values[start:end, 0], values[start:end, 1] = self.__valueColumns(addressData)
+        filtered = np.empty_like(values)
+
+        # A track shorter than n uses its longest odd length as kernel, tracks sharing a kernel are filtered together
+        kernels = np.minimum(self.medianN, np.where(lengths % 2 == 1, lengths, lengths - 1))
+        rowKernels = np.repeat(kernels, lengths)
+        futures = []
+        for kernel in np.unique(kernels).tolist():
+            rows = np.flatnonzero(rowKernels == kernel)
+            kernelLengths = lengths[kernels == kernel]
+            if self.pExecutor is None or len(rows) < ENGINE_CONSTANTS.MEDIAN_PROCESS_POINTS:
+                filtered[rows] = process.medianFilterSegments(values[rows], kernelLengths, kernel)
+                continue
+
+            # Chunks end on track boundaries, so no chunk needs the rows of its neighbours
+            numChunks = min(multiprocessing.cpu_count() + 1, len(kernelLengths))
+            chunkEnds = np.searchsorted(np.cumsum(kernelLengths), np.linspace(0, len(rows), numChunks + 1)[1:], side="left") + 1
+            chunkStarts = np.concatenate(([0], chunkEnds[:-1]))
+            kernelOffsets = np.concatenate(([0], np.cumsum(kernelLengths)))
+            for chunkStart, chunkEnd in zip(chunkStarts.tolist(), chunkEnds.tolist()):
+                if chunkStart >= chunkEnd:
+                    continue
+                chunkRows = rows[kernelOffsets[chunkStart]:kernelOffsets[chunkEnd]]
+                chunk = (values[chunkRows], kernelLengths[chunkStart:chunkEnd], kernel)
+                futures.append((chunkRows, chunk, self.pExecutor.submit(process.medianFilterSegments, *chunk)))
 
-        for completedThread in concurrent.futures.as_completed(filteredAddressData__futures):
+        for chunkRows, chunk, future in futures:
             try:
-                completedThread.result()
-            except EngineError as e:
-                self.logger.warning(str(e))
+                filtered[chunkRows] = future.result()
             except Exception as esc:
                 type, value, traceback = sys.exc_info()
-                self.logger.critical(
-                    "Error occurred while filtering data for addresses\n" + str(type) + "::" + str(value))
+                self.logger.warning(
+                    "Error occurred while filtering data for addresses in the process pool, filtering them here\n" + str(type) + "::" + str(value))
+                filtered[chunkRows] = process.medianFilterSegments(*chunk)
 
-        executor.shutdown()
+        for addressData, start, end in zip(validData, offsets[:-1].tolist(), offsets[1:].tolist()):
+            addressData["filteredBars"] = filtered[start:end, 0]
+            addressData["filteredIvvs"] = filtered[start:end, 1]
 
     def prepareSlidingInterval(self, data: List[Dict[str, Union[str, List[DATA]]]]) -> List[Dict[str, Union[str, List[WINDOW_POINT]]]]:
         self.logger.log("Computing sliding intervals")
-        slidingIntervals = []
-        executor = self.__executor()
-        slidingInterval__futures = [executor.submit(
-            self.__getSlidingIntervalForAddress, addressData) for addressData in data]
+        validData = []
+        for addressData in data:
+            if not addressData["points"]:
+                self.logger.warning("Skipping address " + str(addressData["address"]) + " : Invalid time for sliding interval")
+                continue
+            validData.append(addressData)
 
-        for completedThread in concurrent.futures.as_completed(slidingInterval__futures):
-            try:
-                slidingIntervalForAddress = completedThread.result()
-            except EngineError as e:
-                self.logger.warning(str(e))
-            except Exception as esc:
-                type, value, traceback = sys.exc_info()
-                self.logger.critical(
-                    "Error occurred while preparing sliding intervals for addresses\n" + str(type) + "::" + str(value))
-            else:
-                if slidingIntervalForAddress: slidingIntervals.append(slidingIntervalForAddress)
-                
-        executor.shutdown()
+        windows = SlidingWindows([self.__timeColumn(addressData) for addressData in validData])
+        slidingIntervals = []
+        for addressData, counts in zip(validData, windows.split(windows.counts)):
+            slidingIntervals.append({
+                "address": addressData["address"],
+                "identification": addressData.get("identification"),
+                "points": [WINDOW_POINT(float(window), int(count)) for window, count in enumerate(counts.tolist())]
+            })
         return slidingIntervals
     
     def prepareSlidingIntervalForStd(self, data: List[Dict[str, Union[str, List[DATA]]]]) -> List[Dict[str, Union[str, List[WINDOW_DATA], float]]]:
+        # One pass over the filtered points of all addresses, the windows come from the unfiltered times
         self.logger.log("Computing sliding intervals for std")
+        validData = []
+        for addressData in data:
+            if "filteredBars" not in addressData or not addressData["points"]:
+                self.logger.warning("Skipping address " + str(addressData["address"]) + " : No filtered points for sliding interval per std")
+                continue
+            validData.append(addressData)
+
+        windows = SlidingWindows([self.__timeColumn(addressData) for addressData in validData])
+        barStds = windows.stds(np.concatenate([addressData["filteredBars"] for addressData in validData]) if validData else np.zeros(0))
+        ivvStds = windows.stds(np.concatenate([addressData["filteredIvvs"] for addressData in validData]) if validData else np.zeros(0))
+        thresholds = windows.thresholds(barStds, ivvStds).tolist()
+
         slidingIntervalForStd = []
-        executor = self.__executor()
-        slidingInterval__futures = [executor.submit(
-            self.__getSlidingIntervalForStdPerAddress, addressData) for addressData in data]
+        for index, (addressData, addressBarStds, addressIvvStds) in enumerate(zip(validData, windows.split(barStds), windows.split(ivvStds))):
+            slidingIntervalForStd.append({
+                "address": addressData["address"],
+                "identification": addressData.get("identification"),
+                "points": [WINDOW_DATA(float(window), barStd, ivvStd) for window, (barStd, ivvStd) in enumerate(zip(addressBarStds.tolist(), addressIvvStds.tolist()))],
+                "threshold": thresholds[index]
+            })
+        return slidingIntervalForStd
 
-        for completedThread in concurrent.futures.as_completed(slidingInterval__futures):
-            try:
-                slidingIntervalForStdPerAddress = completedThread.result()
-            except EngineError as e:
-                self.logger.warning(str(e))
-            except Exception as esc:
-                type, value, traceback = sys.exc_info()
-                self.logger.critical(
-                    "Error occurred while preparing sliding interval for std per addresses\n" + str(type) + "::" + str(value))
-            else:
-                if slidingIntervalForStdPerAddress: slidingIntervalForStd.append(slidingIntervalForStdPerAddress)
+    def prepareSlidingIntervalFromAggregates(self, addresses: List[int]) -> List[Dict[str, Union[str, List[WINDOW_POINT]]]]:
+        self.logger.log("Computing sliding intervals from window aggregates")
+        slidingIntervals = []
+        for address in addresses:
+            aggregate = self.windowAggregates.get(address)
+            if aggregate is None:
+                self.logger.warning("Skipping address " + str(address) + " : No window aggregates")
+                continue
+            counts = self.__windowMoments(aggregate, "count")
+            slidingIntervals.append({
+                "address": address,
+                "identification": aggregate.get("identification"),
+                "points": [WINDOW_POINT(float(window), int(count)) for window, count in enumerate(counts)]
+            })
+        return slidingIntervals
 
-        executor.shutdown()
+    def prepareSlidingIntervalForStdFromAggregates(self, addresses: List[int]) -> List[Dict[str, Union[str, List[WINDOW_DATA], float]]]:
+        # Population std of the raw (not median filtered) values of each window from its COUNT, SUM and SUM of squares
+        self.logger.log("Computing sliding intervals for std from window aggregates")
+        slidingIntervalForStd = []
+        windowStds = []
+        for address in addresses:
+            aggregate = self.windowAggregates.get(address)
+            if aggregate is None:
+                self.logger.warning("Skipping address " + str(address) + " : No window aggregates")
+                continue
+
+            counts = self.__windowMoments(aggregate, "count")
+            barStds = self.__stdFromMoments(counts, self.__windowMoments(aggregate, "sumBar"), self.__windowMoments(aggregate, "sumBar2"))
+            ivvStds = self.__stdFromMoments(counts, self.__windowMoments(aggregate, "sumIvv"), self.__windowMoments(aggregate, "sumIvv2"))
+
+            slidingIntervalForStd.append({
+                "address": address,
+                "identification": aggregate.get("identification"),
+                "points": [WINDOW_DATA(float(window), float(barStds[window]), float(ivvStds[window])) for window in range(len(counts))]
+            })
+            windowStds.append((barStds, ivvStds))
+
+        # Same threshold rule as the raw windows, for all addresses at once
+        numWindows = np.array([len(barStds) for barStds, _ in windowStds], dtype=np.int64)
+        thresholds = SlidingWindows.segmentThresholds(numWindows,
+                                                      np.concatenate([barStds for barStds, _ in windowStds] + [np.zeros(0)]),
+                                                      np.concatenate([ivvStds for _, ivvStds in windowStds] + [np.zeros(0)])).tolist()
+        for addressData, threshold in zip(slidingIntervalForStd, thresholds):
+            addressData["threshold"] = threshold
         return slidingIntervalForStd
 
     def prepareExceedingData(self, data: List[Dict[str, Union[str, List[DATA]]]]) -> List[Dict[str, Union[str, List[WINDOW_DATA], float]]]:
+        # Bucket histograms per address, the densities of all addresses with exceeds come from one matrix product
         self.logger.log("Computing exceeding data")
         exceedingData = []
-        executor = self.__executor()
-        exceedingData__futures = [executor.submit(
-            self.__getExceedingDataPerAddress, addressData) for addressData in data]
+        smoothedData = []
+        histograms = []
+        for addressData in data:
+            exceedingDataPerAddress: Dict[str, Union[str, Dict[str, int], List[float]]] = {
+                "address": addressData["address"],
+                "identification": addressData.get("identification"),
+                "distribution": {str(bucket): 0 for bucket in ENGINE_CONSTANTS.EXCEEDANCE_BUCKETS},
+                "smoothed": []
+            }
+            exceedingData.append(exceedingDataPerAddress)
+
+            threshold = addressData["threshold"]
+            if threshold is False:
+                self.logger.warning(f"No Threshold for address {addressData['address']}")
+                continue
 
-        for completedThread in concurrent.futures.as_completed(exceedingData__futures):
-            try:
-                exceedingDataPerAddress = completedThread.result()
-            except EngineError as e:
-                self.logger.warning(str(e))
-            except Exception as esc:
-                type, value, traceback = sys.exc_info()
-                self.logger.critical(
-                    "Error occurred while preparing exceeding data per addresses\n" + str(type) + "::" + str(value))
-            else:
-                if exceedingDataPerAddress: exceedingData.append(exceedingDataPerAddress)
+            histogram = exceedanceHistogram([point.bar - point.ivv for point in addressData["points"]], threshold)
+            exceedingDataPerAddress["distribution"] = {str(bucket): int(count) for bucket, count in zip(ENGINE_CONSTANTS.EXCEEDANCE_BUCKETS, histogram.tolist())}
+            if histogram.any():
+                smoothedData.append(exceedingDataPerAddress)
+                histograms.append(histogram)
+
+        for exceedingDataPerAddress, density in zip(smoothedData, kdeDensities(histograms, self.kdeBW)):
+            exceedingDataPerAddress["smoothed"] = density.tolist()
 
-        executor.shutdown()
         return exceedingData
 
     def prepareLocation(self, addresses: List[int] = []) -> List[Dict[str, Union[str, List[LOCATION_DATA]]]]:
         self.logger.log("Computing locations")
         allLocationData = []
         
-        addressPoints: List[LOCATION_DATA] = []
-         
-        for index in range(len(self.data)):
-            if self.data[index]["address"] not in addresses: continue
-            time = self.data[index]["timestamp"]
-            longitude = self.data[index]["longitude"]
-            latitude = self.data[index]["latitude"]
-            
-            if longitude is None or latitude is None : continue
+        # Same address order as the data set, only the slices of the requested addresses are read
+        for address, (startIndex, endIndex) in sorted(self.__groupSlices(addresses).items()):
+            addressPoints: List[LOCATION_DATA] = []
+            if isinstance(self.data, ColumnBatch):
+                # Column slices, no row dicts
+                located = self.data.valid["longitude"][startIndex:endIndex] & self.data.valid["latitude"][startIndex:endIndex]
+                times = self.data.columns["timestamp"][startIndex:endIndex][located]
+                order = np.argsort(times, kind="stable")
+                addressPoints = list(map(LOCATION_DATA,
+                    times[order].tolist(),
+                    self.data.columns["longitude"][startIndex:endIndex][located][order].tolist(),
+                    self.data.columns["latitude"][startIndex:endIndex][located][order].tolist()))
+            else:
+                for index in range(startIndex, endIndex):
+                    time = self.data[index]["timestamp"]
+                    longitude = self.data[index]["longitude"]
+                    latitude = self.data[index]["latitude"]
 
-            addressPoints.append(LOCATION_DATA(time, longitude, latitude))
+                    if longitude is None or latitude is None : continue
 
-            if index == len(self.data) - 1 or self.data[index]["address"] != self.data[index + 1]["address"]:
+                    addressPoints.append(LOCATION_DATA(time, longitude, latitude))
                 addressPoints.sort(key=lambda el: el.time)
 
-                allLocationData.append({
-                    "address": self.data[index]["address"],
-                    "identification": self.data[index].get("identification"),
-                    "points": addressPoints
-                })
-                
-                addressPoints = []
+            if not addressPoints: continue
+
+            allLocationData.append({
+                "address": address,
+                "identification": self.__identification(address, startIndex),
+                "points": addressPoints
+            })
         
         return allLocationData
     
@@ -490,14 +635,17 @@ class Engine:
         maxProcesses = min(len(slidingIntervallForStd), multiprocessing.cpu_count() + 1) or 1
         addressDataPerProcess = int(len(slidingIntervallForStd) / maxProcesses)
 
-        executor = self.__executor()
+        executor = self.pExecutor or self.__executor()
+        dataset = self.__publishedDataset()
         for i in range(maxProcesses):
             startIndex = i*addressDataPerProcess
             endIndex = startIndex + addressDataPerProcess if i < maxProcesses - 1 else None
             pack = slidingIntervallForStd[startIndex : endIndex]
             if not pack:
                 continue
-            heatPoints__future.append(executor.submit(process.getHeatPoints, pack, self.data))
+            # With aggregates the windows start at the first bar/ivv row of the address, the heat map times must share that origin
+            startTimes = {addressData["address"]: self.windowAggregates[addressData["address"]]["startTime"] for addressData in pack if addressData["address"] in self.windowAggregates}
+            heatPoints__future.append(executor.submit(process.getHeatPoints, pack, dataset, self.__groupSlices([addressData["address"] for addressData in pack]), startTimes))
 
         for completedThread in concurrent.futures.as_completed(heatPoints__future):
             try:
@@ -510,9 +658,10 @@ class Engine:
                     "Error occurred while preparing heatmap per addresses\n" + str(type) + "::" + str(value))
             else:
                 heatPoints.extend(heatPointsPerAddress)
-            finally:
-                executor.shutdown()
-                
+
+        if executor is not self.pExecutor:
+            executor.shutdown()
+
         return heatPoints
     
     def generateKDEZone(self, allKdeZone: List[Dict[str, Union[float, List[Dict[str, float]]]]], slidingIntervallForStd: List[Dict[str, Union[str, List[WINDOW_DATA]]]] = []) -> Dict[str, Dict[str, Union[str, List[float]]]]:
@@ -528,8 +677,11 @@ class Engine:
             pack = allKdeZone[startIndex: endIndex]
             if not pack:
                 continue
+            # Only the std windows of the addresses in these zones are sent, in their original order
+            zoneAddresses = {address for kdeZone in pack for address in kdeZone["zoneData"]}
+            zoneIntervalls = [addressData for addressData in slidingIntervallForStd if addressData["address"] in zoneAddresses]
             kdeZone__futures.append(self.pExecutor.submit(
-                process.getKDEExceeds, pack, slidingIntervallForStd, self.kdeBW))
+                process.getKDEExceeds, pack, zoneIntervalls, self.kdeBW))
 
         for completedThread in concurrent.futures.as_completed(kdeZone__futures):
             try:
@@ -551,6 +703,35 @@ class Engine:
         self.executors.append(ex)
         return ex
 
+    def __publishedDataset(self) -> Dict[str, Union[str, int, Dict[str, int]]]:
+        # The workers map the columns of the data set instead of getting it pickled with every task
+        if self.datasetHandle is None:
+            self.datasetHandle = self.sharedDataset.publish(self.data)
+            self.logger.log("Published data set of", self.datasetHandle["size"], "rows to", self.datasetHandle["path"])
+        return self.datasetHandle
+
+    def __buildGroupIndex(self) -> None:
+        # The data set is sorted by address, every address is one contiguous slice [start, end)
+        self.groupIndex = {}
+        if isinstance(self.data, ColumnBatch):
+            addresses, starts, counts = np.unique(self.data.columns["address"], return_index=True, return_counts=True)
+            self.groupIndex = {address: (start, start + count) for address, start, count in zip(addresses.tolist(), starts.tolist(), counts.tolist())}
+        else:
+            startIndex = 0
+            for index in range(1, len(self.data) + 1):
+                if index == len(self.data) or self.data[index]["address"] != self.data[startIndex]["address"]:
+                    self.groupIndex[self.data[startIndex]["address"]] = (startIndex, index)
+                    startIndex = index
+        self.groupCounts = {address: endIndex - startIndex for address, (startIndex, endIndex) in self.groupIndex.items()}
+
+    def __identification(self, address: int, startIndex: int) -> Union[str, None]:
+        if isinstance(self.data, ColumnBatch):
+            return self.data.identifications.get(address, DB_CONSTANTS.NO_IDENTIFICATION)
+        return self.data[startIndex].get("identification")
+
+    def __groupSlices(self, addresses: List[int]) -> Dict[int, Tuple[int, int]]:
+        return {address: self.groupIndex[address] for address in addresses if address in self.groupIndex}
+
     def __getDataForAddress(self, address: int) -> Dict[str, Union[str, List[DATA]]]:
         addressData: Dict[str, Union[str, List[int]]] = {
             "address": address,
@@ -562,21 +743,14 @@ class Engine:
         ivvs = []
         times = []
 
-        startIndex = None
-        for index in range(len(self.data)):
-            if self.data[index]["address"] != address: continue
-            identification = self.data[index].get("identification")
-            startIndex = index
-            break
-
-        if startIndex is None:
+        if address not in self.groupIndex:
             raise EngineError("Skipping address " + str(address) + " : Cannot be found")
 
-        for index in range(startIndex, len(self.data)):
+        startIndex, endIndex = self.groupIndex[address]
+        identification = self.data[startIndex].get("identification")
+        for index in range(startIndex, endIndex):
             if self.data[index]["bar"] is None or self.data[index]["ivv"] is None:
                 continue
-            if self.data[index]["address"] != address:
-                break
             bars.append(self.data[index]["bar"])
             ivvs.append(self.data[index]["ivv"])
             times.append(self.data[index]["timestamp"])
@@ -593,163 +767,31 @@ class Engine:
 
         return addressData
 
-    def __applyMedianFilter(self, addressData: Dict[str, Union[str, List[DATA]]]) -> None:
-        bars = [point.bar for point in addressData["points"]]
-        ivvs = [point.ivv for point in addressData["points"]]
-        times = [point.time for point in addressData["points"]]
-
-        if not bars or not ivvs or not times:
-            raise EngineError("Skipping address " + str(addressData["address"]) + " : Invalid bar or ivv for median filter")
-        
-        maxMedianFilter = len(bars) if len(bars) % 2 == 1 else len(bars) - 1
-        nFilter = min(self.medianN, maxMedianFilter)
-
-        filteredBars: np.ndarray = medfilt(bars, nFilter)
-        filteredIvvs: np.ndarray = medfilt(ivvs, nFilter)
-
-        addressData["filteredPoints"] = [
-            DATA(times[i], filteredBars[i], filteredIvvs[i]) for i in range(len(filteredBars))
-        ]
-        
-        # self.logger.debug("Valid results for apply median filter for address " + str(
-        #     addressData["address"]) + ". Points Count: " + str(len(addressData["filteredPoints"])))
-
-
-    def __getSlidingIntervalForAddress(self, addressData: Dict[str, Union[str, List[DATA]]]) -> Dict[str, Union[str, List[WINDOW_POINT]]]:
-        times = [point.time for point in addressData["points"]]
-        if not times: 
-            raise EngineError("Skipping address " + str(addressData["address"]) + " : Invalid time for sliding interval")
-        
-        slidingWindows = [duration * 60 for duration in range(int(max(times) / 60))]
-        
-        slidingIntervals:Dict[str, Union[str, List[WINDOW_POINT]]]  = {
-            "address": addressData["address"], 
-            "identification": addressData.get("identification"),
-            "points":[]
-        }
-        actualIndex = 0
-        for windowIndex in range(len(slidingWindows)):
-            dataPoints = 0
-            for dataIndex in range(actualIndex, len(addressData["points"])):
-                if addressData["points"][dataIndex].time > slidingWindows[windowIndex]: 
-                    actualIndex = dataIndex
-                    break
-                dataPoints += 1
-            
-            slidingIntervals["points"].append(WINDOW_POINT(slidingWindows[windowIndex]/60, dataPoints))
-        
-        # self.logger.debug("Valid results for sliding interval for address " + str(
-        #     addressData["address"]) + ". Points Count: " + str(len(slidingIntervals["points"])))
-        
-        return slidingIntervals
-
-    def __getSlidingIntervalForStdPerAddress(self, addressData: Dict[str, Union[str, List[DATA]]]) -> Dict[str, Union[str, List[WINDOW_DATA], float]]:
-        slidingIntervalsForStd: Dict[str, Union[str, List[WINDOW_POINT]]] = {
-            "address": addressData["address"],
-            "identification": addressData.get("identification"),
-            "points": [],
-            "threshold": False
-        }
-        
-        times = [point.time for point in addressData["points"]]
-        
-        try:
-            addressData["filteredPoints"]
-        except KeyError:
-            raise EngineError("Skipping address " + str(addressData["address"]) + " : No filtered points for sliding interval per std")
-            
-        slidingWindows = [duration *60 for duration in range(int(max(times) / 60))]
-        
-        barStds = []
-        ivvStds = []
-
-        actualIndex = 0
-        for windowIndex in range(len(slidingWindows)):
-            bars = []
-            ivvs = []
-            for dataIndex in range(actualIndex, len(addressData["filteredPoints"])):
-                if addressData["filteredPoints"][dataIndex].time > slidingWindows[windowIndex]:
-                    actualIndex = dataIndex
-                    break
-                bars.append(addressData["filteredPoints"][dataIndex].bar)
-                ivvs.append(addressData["filteredPoints"][dataIndex].ivv)
-
-            if not bars or not ivvs:
-                bars = [0,0]
-                ivvs = [0,0]
-            
-            if len(bars) == 1 :
-                bars.append(bars[0])
-                ivvs.append(ivvs[0])
-            
-            barStd = np.std(np.array(bars, dtype="float64"))
-            ivvStd = np.std(np.array(ivvs, dtype="float64"))
-            
-            slidingIntervalsForStd["points"].append(WINDOW_DATA(
-                slidingWindows[windowIndex]/60, float(barStd), float(ivvStd)))
-
-            barStds.append(barStd)
-            ivvStds.append(ivvStd)
-            
-        if not barStds or not ivvStds: 
-            barStds = [0, 0]
-            ivvStds = [0, 0]
-            
-        # From Paper
-        arrayBarStds = np.array(barStds, dtype="float64")
-        arrayIvvStds = np.array(ivvStds, dtype="float64")
-        diffStds = arrayBarStds - arrayIvvStds
-        
-        ddof = 1 if len(diffStds) > 1 else 0
-        threshold = np.average(diffStds) + 1.2 * np.std(diffStds, ddof=ddof)
-        slidingIntervalsForStd["threshold"] = float(threshold)
-        
-        # self.logger.debug("Valid results for sliding interval for std for address " + str(
-        #     addressData["address"]) + ". Points Count: " + str(len(slidingIntervalsForStd["points"])))
-
-        return slidingIntervalsForStd
-
-    def __getExceedingDataPerAddress(self, addressData: Dict[str, Union[str, List[WINDOW_DATA]]]) -> Dict[str, Union[str, Dict[int, int]]]:
-        exceedingData: Dict[str, Union[str, Dict[int, int]]] = {
-            "address": addressData["address"],
-            "identification": addressData.get("identification"),
-            "distribution": {
-                "0": 0, "10": 0, "20": 0, "30": 0, "40": 0, "50": 0, "60": 0, "70": 0, "80": 0, "90": 0, "100": 0
-            },
-            "smoothed": []
-        }
-        
-        threshold = addressData["threshold"]
-        
-        if threshold is False:
-            self.logger.warning(f"No Threshold for address {addressData['address']}")
-            return exceedingData
-        
-        allDiffs = [point.bar - point.ivv for point in addressData["points"]]
-
-        exceeds = [100*(diff - threshold)/(1 if threshold == 0 else threshold) for diff in allDiffs if diff >= threshold]
-        
-        if not exceeds:
-            return exceedingData
-        
-        sizeRatio = 10
-        
-        exceedingPercentageGroup = []
-
-        for exceedingPercentage in exceeds:
-            percentage = next((dist for dist in exceedingData["distribution"] if int(dist) <= exceedingPercentage < int(dist) + 10), "100")
-            exceedingData["distribution"][percentage] += 1
-            exceedingPercentageGroup.append(int(percentage)/sizeRatio)
-
-        exceedsShape = np.array(exceedingPercentageGroup).reshape(-1, 1)
-        Xs = np.linspace(0, 100/sizeRatio, num=1000).reshape(-1, 1)
-        
-        kde = KernelDensity(kernel="gaussian", bandwidth=self.kdeBW).fit(exceedsShape)
-        density = np.exp(kde.score_samples(Xs))
-
-        exceedingData["smoothed"] = density.tolist()
-
-        return exceedingData
+    def __timeColumn(self, addressData: Dict[str, Union[str, List[DATA], np.ndarray]]) -> np.ndarray:
+        # getRawData already returns the points as columns, other point lists are converted
+        if "times" in addressData:
+            return addressData["times"]
+        return np.array([point.time for point in addressData["points"]], dtype=np.float64)
+
+    def __valueColumns(self, addressData: Dict[str, Union[str, List[DATA], np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+        if "bars" in addressData:
+            return addressData["bars"], addressData["ivvs"]
+        return (np.array([point.bar for point in addressData["points"]], dtype=np.float64),
+                np.array([point.ivv for point in addressData["points"]], dtype=np.float64))
+
+    def __windowMoments(self, aggregate: Dict[str, Union[str, np.ndarray]], moment: str) -> np.ndarray:
+        # Same windows as the raw path: window k holds the points of (60(k-1), 60k] seconds, the points after the last full minute are dropped
+        numWindows = int(aggregate["duration"] / 60)
+        moments = np.zeros(numWindows, dtype=np.float64)
+        inRange = aggregate["bucket"] < numWindows
+        moments[aggregate["bucket"][inRange]] = aggregate[moment][inRange]
+        return moments
+
+    def __stdFromMoments(self, counts: np.ndarray, sums: np.ndarray, squaredSums: np.ndarray) -> np.ndarray:
+        safeCounts = np.where(counts > 0, counts, 1)
+        means = sums / safeCounts
+        variances = np.clip(squaredSums / safeCounts - means**2, 0, None)
+        return np.where(counts > 0, np.sqrt(variances), 0)
 
     def __getHeatPointsForAddress(self, addressData: Dict[str, Union[str, List[WINDOW_DATA], float]] = {}) -> Dict[str, Union[str,List[LOCATION_DATA]]]:
         heatPointsForAddress: List[str, List[LOCATION_DATA]] = []
@@ -761,33 +803,19 @@ class Engine:
         #     addressData["address"]) + ". Address Data windows Count: " + str(len(addressData["points"])) + 
         #     ". Turbulent sliding windows: " + str(len(turbulentSlidingWindows)))
 
-        times = []
-
-        startIndex = None
-        for index, data in enumerate(self.data):
-            if data["address"] != addressData["address"]: continue
-            startIndex = index
-            break
-
-        if startIndex is None:
+        if addressData["address"] not in self.groupIndex:
             raise EngineError("Skipping address " + str(addressData["address"]) + " : Invalid bar or ivv stds for heat map")
 
-        for index in range(startIndex, len(self.data)):
-            if self.data[index]["address"] != addressData["address"]:
-                break
-            times.append(self.data[index]["timestamp"])
-                    
-        startTime = min(times)
+        startIndex, endIndex = self.groupIndex[addressData["address"]]
+        startTime = min(self.data[index]["timestamp"] for index in range(startIndex, endIndex))
 
         foundLongitude = False
         foundWindow = False
         closestTimes = []
         allTimes = []
-        for index in range(startIndex, len(self.data)):
+        for index in range(startIndex, endIndex):
             if self.data[index]["longitude"] is None or self.data[index]["latitude"] is None:
                 continue
-            if self.data[index]["address"] != addressData["address"]:
-                break
 
             foundLongitude = True
 
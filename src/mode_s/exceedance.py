@@ -0,0 +1,40 @@
+import numpy as np
+
+from functools import lru_cache
+from mode_s.constants import ENGINE_CONSTANTS
+
+
+def exceedanceBuckets(diffs: np.ndarray, threshold: float) -> np.ndarray:
+    # Bucket index of every diff reaching the threshold, percentages outside [0, 100) fall into the last bucket
+    diffs = np.asarray(diffs, dtype=np.float64)
+    exceeds = 100 * (diffs[diffs >= threshold] - threshold) / (1 if threshold == 0 else threshold)
+    buckets = np.digitize(exceeds, ENGINE_CONSTANTS.EXCEEDANCE_BUCKETS) - 1
+    buckets[buckets < 0] = len(ENGINE_CONSTANTS.EXCEEDANCE_BUCKETS) - 1
+    return buckets
+
+
+def exceedanceHistogram(diffs: np.ndarray, threshold: float) -> np.ndarray:
+    return np.bincount(exceedanceBuckets(diffs, threshold), minlength=len(ENGINE_CONSTANTS.EXCEEDANCE_BUCKETS))
+
+
+def kdeGrid() -> np.ndarray:
+    return np.linspace(0, 100 / ENGINE_CONSTANTS.EXCEEDANCE_SIZE_RATIO, num=ENGINE_CONSTANTS.KDE_POINTS)
+
+
+@lru_cache(maxsize=8)
+def kernelTable(bandwidth: float) -> np.ndarray:
+    # Normalized gaussian of every bucket (at bucket / size ratio) over the grid, one row per bucket
+    centers = np.array(ENGINE_CONSTANTS.EXCEEDANCE_BUCKETS, dtype=np.float64) / ENGINE_CONSTANTS.EXCEEDANCE_SIZE_RATIO
+    distances = (kdeGrid()[np.newaxis, :] - centers[:, np.newaxis]) / bandwidth
+    table = np.exp(-0.5 * distances**2) / (bandwidth * np.sqrt(2 * np.pi))
+    table.flags.writeable = False
+    return table
+
+
+def kdeDensities(histograms: np.ndarray, bandwidth: float) -> np.ndarray:
+    # Gaussian KDE of the bucket values of every row, the mean of its samples' kernels, as one matrix product
+    histograms = np.atleast_2d(np.asarray(histograms, dtype=np.float64))
+    if not len(histograms):
+        return np.zeros((0, ENGINE_CONSTANTS.KDE_POINTS))
+    weights = histograms / np.maximum(histograms.sum(axis=1, keepdims=True), 1)
+    return weights @ kernelTable(float(bandwidth))
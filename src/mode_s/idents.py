@@ -0,0 +1,88 @@
+import os
+import json
+import time
+from typing import Callable, Dict, List, Union
+
+from mode_s.logger import Logger
+from mode_s.constants import DB_CONSTANTS, MODE_S_CONSTANTS
+
+
+class IdentificationRegistry:
+
+    def __init__(self, logger: Logger, ttl: float = DB_CONSTANTS.IDENT_TTL, path: str = MODE_S_CONSTANTS.IDENT_REGISTRY_DUMP):
+        self.logger: Logger = logger
+        self.ttl: float = ttl
+        self.path: str = path
+        self.idents: Dict[int, str] = {}
+        self.highWaterMark: int = 0
+        self.refreshed: float = 0
+        self.key: Union[str, None] = None
+
+    def refresh(self, login: Dict[str, str], lastUpdate: int,
+                scan: Callable[[Union[int, None]], List[Dict[str, Union[int, str]]]]) -> Dict[int, str]:
+        # Only rows newer than the previous scan are read, the registry of a table survives restarts until the ttl ran out
+        key = self.__key(login)
+        if key != self.key:
+            self.__load(key)
+        if self.highWaterMark > lastUpdate:
+            self.logger.warning("Table is older than the identification registry, scanning it again")
+            self.idents = {}
+            self.highWaterMark = 0
+        elif self.highWaterMark and time.time() - self.refreshed < self.ttl:
+            self.logger.log(f"Using identification registry refreshed {int(time.time() - self.refreshed)} s ago")
+            return self.idents
+
+        since = self.highWaterMark or None
+        added = self.merge(scan(since))
+        self.highWaterMark = lastUpdate
+        self.refreshed = time.time()
+        self.__store()
+        self.logger.log(f"Identification registry: {added} new of {len(self.idents)} addresses" + (" (incremental)" if since else ""))
+        return self.idents
+
+    def merge(self, rows: List[Dict[str, Union[int, str]]]) -> int:
+        # The first identification of an address is kept unless a later one is valid
+        added = 0
+        for el in rows:
+            address = el["address"]
+            identification = el["identification"].strip()
+            if address in self.idents:
+                if identification.isalnum():
+                    self.idents[address] = identification
+                continue
+            self.idents[address] = identification
+            added += 1
+        return added
+
+    def __key(self, login: Dict[str, str]) -> str:
+        return "{}://{}:{}/{}/{}".format(login.get("backend") or DB_CONSTANTS.BACKEND_MYSQL, login.get("host_name"), login.get("db_port"),
+                                         login.get("db_name"), login.get("table_pattern") or login.get("table_name"))
+
+    def __loadAll(self) -> Dict[str, Dict[str, Union[int, float, Dict[str, str]]]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as registryFile:
+                return json.load(registryFile)
+        except (OSError, ValueError) as esc:
+            self.logger.warning("Could not read identification registry :: " + str(esc))
+            return {}
+
+    def __load(self, key: str) -> None:
+        stored = self.__loadAll().get(key) or {}
+        self.key = key
+        self.idents = {int(address): identification for address, identification in (stored.get("idents") or {}).items()}
+        self.highWaterMark = int(stored.get("highWaterMark") or 0)
+        self.refreshed = float(stored.get("time") or 0)
+
+    def __store(self) -> None:
+        registry = self.__loadAll()
+        registry[self.key] = {"idents": {str(address): identification for address, identification in self.idents.items()},
+                              "highWaterMark": self.highWaterMark, "time": self.refreshed}
+        tempPath = self.path + ".tmp"
+        try:
+            with open(tempPath, "w") as registryFile:
+                json.dump(registry, registryFile)
+            os.replace(tempPath, self.path)
+        except OSError as ose:
+            self.logger.warning("Could not store identification registry :: " + str(ose))
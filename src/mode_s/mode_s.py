@@ -5,6 +5,7 @@ from collections import namedtuple
 from typing import Any, Dict, NamedTuple, List, Union
 
 import mode_s.engine as ModeSEngine
+from mode_s.batch import ColumnBatch
 from mode_s.constants import *
 from mode_s.database import Database, DatabaseError
 from mode_s.logger import Logger
@@ -269,6 +270,7 @@ class Mode_S(QObject):
     def __prepareEngine(self):
         self.waitUntilReady()
         self.engine.setDataSet(self.db.getData())
+        self.engine.setWindowAggregates(self.db.getWindowAggregates())
         self.readyToPlot.emit()
 
         
@@ -406,8 +408,9 @@ class Mode_S(QObject):
         
         if self.db.data:
             self.logger.progress(LOGGER_CONSTANTS.MODE_S, "Saving database")
-            self.__dumpData(self.db.data, ms.DATABASE_DUMP)
-            self.db.data.clear() 
+            self.__dumpData(self.db.data.toRows() if isinstance(self.db.data, ColumnBatch) else self.db.data, ms.DATABASE_DUMP)
+            if not self.db.incrementalSync:
+                self.db.data.clear() 
         if self.engine.data:
             self.logger.progress(LOGGER_CONSTANTS.MODE_S, "Clearing engine data")
             self.engine.data.clear() 
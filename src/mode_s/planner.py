@@ -0,0 +1,62 @@
+import math
+import multiprocessing
+from typing import Dict, List, Tuple, Union
+
+from mode_s.logger import Logger
+from mode_s.constants import DB_CONSTANTS
+
+
+class QueryPlanner:
+
+    def __init__(self, logger: Logger, maxConnections: int = multiprocessing.cpu_count() + 1):
+        self.logger: Logger = logger
+        self.maxConnections: int = maxConnections
+        self.stats: Dict[str, Dict[str, Union[int, float]]] = {}
+
+    def key(self, attributes: List[str]) -> str:
+        # Row width is what changes the throughput between fetches, the attributes stand for it
+        return ",".join(sorted(attributes))
+
+    def plan(self, key: str, limit: int, minSubQueries: int = DB_CONSTANTS.MIN_NUMBER_THREADS, maxSubQueries: int = DB_CONSTANTS.MAX_NUMBER_THREADS) -> Union[Tuple[int, int], None]:
+        stats = self.stats.get(key)
+        if stats is None or stats["rate"] <= 0:
+            return None
+
+        connections = stats["connections"]
+        rowsPerSubQuery = max(1, stats["rate"] * DB_CONSTANTS.PLANNER_TARGET_SECONDS)
+        numSubQueries = int(math.ceil(int(limit) / rowsPerSubQuery))
+        numSubQueries = min(max(numSubQueries, connections, minSubQueries), maxSubQueries)
+
+        self.logger.log(f"Adaptive plan for {key}: {numSubQueries} sub queries over {connections} connections",
+                        f"(measured {int(stats['rate'])} rows/s per connection, {stats['latency']:.2f} s per sub query, {int(stats['throughput'])} rows/s in total)")
+        return numSubQueries, connections
+
+    def record(self, key: str, rows: int, wallSeconds: float, packSeconds: List[float], numSubQueries: int) -> None:
+        if rows <= 0 or wallSeconds <= 0 or not packSeconds or numSubQueries <= 0:
+            return
+
+        connections = len(packSeconds)
+        rate = rows / sum(packSeconds)
+        latency = sum(packSeconds) / numSubQueries
+        throughput = rows / wallSeconds
+        self.logger.log(f"Measured fetch of {key}: {rows} rows in {wallSeconds:.2f} s over {connections} connections",
+                        f"({int(throughput)} rows/s in total, {int(rate)} rows/s per connection, {latency:.2f} s per sub query)")
+
+        stats = self.stats.get(key)
+        if stats is None:
+            self.stats[key] = {"rate": rate, "latency": latency, "throughput": throughput,
+                               "connections": self.__clamp(connections), "direction": 1}
+            return
+
+        # Hill climbing on the number of connections, keep going while the total throughput does not drop
+        if throughput < stats["throughput"] * (1 - DB_CONSTANTS.PLANNER_TOLERANCE):
+            stats["direction"] = -stats["direction"]
+        stats["connections"] = self.__clamp(connections + stats["direction"])
+
+        smoothing = DB_CONSTANTS.PLANNER_SMOOTHING
+        stats["rate"] = smoothing * rate + (1 - smoothing) * stats["rate"]
+        stats["latency"] = smoothing * latency + (1 - smoothing) * stats["latency"]
+        stats["throughput"] = throughput
+
+    def __clamp(self, connections: int) -> int:
+        return min(max(connections, 1), self.maxConnections)
@@ -67,8 +67,8 @@ class Plotter:
             bar = [point.bar for point in plotData[index]["points"]]
             ivv = [point.ivv for point in plotData[index]["points"]]
             
-            filteredBar = [point.bar for point in plotData[index]["filteredPoints"]]
-            filteredIvv = [point.ivv for point in plotData[index]["filteredPoints"]]
+            filteredBar = plotData[index]["filteredBars"].tolist()
+            filteredIvv = plotData[index]["filteredIvvs"].tolist()
             
             plt.subplot(nRow, nCol, index + 1)
             plt.subplots_adjust(wspace=0.5, hspace=0.5)
@@ -175,9 +175,9 @@ class Plotter:
 
             threshold = stdData[index]["threshold"]
             
-            time = list(map(lambda el: el/60, [point.time for point in filteredData[index]["filteredPoints"]]))
-            filteredBar = [point.bar for point in filteredData[index]["filteredPoints"]]
-            filteredIvv = [point.ivv for point in filteredData[index]["filteredPoints"]]
+            time = list(map(lambda el: el/60, [point.time for point in filteredData[index]["points"]]))
+            filteredBar = filteredData[index]["filteredBars"].tolist()
+            filteredIvv = filteredData[index]["filteredIvvs"].tolist()
             
             plt.subplot(nRow, nCol, index + 1)
             plt.subplots_adjust(wspace=0.5, hspace=0.5)
@@ -1,195 +1,401 @@
 from PySide2.QtCore import QDateTime
 
-from mysql.connector.connection import MySQLConnection
-
 import numpy as np
-from sklearn.neighbors import KernelDensity
+from scipy.signal import medfilt
 
-from typing import List, Dict, Union
+import queue
+import pickle
+import multiprocessing
+from collections import OrderedDict
+from typing import Any, List, Dict, Tuple, Union
 from datetime import datetime
 
-from mode_s.constants import DB_CONSTANTS, DATA, LOCATION_DATA, WINDOW_DATA
+from mode_s.batch import ColumnBatch
+from mode_s.backend import Backend, getBackend
+from mode_s.shared import SharedDataset
+from mode_s.exceedance import exceedanceHistogram, kdeDensities
+from mode_s.constants import DB_CONSTANTS, ENGINE_CONSTANTS, DATA, LOCATION_DATA, WINDOW_DATA, QUERY
+
+workerLogin: Dict[str, str] = {}
+workerKnownIdents: Dict[int, str] = {}
+workerStatePath: str = None
+workerStateVersion: int = 0
+workerUsedAddresses: List[int] = []
+workerJoinedIdents: List[Tuple[int, str]] = []
+workerBackend: Backend = None
+workerConnection: Any = None
+workerLoadedAddressVersion: int = 0
+workerLoadedIdentVersion: int = 0
+workerStatements: Dict[str, Any] = OrderedDict()
+workerStatementTimeout: float = None
+workerEndpoint: int = 0
+workerSessions: Dict[int, Tuple[Backend, Any, int, int, Dict[str, Any]]] = {}
+workerDatasetPath: str = None
+workerDatasetColumns: Dict[str, np.ndarray] = {}
+workerChunkQueue: multiprocessing.Queue = None
+workerStreamFloor: Any = None
+
+def streamChannel() -> Tuple[multiprocessing.Queue, Any]:
+    # Created before the pool and handed to every worker by the initializer, chunks are pickled once on their way to the parent
+    # Calls with a query id below the floor were given up by the parent, their workers stop instead of blocking on the full queue
+    return multiprocessing.Queue(maxsize=DB_CONSTANTS.STREAM_QUEUE_SIZE), multiprocessing.Value("q", 0)
+
+def initWorker(login: Dict[str, str] = {}, chunkQueue: multiprocessing.Queue = None, streamFloor: Any = None) -> None:
+    global workerLogin, workerChunkQueue, workerStreamFloor
+    workerLogin = dict(login)
+    workerChunkQueue = chunkQueue
+    workerStreamFloor = streamFloor
+
+def updateWorkerState(state: Tuple[str, int] = (None, 0), login: Dict[str, str] = None) -> None:
+    # The login comes with the pool initializer, tasks only carry it once it changed. It never goes through the state file
+    global workerLogin, workerKnownIdents, workerUsedAddresses, workerJoinedIdents, workerStatePath, workerStateVersion, workerStatementTimeout
+    if login is not None and login != workerLogin:
+        closeAllConnections()
+        workerLogin = dict(login)
+
+    statePath, stateVersion = state
+    if statePath is None or (statePath == workerStatePath and stateVersion <= workerStateVersion):
+        return
+
+    with open(statePath, "rb") as stateFile:
+        state = pickle.load(stateFile)
+
+    if statePath != workerStatePath:
+        # State of another database instance, its versions and session tables are unrelated
+        closeAllConnections()
+
+    workerKnownIdents = state["knownIdents"]
+    workerUsedAddresses = state.get("usedAddresses", [])
+    workerJoinedIdents = state.get("joinedIdents", [])
+    workerStatementTimeout = state.get("statementTimeout")
+    workerStatePath = statePath
+    workerStateVersion = state["version"]
+
+def useEndpoint(endpoint: int = 0) -> None:
+    # Every endpoint (primary or replica) keeps its own connection, statements and session table, the globals hold the current one
+    global workerEndpoint, workerBackend, workerConnection, workerLoadedAddressVersion, workerLoadedIdentVersion, workerStatements
+    if endpoint == workerEndpoint:
+        return
+    workerSessions[workerEndpoint] = (workerBackend, workerConnection, workerLoadedAddressVersion, workerLoadedIdentVersion, workerStatements)
+    workerBackend, workerConnection, workerLoadedAddressVersion, workerLoadedIdentVersion, workerStatements = workerSessions.pop(endpoint, (None, None, 0, 0, OrderedDict()))
+    workerEndpoint = endpoint
+
+def endpointLogin(endpoint: int = 0) -> Dict[str, str]:
+    replicas = workerLogin.get("replicas") or []
+    if endpoint == 0 or endpoint > len(replicas):
+        return workerLogin
+    return {**workerLogin, **replicas[endpoint - 1]}
+
+def getConnection(name: str = "db_process") -> Any:
+    global workerBackend, workerConnection, workerLoadedAddressVersion, workerLoadedIdentVersion
+    if workerConnection is None:
+        login = endpointLogin(workerEndpoint)
+        workerBackend = getBackend(login)
+        workerConnection = workerBackend.connect(login)
+    elif not workerBackend.isConnected(workerConnection):
+        workerLoadedAddressVersion = 0
+        workerLoadedIdentVersion = 0
+        workerStatements.clear()
+        workerBackend.reconnect(workerConnection)
+
+    if not workerBackend.isConnected(workerConnection):
+        raise ConnectionError("Database " + name + " not accessible.")
+
+    return workerConnection
+
+def closeConnection() -> None:
+    global workerConnection, workerLoadedAddressVersion, workerLoadedIdentVersion
+    workerLoadedAddressVersion = 0
+    workerLoadedIdentVersion = 0
+    for statement in workerStatements.values():
+        try:
+            statement.close()
+        except Exception:
+            pass
+    workerStatements.clear()
+    if workerConnection is None:
+        return
+    try:
+        workerConnection.close()
+    except Exception:
+        pass
+    workerConnection = None
+
+def closeAllConnections() -> None:
+    for endpoint in list(workerSessions.keys()):
+        useEndpoint(endpoint)
+        closeConnection()
+    useEndpoint(0)
+    closeConnection()
+    workerSessions.clear()
+
+def getStatement(db: Any, statement: str) -> Any:
+    # One server side prepared statement per distinct text, reused for every sub query and every call on this connection
+    # Inlined address lists make many texts, only the most recently used ones stay prepared so the server limit is never reached
+    cursor = workerStatements.get(statement)
+    if cursor is not None:
+        workerStatements.move_to_end(statement)
+        return cursor
+
+    cursor = workerBackend.preparedCursor(db)
+    workerStatements[statement] = cursor
+    while len(workerStatements) > DB_CONSTANTS.MAX_PREPARED_STATEMENTS:
+        _, evicted = workerStatements.popitem(last=False)
+        try:
+            evicted.close()
+        except Exception:
+            pass
+    return cursor
+
+def executeQuery(db: Any, query: QUERY, cursor: Any = None) -> Any:
+    if cursor is None:
+        cursor = getStatement(db, query.statement)
+    workerBackend.setStatementTimeout(db, workerStatementTimeout)
+    cursor.execute(workerBackend.statement(query.statement), query.params)
+    return cursor
+
+def loadUsedAddresses(db: Any, queries: List[QUERY]) -> None:
+    # Session table, it lives as long as the connection and is only rebuilt when the published state changes
+    global workerLoadedAddressVersion
+    if workerLoadedAddressVersion == workerStateVersion or not any(DB_CONSTANTS.USED_ADDRESS_TABLE in query.statement for query in queries):
+        return
+
+    workerBackend.loadUsedAddresses(db, workerUsedAddresses)
+    workerLoadedAddressVersion = workerStateVersion
+
+def loadKnownIdents(db: Any, queries: List[QUERY]) -> None:
+    # Same for the identification registry, the sub queries join it instead of a derived table over the whole table
+    global workerLoadedIdentVersion
+    if workerLoadedIdentVersion == workerStateVersion or not any(DB_CONSTANTS.IDENT_TABLE in query.statement for query in queries):
+        return
+
+    workerBackend.loadKnownIdents(db, workerJoinedIdents)
+    workerLoadedIdentVersion = workerStateVersion
+
+def convertRow(row: Dict[str, Union[int, str, datetime]], elements: List[str], absentColumns: List[str], knownIdents: Dict[int, str] = {}) -> Dict[str, Union[int, str]]:
+    entry = {abs: None for abs in absentColumns}
+    for el in elements:
+        value = row.get(el)
+        if isinstance(value, str):
+            entry[el] = value.strip()
+        elif isinstance(value, datetime):
+            entry[el] = QDateTime(value).toMSecsSinceEpoch() * 10**6
+        else:
+            entry[el] = value
+            
+    if entry.get("identification") is None:
+        if knownIdents and knownIdents.get(entry["address"]):
+            entry["identification"] = knownIdents[entry["address"]]
+        else:
+            entry["identification"] = DB_CONSTANTS.NO_IDENTIFICATION
+
+    return entry
 
-def query(queries: List[str], elements: List[str] = [], knownIdents: Dict[str,str]={}, query_id:int = 0, login: Dict[str, str] = {}) -> List[Dict[str, Union[int, str]]]:
+def query(queries: List[QUERY], elements: List[str] = [], query_id: int = 0, state: Tuple[str, int] = (None, 0), endpoint: int = 0, login: Dict[str, str] = None,
+          patchIdentifications: bool = True) -> List[Dict[str, Union[int, str]]]:
     name = "db_process_" + str(query_id)
     last_query = None
     try:
-        db = MySQLConnection(
-            user=login.get("user_name"),
-            password=login.get("password"),
-            host=login.get("host_name", "127.0.0.1"),
-            port=login.get("db_port", 3306),
-            database=login.get("db_name")
-        )
-
-        if not db.is_connected():
-            raise ConnectionError("Database " + name +" not accessible.")
+        updateWorkerState(state, login)
+        knownIdents = workerKnownIdents if patchIdentifications else {}
+        useEndpoint(endpoint)
+        db = getConnection(name)
+        loadUsedAddresses(db, queries)
+        loadKnownIdents(db, queries)
 
         allQueriesResults = []
 
-        q = db.cursor(dictionary=True)
         absentColumns = [column for column in DB_CONSTANTS.USED_COLUMNS if column not in elements]
 
         for query in queries:
-            q.execute(query)
             last_query = query
+            q = executeQuery(db, query)
+            columnNames = workerBackend.columnNames(q)
 
-            for row in q:
-                entry = {abs: None for abs in absentColumns}
-                for el in elements:
-                    value = row.get(el)
-                    if isinstance(value, str):
-                        entry[el] = value.strip()
-                    elif isinstance(value, datetime):
-                        entry[el] = QDateTime(value).toMSecsSinceEpoch() * 10**6
-                    else:
-                        entry[el] = value
-                        
-                if entry.get("identification") is None:
-                    if knownIdents and knownIdents.get(entry["address"]):
-                        entry["identification"] = knownIdents[entry["address"]]
-                    else:
-                        entry["identification"] = DB_CONSTANTS.NO_IDENTIFICATION
-
-                allQueriesResults.append(entry)
-
-        q.close()
-        db.close()
+            for row in q.fetchall():
+                allQueriesResults.append(convertRow(dict(zip(columnNames, row)), elements, absentColumns, knownIdents))
         
     except Exception as ex:
+        closeConnection()
         raise ConnectionError(
             f"Error (Exception: {ex}) occured while running following query: {last_query}")
 
     return allQueriesResults
 
-def getRawData(addresses: List[int], data: List[Dict[str, Union[str, float]]] = []) -> List[Dict[str, Union[str, List[DATA]]]]:
-    results = []
-    startIndexes = {address:False for address in addresses}
-    lenStartIndexes = len(startIndexes)
-    counterAllIndexes = 0
-
-    for index in range(len(data)):
-        addressInList = startIndexes.get(data[index]["address"]) 
-        if addressInList is not None and addressInList is False:
-            startIndexes[data[index]["address"]] = index
-            counterAllIndexes += 1
-
-        if counterAllIndexes == lenStartIndexes:
-            break
-    
-    for address in addresses:
-        addressData: Dict[str, Union[str, List[int]]] = {
-            "address": address,
-            "points": []
-        }
+def queryColumnar(queries: List[QUERY], elements: List[str] = [], query_id: int = 0, state: Tuple[str, int] = (None, 0), chunkSize: int = DB_CONSTANTS.STREAM_CHUNK_SIZE, endpoint: int = 0, login: Dict[str, str] = None,
+                  patchIdentifications: bool = True) -> ColumnBatch:
+    name = "db_process_" + str(query_id)
+    last_query = None
+    batches = []
+    try:
+        updateWorkerState(state, login)
+        knownIdents = workerKnownIdents if patchIdentifications else {}
+        useEndpoint(endpoint)
+        db = getConnection(name)
+        loadUsedAddresses(db, queries)
+        loadKnownIdents(db, queries)
+
+        for query in queries:
+            last_query = query
+            q = executeQuery(db, query)
 
-        identification = None
-        bars = []
-        ivvs = []
-        times = []
+            rows = q.fetchmany(chunkSize)
+            while rows:
+                batches.append(ColumnBatch.fromTuples(rows, elements, knownIdents))
+                rows = q.fetchmany(chunkSize)
 
-        startIndex = startIndexes[address]
+    except Exception as ex:
+        closeConnection()
+        raise ConnectionError(
+            f"Error (Exception: {ex}) occured while running following query: {last_query}")
 
-        if startIndex is False:
-            raise AssertionError("Skipping address " +
-                                str(address) + " : Cannot be found")
+    return ColumnBatch.concatenate(batches)
 
-        identification = data[startIndex].get("identification")
+def putChunk(query_id: int, chunk: Union[List[Dict[str, Union[int, str]]], ColumnBatch, None]) -> bool:
+    while query_id >= workerStreamFloor.value:
+        try:
+            workerChunkQueue.put((query_id, chunk), timeout=DB_CONSTANTS.STREAM_TIMEOUT)
+            return True
+        except queue.Full:
+            continue
+    return False
 
-        for index in range(startIndex, len(data)):
-            if data[index]["bar"] is None or data[index]["ivv"] is None:
-                continue
-            if data[index]["address"] != address:
-                break
-            bars.append(data[index]["bar"])
-            ivvs.append(data[index]["ivv"])
-            times.append(data[index]["timestamp"])
+def streamQuery(queries: List[QUERY], elements: List[str] = [], query_id: int = 0, state: Tuple[str, int] = (None, 0), chunkSize: int = DB_CONSTANTS.STREAM_CHUNK_SIZE, columnar: bool = False, endpoint: int = 0, login: Dict[str, str] = None,
+                patchIdentifications: bool = True) -> int:
+    name = "db_process_" + str(query_id)
+    last_query = None
+    rowCount = 0
+    try:
+        if workerChunkQueue is None:
+            raise ConnectionError("The process pool was started without a stream channel")
+        updateWorkerState(state, login)
+        knownIdents = workerKnownIdents if patchIdentifications else {}
+        useEndpoint(endpoint)
+        db = getConnection(name)
+        loadUsedAddresses(db, queries)
+        loadKnownIdents(db, queries)
+
+        # Not a prepared statement, rows are read from the server chunk by chunk instead of being buffered in the worker first
+        q = workerBackend.streamingCursor(db)
+        absentColumns = [column for column in DB_CONSTANTS.USED_COLUMNS if column not in elements]
+
+        for query in queries:
+            last_query = query
+            executeQuery(db, query, q)
+            columnNames = workerBackend.columnNames(q)
+
+            rows = q.fetchmany(chunkSize)
+            while rows:
+                if columnar:
+                    chunk = ColumnBatch.fromTuples(rows, elements, knownIdents)
+                else:
+                    chunk = [convertRow(dict(zip(columnNames, row)), elements, absentColumns, knownIdents) for row in rows]
+                if not putChunk(query_id, chunk):
+                    raise ConnectionError("Stream given up by the database")
+                rowCount += len(rows)
+                rows = q.fetchmany(chunkSize)
+
+        q.close()
+
+    except Exception as ex:
+        closeConnection()
+        raise ConnectionError(
+            f"Error (Exception: {ex}) occured while streaming following query: {last_query}")
+
+    finally:
+        if workerChunkQueue is not None:
+            putChunk(query_id, None)
+
+    return rowCount
+
+def datasetColumns(handle: Dict[str, Union[str, int, Dict[str, int]]]) -> Dict[str, np.ndarray]:
+    # The data set published by the engine is mapped once per worker and kept until the engine publishes a new one
+    # The previous mapping is dropped first, the engine can only remove its file once no worker maps it anymore
+    global workerDatasetPath, workerDatasetColumns
+    if handle["path"] != workerDatasetPath:
+        workerDatasetColumns = {}
+        workerDatasetPath = None
+        workerDatasetColumns = SharedDataset.columns(handle)
+        workerDatasetPath = handle["path"]
+    return workerDatasetColumns
+
+def getRawData(addresses: List[int], dataset: Dict[str, Union[str, int, Dict[str, int]]] = {}, groupSlices: Dict[int, Tuple[int, int]] = {},
+               identifications: Dict[int, str] = {}) -> List[Dict[str, Union[str, np.ndarray]]]:
+    # groupSlices holds the [start, end) rows of every address, built once by the engine
+    columns = datasetColumns(dataset)
+    results = []
+    for address in addresses:
+        if address not in groupSlices:
+            raise AssertionError("Skipping address " +
+                                str(address) + " : Cannot be found")
 
-        if not times:
+        startIndex, endIndex = groupSlices[address]
+        bars = columns["bar"][startIndex:endIndex]
+        ivvs = columns["ivv"][startIndex:endIndex]
+        valid = ~np.isnan(bars) & ~np.isnan(ivvs)
+        if not valid.any():
             raise AssertionError("Skipping address " +
                                 str(address) + " : No valid entry")
 
-        startTime = min(times)
-        addressData["points"] = [
-            DATA((times[i] - startTime)*10**-9, bars[i], ivvs[i]) for i in range(len(times))]
-        addressData["points"].sort(key=lambda el: el.time)
-        addressData["identification"] = identification
+        times = columns["timestamp"][startIndex:endIndex][valid]
+        relativeTimes = (times - times.min()) * 10**-9
+        order = np.argsort(relativeTimes, kind="stable")
 
-        results.append(addressData)
+        # The points in time order as columns, cheap to send back, the engine builds the DATA points from them
+        results.append({
+            "address": address,
+            "identification": identifications.get(address),
+            "times": relativeTimes[order],
+            "bars": bars[valid][order],
+            "ivvs": ivvs[valid][order]
+        })
 
     return results
 
 
-def getHeatPoints(addressDataList: List[Dict[str, Union[str, List[WINDOW_DATA]]]] = [], data: List[Dict[str, Union[str, float]]] = []) -> List[Dict[str, Union[str,List[LOCATION_DATA]]]]:
+def medianFilterSegments(values: np.ndarray, lengths: np.ndarray, kernel: int) -> np.ndarray:
+    # values holds the (bar, ivv) rows of consecutive tracks, the zeros between them are the padding medfilt sees on a single track
+    if kernel <= 1:
+        return values.copy()
+    half = kernel // 2
+    segments = np.repeat(np.arange(len(lengths)), lengths)
+    positions = np.arange(len(values)) + half * (segments + 1)
+    padded = np.zeros(len(values) + half * (len(lengths) + 1), dtype=np.float64)
+    filtered = np.empty(values.shape, dtype=np.float64)
+    for column in range(values.shape[1]):
+        padded[positions] = values[:, column]
+        filtered[:, column] = medfilt(padded, kernel)[positions]
+    return filtered
+
+
+def getHeatPoints(addressDataList: List[Dict[str, Union[str, List[WINDOW_DATA]]]] = [], dataset: Dict[str, Union[str, int, Dict[str, int]]] = {},
+                  groupSlices: Dict[int, Tuple[int, int]] = {}, startTimes: Dict[int, int] = {}) -> List[Dict[str, Union[str,List[LOCATION_DATA]]]]:
+    columns = datasetColumns(dataset)
     results = []
-    startIndexes = {address: {"startIndex": False, "times": []} for address in [addressData["address"] for addressData in addressDataList]}
-
-    for index in range(len(data)):
-        address = data[index]["address"]
-        addressInList = startIndexes.get(address)
-        if addressInList is not None:
-            if addressInList["startIndex"] is False:
-                startIndexes[address]["startIndex"] = index
-            
-            startIndexes[address]["times"].append(data[index]["timestamp"])
-
 
     for addressData in addressDataList:
-        heatPointsForAddress: List[str, List[LOCATION_DATA]] = []
-        
-        turbulentSlidingWindows = [point.window for point in addressData["points"] if point.bar - point.ivv > addressData["threshold"]]
-        turbulentSlidingWindows.sort()
-        
-        startIndex = startIndexes[addressData["address"]]["startIndex"]
+        turbulentSlidingWindows = np.sort([point.window for point in addressData["points"] if point.bar - point.ivv > addressData["threshold"]])
 
-        if startIndex is False:
+        if addressData["address"] not in groupSlices:
             raise AssertionError("Skipping address " + str(addressData["address"]) + " : Invalid bar or ivv stds for heat map")
 
-        times = startIndexes[addressData["address"]]["times"]
-        if not times:
-            raise AssertionError("Skipping address " + str(addressData["address"]) + " : not times for heat map")
-
-        startTime = min(times)
-
-        foundLongitude = False
-        foundWindow = False
-        closestTimes = []
-        allTimes = []
-        for index in range(startIndex, len(data)):
-            if data[index]["longitude"] is None or data[index]["latitude"] is None:
-                continue
-            if data[index]["address"] != addressData["address"]:
-                break
+        startIndex, endIndex = groupSlices[addressData["address"]]
+        timestamps = columns["timestamp"][startIndex:endIndex]
+        longitudes = columns["longitude"][startIndex:endIndex]
+        latitudes = columns["latitude"][startIndex:endIndex]
+        valid = ~np.isnan(longitudes) & ~np.isnan(latitudes)
+        startTime = startTimes.get(addressData["address"], timestamps.min() if len(timestamps) else 0)
+        times = ((timestamps[valid] - startTime)*10**-9) / 60
 
-            foundLongitude = True
+        # Every location in row order takes the first turbulent window not before it, the scan ends at the first one without such a window
+        windowIndexes = np.searchsorted(turbulentSlidingWindows, times, side="left")
+        hasWindow = windowIndexes < len(turbulentSlidingWindows)
+        windows = np.where(hasWindow, turbulentSlidingWindows[np.minimum(windowIndexes, len(turbulentSlidingWindows) - 1)] if len(turbulentSlidingWindows) else 0, 0)
+        stop = ~hasWindow | (windows == 0)
+        end = int(np.argmax(stop)) if stop.any() else len(times)
 
-            rawTime = data[index]["timestamp"]
-            time = (rawTime - startTime)*10**-9
-            time /= 60
-            allTimes.append(time)
-
-            windows = None
-            for window in turbulentSlidingWindows:
-                if time > window: continue
-                windows = window
-                break
-            
-            if not windows: break
-            
-            foundWindow = True
-            if time < windows - 1: 
-                closestTimes.append(time)
-                continue
-            
-            longitude = data[index]["longitude"]
-            latitude = data[index]["latitude"]
-            
-            heatPointsForAddress.append(
-                LOCATION_DATA(time, longitude, latitude)
-            )
-            
-        if allTimes: closestTimes.insert(0, min(allTimes))
-        
+        heat = np.flatnonzero(~(times[:end] < windows[:end] - 1))
+        heatPointsForAddress = [LOCATION_DATA(*point) for point in zip(times[heat].tolist(), longitudes[valid][heat].tolist(), latitudes[valid][heat].tolist())]
 
         results.append({"address": addressData["address"], "identification": addressData.get("identification"),  "points": heatPointsForAddress})
         
@@ -217,9 +423,8 @@ def getKDEExceeds(kdeZones: List[Dict[str, Union[float, List[Dict[str, float]]]]
 
         zoneAddresses = list(zoneData.keys())
         
-        maxX = 1000
-
         allExceedingData = []
+        histograms = []
         
             
         zoneAddressesDataRead = {address: False for address in zoneAddresses}
@@ -262,33 +467,21 @@ def getKDEExceeds(kdeZones: List[Dict[str, Union[float, List[Dict[str, float]]]]
             if not allDiffs:
                 continue
             
-            exceeds = [100*(diff - threshold)/threshold for diff in allDiffs if diff >= threshold]
+            histogram = exceedanceHistogram(allDiffs, threshold)
 
-            if not exceeds:
+            if not histogram.any():
                 continue
-            
-            exceedingPercentageGroup = []
-            sizeRatio = 10
-
-            for exceedingPercentage in exceeds:
-                percentage = next((dist for dist in [0,10,20,30,40,50,60,70,80,90,100] if dist <= exceedingPercentage < dist + 10), 100)
-                exceedingPercentageGroup.append(percentage/sizeRatio)
 
-            exceedsShape = np.array(exceedingPercentageGroup).reshape(-1, 1)
-            Xs = np.linspace(0, 100/sizeRatio, num=maxX).reshape(-1, 1)
-
-            kde = KernelDensity(kernel="gaussian",bandwidth=bandwidth).fit(exceedsShape)
-            density = np.exp(kde.score_samples(Xs))
-            norm = np.linalg.norm(density)
+            allExceedingData.append(exceedingData)
+            histograms.append(histogram)
 
+        # The densities of all addresses of the zone in one matrix product, the zone density is their sum
+        densities = kdeDensities(histograms, bandwidth)
+        for exceedingData, density in zip(allExceedingData, densities):
             exceedingData["smoothed"] = density.tolist()
             kdeZone["exceedsPerAddress"].append(exceedingData)
 
-            allExceedingData.append({"densities": (density/norm).tolist(), "norm": float(norm)})
-
-        globalDensity = [sum(component["densities"][i] * component["norm"] for component in allExceedingData) for i in range(maxX)]
-
-        kdeZone["kde"] = globalDensity
+        kdeZone["kde"] = densities.sum(axis=0).tolist() if len(densities) else [0] * ENGINE_CONSTANTS.KDE_POINTS
         lineSeriesKDEExceeds[zoneID] = kdeZone
 
     return lineSeriesKDEExceeds
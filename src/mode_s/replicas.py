@@ -0,0 +1,80 @@
+import time
+from typing import Dict, List, Union
+
+from mode_s.logger import Logger
+from mode_s.constants import DB_CONSTANTS
+
+
+class ReplicaPool:
+
+    def __init__(self, logger: Logger):
+        self.logger: Logger = logger
+        self.endpoints: List[Dict[str, Union[str, int]]] = [{}]
+        self.stats: List[Dict[str, float]] = [self.__newStats()]
+
+    def setEndpoints(self, login: Dict[str, Union[str, int, list]]) -> None:
+        # Endpoint 0 is the login itself, every replica overrides some of its keys (host_name, db_port or db_name)
+        endpoints = [{}] + [dict(replica) for replica in login.get("replicas") or []]
+        if endpoints == self.endpoints:
+            return
+        self.endpoints = endpoints
+        self.stats = [self.__newStats() for _ in endpoints]
+        if len(endpoints) > 1:
+            self.logger.log("Distributing sub queries over", len(endpoints), "endpoints:", ", ".join(self.name(endpoint) for endpoint in range(len(endpoints))))
+
+    def name(self, endpoint: int) -> str:
+        if endpoint == 0:
+            return "primary"
+        return ":".join(str(value) for value in self.endpoints[endpoint].values())
+
+    def choose(self, exclude: List[int] = []) -> int:
+        # Smooth weighted round robin, the weight of an endpoint is its measured rows/s
+        if len(self.endpoints) == 1:
+            return 0
+
+        now = time.time()
+        candidates = [endpoint for endpoint in range(len(self.endpoints)) if self.stats[endpoint]["ejectedUntil"] <= now and endpoint not in exclude]
+        if not candidates:
+            candidates = [endpoint for endpoint in range(len(self.endpoints)) if endpoint not in exclude] or [0]
+            self.logger.warning("No healthy endpoint left, using ejected ones")
+
+        weights = {endpoint: self.__weight(endpoint) for endpoint in candidates}
+        for endpoint, weight in weights.items():
+            self.stats[endpoint]["current"] += weight
+        chosen = max(candidates, key=lambda endpoint: self.stats[endpoint]["current"])
+        self.stats[chosen]["current"] -= sum(weights.values())
+        return chosen
+
+    def record(self, endpoint: int, rows: int, seconds: float, succeeded: bool = True) -> None:
+        if len(self.endpoints) == 1 or endpoint >= len(self.stats):
+            return
+
+        stats = self.stats[endpoint]
+        if not succeeded:
+            stats["failures"] += 1
+            if stats["failures"] >= DB_CONSTANTS.REPLICA_MAX_FAILURES:
+                stats["ejectedUntil"] = time.time() + DB_CONSTANTS.REPLICA_EJECT_SECONDS
+                self.logger.warning(f"Ejecting endpoint {self.name(endpoint)} for {DB_CONSTANTS.REPLICA_EJECT_SECONDS} s after {int(stats['failures'])} failures")
+            return
+
+        if stats["failures"] >= DB_CONSTANTS.REPLICA_MAX_FAILURES:
+            self.logger.log(f"Endpoint {self.name(endpoint)} is healthy again")
+        stats["failures"] = 0
+        stats["ejectedUntil"] = 0
+        if rows > 0 and seconds > 0:
+            rate = rows / seconds
+            smoothing = DB_CONSTANTS.PLANNER_SMOOTHING
+            stats["rate"] = rate if stats["rate"] <= 0 else smoothing * rate + (1 - smoothing) * stats["rate"]
+
+    def summary(self) -> str:
+        return " | ".join(f"{self.name(endpoint)}: {int(stats['rate'])} rows/s" + (" (ejected)" if stats["ejectedUntil"] > time.time() else "")
+                          for endpoint, stats in enumerate(self.stats))
+
+    def __weight(self, endpoint: int) -> float:
+        # Unmeasured endpoints get the mean rate, so every endpoint is tried
+        rates = [stats["rate"] for stats in self.stats if stats["rate"] > 0]
+        rate = self.stats[endpoint]["rate"]
+        return rate if rate > 0 else (sum(rates) / len(rates) if rates else 1.0)
+
+    def __newStats(self) -> Dict[str, float]:
+        return {"rate": 0.0, "failures": 0, "ejectedUntil": 0.0, "current": 0.0}
@@ -0,0 +1,87 @@
+import os
+import glob
+import uuid
+import operator
+import atexit
+from typing import Dict, List, Union
+
+import numpy as np
+
+from mode_s.batch import ColumnBatch
+from mode_s.logger import Logger
+from mode_s.constants import MODE_S_CONSTANTS
+
+
+class SharedDataset:
+
+    # Missing floats are NaN, the worker functions only need these columns of the sorted data set
+    COLUMNS: Dict[str, type] = {
+        "address": np.int64,
+        "timestamp": np.int64,
+        "bar": np.float64,
+        "ivv": np.float64,
+        "latitude": np.float64,
+        "longitude": np.float64,
+    }
+
+    def __init__(self, logger: Logger, path: str = MODE_S_CONSTANTS.SHARED_DATASET_PATH):
+        self.logger: Logger = logger
+        self.prefix: str = os.path.join(path, f"mode_s_dataset.{os.getpid()}.{uuid.uuid4().hex}.")
+        self.version: int = 0
+        self.handle: Union[Dict[str, Union[str, int, Dict[str, int]]], None] = None
+        atexit.register(self.__releaseAtExit)
+
+    def publish(self, data: Union[List[Dict[str, Union[str, int]]], ColumnBatch]) -> Dict[str, Union[str, int, Dict[str, int]]]:
+        # All columns are written once into one file, the workers map it read only and get nothing but this handle
+        self.release()
+        self.version += 1
+        size = len(data)
+        layout = {}
+        offset = 0
+        for column, dtype in SharedDataset.COLUMNS.items():
+            layout[column] = offset
+            offset += size * np.dtype(dtype).itemsize
+
+        path = self.prefix + str(self.version)
+        mapped = np.memmap(path, dtype=np.uint8, mode="w+", shape=(max(offset, 1),))
+        for column, dtype in SharedDataset.COLUMNS.items():
+            values = np.ndarray((size,), dtype=dtype, buffer=mapped, offset=layout[column])
+            values[:] = self.__column(data, column, dtype)
+        mapped.flush()
+        del mapped
+
+        self.handle = {"path": path, "size": size, "layout": layout}
+        return self.handle
+
+    def release(self) -> List[str]:
+        # Windows refuses to remove a file a worker still maps, it stays under the prefix and is removed again by the next publish
+        self.handle = None
+        stale = []
+        for path in glob.glob(self.prefix + "*"):
+            try:
+                os.remove(path)
+            except OSError as ose:
+                stale.append(path)
+                self.logger.debug("Shared data set still mapped, removing it later :: " + str(ose))
+        return stale
+
+    def __releaseAtExit(self) -> None:
+        # The process pool is shut down before, no worker maps the files anymore
+        for path in self.release():
+            self.logger.warning("Could not remove shared data set :: " + path)
+
+    @staticmethod
+    def columns(handle: Dict[str, Union[str, int, Dict[str, int]]]) -> Dict[str, np.ndarray]:
+        if not handle["size"]:
+            return {column: np.zeros(0, dtype=dtype) for column, dtype in SharedDataset.COLUMNS.items()}
+        return {column: np.memmap(handle["path"], dtype=dtype, mode="r", offset=handle["layout"][column], shape=(handle["size"],))
+                for column, dtype in SharedDataset.COLUMNS.items()}
+
+    def __column(self, data: Union[List[Dict[str, Union[str, int]]], ColumnBatch], column: str, dtype: type) -> np.ndarray:
+        if isinstance(data, ColumnBatch):
+            values = data.columns[column].astype(dtype)
+            if np.issubdtype(dtype, np.floating):
+                values[~data.valid[column]] = np.nan
+            return values
+        # Rows carry every column, None becomes NaN
+        return np.array(list(map(operator.itemgetter(column), data)), dtype=dtype)
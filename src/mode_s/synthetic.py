@@ -0,0 +1,139 @@
+import numpy as np
+
+import os
+import sqlite3
+from datetime import datetime
+from typing import Callable, Dict, Iterator, Tuple, Union
+
+from mode_s.backend import SQLiteBackend
+from mode_s.constants import SYNTHETIC_CONSTANTS
+
+
+class SyntheticData:
+
+    def __init__(self, seed: int = SYNTHETIC_CONSTANTS.SEED, numAddresses: int = SYNTHETIC_CONSTANTS.NUM_ADDRESSES,
+                 end: str = SYNTHETIC_CONSTANTS.END, span: float = SYNTHETIC_CONSTANTS.SPAN,
+                 turbulenceRate: float = SYNTHETIC_CONSTANTS.TURBULENCE_RATE):
+        self.seed: int = seed
+        self.numAddresses: int = numAddresses
+        self.end: np.datetime64 = np.datetime64(datetime.strptime(end, "%Y-%m-%d %H:%M:%S"), "us")
+        self.span: float = span                     # in Minutes before end
+        self.turbulenceRate: float = turbulenceRate  # share of flights with a turbulence episode
+
+    def addresses(self) -> np.ndarray:
+        # Distinct 24 bit ICAO addresses, the same for every row count
+        rng = np.random.default_rng([self.seed, 0])
+        return rng.choice(2**24 - 1, size=self.numAddresses, replace=False) + 1
+
+    def rowsPerAddress(self, rows: int) -> np.ndarray:
+        # Few long tracks and many short ones, like the receiver sees them
+        rng = np.random.default_rng([self.seed, 1])
+        weights = rng.lognormal(mean=0.0, sigma=1.0, size=self.numAddresses)
+        return rng.multinomial(rows, weights / weights.sum())
+
+    def flights(self, rows: int) -> Iterator[Dict[str, np.ndarray]]:
+        addresses = self.addresses()
+        for index, (address, numRows) in enumerate(zip(addresses.tolist(), self.rowsPerAddress(rows).tolist())):
+            if numRows:
+                yield self.flight(index, address, numRows)
+
+    def flight(self, index: int, address: int, numRows: int) -> Dict[str, Union[np.ndarray, str, None]]:
+        # Every flight has its own stream, so its rows do not depend on the total row count or chunking
+        rng = np.random.default_rng([self.seed, 2, index])
+
+        # Uneven sampling: per flight mean interval, jitter and some coverage gaps
+        meanInterval = rng.lognormal(mean=np.log(SYNTHETIC_CONSTANTS.MEAN_INTERVAL), sigma=0.5)
+        intervals = rng.exponential(meanInterval, size=numRows)
+        gaps = rng.random(numRows) < SYNTHETIC_CONSTANTS.GAP_PROBABILITY
+        intervals[gaps] += rng.uniform(*SYNTHETIC_CONSTANTS.GAP_SECONDS, size=int(gaps.sum()))
+        seconds = np.cumsum(intervals) - intervals[0]
+        duration = seconds[-1]
+
+        startOffset = duration + rng.uniform(0, max(self.span * 60 - duration, 0))
+        timestamps = self.end - np.timedelta64(int(startOffset * 10**6), "us") + (seconds * 10**6).astype("timedelta64[us]")
+
+        # Vertical rate in ft/min: climb, cruise or descent with a slowly drifting trend
+        phase = rng.choice(SYNTHETIC_CONSTANTS.PHASE_RATES)
+        trend = phase + np.cumsum(rng.normal(0, SYNTHETIC_CONSTANTS.TREND_STEP, size=numRows))
+        bar = trend + rng.normal(0, SYNTHETIC_CONSTANTS.BAR_NOISE, size=numRows)
+        ivv = trend + rng.normal(0, SYNTHETIC_CONSTANTS.IVV_NOISE, size=numRows)
+
+        if rng.random() < self.turbulenceRate and duration > 0:
+            # The barometric rate reacts much stronger to turbulence than the inertial one
+            episodeLength = rng.uniform(*SYNTHETIC_CONSTANTS.TURBULENCE_SECONDS)
+            episodeStart = rng.uniform(0, max(duration - episodeLength, 0))
+            episode = (seconds >= episodeStart) & (seconds <= episodeStart + episodeLength)
+            bar[episode] += rng.normal(0, SYNTHETIC_CONSTANTS.TURBULENCE_BAR_NOISE, size=int(episode.sum()))
+            ivv[episode] += rng.normal(0, SYNTHETIC_CONSTANTS.TURBULENCE_IVV_NOISE, size=int(episode.sum()))
+
+        latitude = rng.uniform(*SYNTHETIC_CONSTANTS.LATITUDES) + np.cumsum(rng.normal(0, 1e-3, size=numRows)) + seconds * rng.normal(0, SYNTHETIC_CONSTANTS.SPEED)
+        longitude = rng.uniform(*SYNTHETIC_CONSTANTS.LONGITUDES) + np.cumsum(rng.normal(0, 1e-3, size=numRows)) + seconds * rng.normal(0, SYNTHETIC_CONSTANTS.SPEED)
+
+        # Each message is either BDS 6,0 (bar/ivv) or a position, identification only on a few of them
+        isBds60 = rng.random(numRows) < SYNTHETIC_CONSTANTS.BDS60_SHARE
+        identification = None
+        if rng.random() < SYNTHETIC_CONSTANTS.IDENTIFIED_SHARE:
+            letters = rng.choice(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"), size=3)
+            identification = "".join(letters) + str(int(rng.integers(1, 10000)))
+        hasIdentification = rng.random(numRows) < SYNTHETIC_CONSTANTS.IDENTIFICATION_SHARE
+
+        return {
+            "address": np.full(numRows, address, dtype=np.int64),
+            "timestamp": timestamps,
+            "bar": np.round(bar),
+            "ivv": np.round(ivv),
+            "latitude": latitude,
+            "longitude": longitude,
+            "bds60": isBds60,
+            "identification": identification,
+            "hasIdentification": hasIdentification,
+        }
+
+    def rows(self, flight: Dict[str, Union[np.ndarray, str, None]]) -> Iterator[Tuple[Union[int, float, str, None], ...]]:
+        # Timestamps are written as local wall clock time, exactly as MySQL returns them
+        timestamps = np.char.replace(np.datetime_as_string(flight["timestamp"], unit="us"), "T", " ").tolist()
+        identification = flight["identification"]
+        for address, timestamp, bar, ivv, latitude, longitude, bds60, hasIdentification in zip(
+                flight["address"].tolist(), timestamps, flight["bar"].tolist(), flight["ivv"].tolist(),
+                flight["latitude"].tolist(), flight["longitude"].tolist(), flight["bds60"].tolist(), flight["hasIdentification"].tolist()):
+            yield (identification if hasIdentification else None, address, timestamp,
+                   None if bds60 else latitude, None if bds60 else longitude,
+                   bar if bds60 else None, ivv if bds60 else None)
+
+    def writeSQLite(self, path: str, rows: int, tableName: str, columnBar: str, columnIvv: str,
+                    progress: Callable[[int, int], None] = None) -> int:
+        if os.path.exists(path):
+            os.remove(path)
+
+        backend = SQLiteBackend()
+        connection = sqlite3.connect(path)
+        try:
+            q = connection.cursor()
+            q.execute("PRAGMA journal_mode = OFF")
+            q.execute("PRAGMA synchronous = OFF")
+
+            # Flights are generated one after another, the staging table lets the final table be in arrival (timestamp) order like the receiver writes it
+            stagingTable = tableName + "_staging"
+            q.execute(f"CREATE TABLE {stagingTable} (identification TEXT, address INTEGER, timestamp TEXT, latitude REAL, longitude REAL, bar REAL, ivv REAL)")
+            writtenRows = 0
+            for flight in self.flights(rows):
+                q.executemany(f"INSERT INTO {stagingTable} VALUES (?, ?, ?, ?, ?, ?, ?)", self.rows(flight))
+                writtenRows += len(flight["address"])
+                if progress:
+                    progress(writtenRows, rows)
+
+            backend.createTable(connection, tableName, columnBar, columnIvv)
+            q.execute(f"""INSERT INTO {tableName} (identification, address, timestamp, latitude, longitude, {columnBar}, {columnIvv})
+                SELECT identification, address, timestamp, latitude, longitude, bar, ivv FROM {stagingTable} ORDER BY timestamp, address""")
+            q.execute(f"DROP TABLE {stagingTable}")
+            q.close()
+            connection.commit()
+            connection.execute("VACUUM")
+        finally:
+            connection.close()
+        return writtenRows
+
+
+def generateSQLite(path: str, rows: int, tableName: str, columnBar: str, columnIvv: str, seed: int = SYNTHETIC_CONSTANTS.SEED,
+                   numAddresses: int = SYNTHETIC_CONSTANTS.NUM_ADDRESSES, progress: Callable[[int, int], None] = None) -> int:
+    return SyntheticData(seed=seed, numAddresses=numAddresses).writeSQLite(path, rows, tableName, columnBar, columnIvv, progress)
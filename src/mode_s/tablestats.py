@@ -0,0 +1,109 @@
+import os
+import json
+import time
+from typing import Callable, Dict, List, Tuple, Union
+
+from mode_s.logger import Logger
+from mode_s.constants import DB_CONSTANTS, MODE_S_CONSTANTS
+
+
+class TableStatistics:
+
+    def __init__(self, logger: Logger, query: Callable[..., List[Dict[str, Union[int, str]]]],
+                 strategy: str = DB_CONSTANTS.STATS_ID_RANGE, ttl: float = DB_CONSTANTS.STATS_TTL, path: str = MODE_S_CONSTANTS.TABLE_STATS_DUMP):
+        self.logger: Logger = logger
+        self.query: Callable[..., List[Dict[str, Union[int, str]]]] = query
+        self.strategy: str = strategy
+        self.ttl: float = ttl
+        self.path: str = path
+
+    def collect(self, login: Dict[str, str]) -> Tuple[int, int]:
+        # Row count and latest timestamp (in Nanoseconds) of the table
+        key = self.__key(login)
+        cached = self.__loadCached(key)
+        if cached is not None:
+            self.logger.log(f"Using table statistics cached {int(time.time() - cached['time'])} s ago")
+            return cached["rowCount"], cached["lastUpdate"]
+
+        if self.strategy == DB_CONSTANTS.STATS_EXACT:
+            rowCount = self.__exactRowCount(login)
+        elif self.strategy == DB_CONSTANTS.STATS_ESTIMATE:
+            rowCount = self.__estimatedRowCount(login)
+        else:
+            rowCount = self.__idRangeRowCount(login)
+        lastUpdate = self.__lastUpdate(login)
+
+        self.__store(key, rowCount, lastUpdate)
+        return rowCount, lastUpdate
+
+    def latestId(self, login: Dict[str, str]) -> int:
+        # Never cached, one primary key lookup that moves with every insert
+        latest = self.query(f"SELECT MAX(id) AS maxId FROM {login['table_name']}", ["maxId"])
+        return int(latest[0]["maxId"]) if latest and latest[0]["maxId"] is not None else 0
+
+    def idBounds(self, login: Dict[str, str]) -> Tuple[int, int]:
+        # Never cached, the id range a resumable pull is frozen on
+        bounds = self.query(f"SELECT MIN(id) AS minId, MAX(id) AS maxId FROM {login['table_name']}", ["minId", "maxId"])
+        if not bounds or bounds[0]["maxId"] is None:
+            return 0, 0
+        return int(bounds[0]["minId"]), int(bounds[0]["maxId"])
+
+    def __exactRowCount(self, login: Dict[str, str]) -> int:
+        count = self.query(f"SELECT COUNT(*) AS rowCount FROM {login['table_name']}", ["rowCount"])
+        return int(count[0]["rowCount"]) if count and count[0]["rowCount"] else 0
+
+    def __estimatedRowCount(self, login: Dict[str, str]) -> int:
+        # InnoDB keeps an approximate row count, reading it does not touch the table
+        if (login.get("backend") or DB_CONSTANTS.BACKEND_MYSQL) == DB_CONSTANTS.BACKEND_MYSQL:
+            estimate = self.query("SELECT TABLE_ROWS AS rowCount FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s",
+                                  ["rowCount"], (login["db_name"], login["table_name"]))
+            if estimate and estimate[0]["rowCount"]:
+                return int(estimate[0]["rowCount"])
+            self.logger.warning("No row estimate in information_schema for table " + str(login["table_name"]))
+        return self.__idRangeRowCount(login)
+
+    def __idRangeRowCount(self, login: Dict[str, str]) -> int:
+        # Two primary key lookups, an upper bound of the row count when ids have gaps
+        bounds = self.query(f"SELECT MIN(id) AS minId, MAX(id) AS maxId FROM {login['table_name']}", ["minId", "maxId"])
+        if not bounds or bounds[0]["minId"] is None or bounds[0]["maxId"] is None:
+            return 0
+        return int(bounds[0]["maxId"]) - int(bounds[0]["minId"]) + 1
+
+    def __lastUpdate(self, login: Dict[str, str]) -> int:
+        latest = self.query(f"SELECT timestamp FROM {login['table_name']} ORDER BY timestamp DESC LIMIT 1", ["timestamp"])
+        if not latest or latest[0]["timestamp"] is None:
+            return 0
+        return int(latest[0]["timestamp"])
+
+    def __key(self, login: Dict[str, str]) -> str:
+        return "{}://{}:{}/{}/{}/{}".format(login.get("backend") or DB_CONSTANTS.BACKEND_MYSQL, login.get("host_name"), login.get("db_port"),
+                                            login.get("db_name"), login.get("table_name"), self.strategy)
+
+    def __loadAll(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as statsFile:
+                return json.load(statsFile)
+        except (OSError, ValueError) as esc:
+            self.logger.warning("Could not read cached table statistics :: " + str(esc))
+            return {}
+
+    def __loadCached(self, key: str) -> Union[Dict[str, Union[int, float]], None]:
+        if self.ttl <= 0:
+            return None
+        cached = self.__loadAll().get(key)
+        if cached is None or time.time() - cached["time"] > self.ttl or not cached["rowCount"]:
+            return None
+        return cached
+
+    def __store(self, key: str, rowCount: int, lastUpdate: int) -> None:
+        allStats = self.__loadAll()
+        allStats[key] = {"rowCount": rowCount, "lastUpdate": lastUpdate, "time": time.time()}
+        tempPath = self.path + ".tmp"
+        try:
+            with open(tempPath, "w") as statsFile:
+                json.dump(allStats, statsFile)
+            os.replace(tempPath, self.path)
+        except OSError as ose:
+            self.logger.warning("Could not cache table statistics :: " + str(ose))
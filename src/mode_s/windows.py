@@ -0,0 +1,54 @@
+import numpy as np
+
+from typing import List
+
+
+class SlidingWindows:
+
+    WINDOW_SECONDS: float = 60.0
+
+    def __init__(self, times: List[np.ndarray]):
+        # Window k of an address holds its points in (60(k-1), 60k] seconds after its first point, k < int(last time / 60)
+        # The windows of all addresses are laid out one after another, window k of address i has the key offsets[i] + k
+        self.numWindows: np.ndarray = np.array([int(addressTimes[-1] / self.WINDOW_SECONDS) if len(addressTimes) else 0 for addressTimes in times], dtype=np.int64)
+        self.offsets: np.ndarray = np.concatenate(([0], np.cumsum(self.numWindows))).astype(np.int64)
+        self.size: int = int(self.offsets[-1])
+
+        lengths = np.array([len(addressTimes) for addressTimes in times], dtype=np.int64)
+        segments = np.repeat(np.arange(len(times)), lengths)
+        allTimes = np.concatenate(times) if len(times) else np.zeros(0)
+
+        # Same comparisons as time > 60k on the original float boundaries
+        boundaries = self.WINDOW_SECONDS * np.arange(int(self.numWindows.max(initial=0)) + 1)
+        buckets = np.searchsorted(boundaries, allTimes, side="left")
+        self.selection: np.ndarray = buckets < self.numWindows[segments]
+        self.keys: np.ndarray = self.offsets[segments[self.selection]] + buckets[self.selection]
+        self.counts: np.ndarray = np.bincount(self.keys, minlength=self.size)
+
+    def split(self, windowValues: np.ndarray) -> List[np.ndarray]:
+        return np.split(windowValues, self.offsets[1:-1])
+
+    def stds(self, values: np.ndarray) -> np.ndarray:
+        # Population std per window, empty windows are 0 like the std of [0, 0]
+        selected = values[self.selection].astype(np.float64)
+        safeCounts = np.where(self.counts > 0, self.counts, 1)
+        means = np.bincount(self.keys, weights=selected, minlength=self.size) / safeCounts
+        squaredDeviations = np.bincount(self.keys, weights=(selected - means[self.keys])**2, minlength=self.size)
+        return np.where(self.counts > 0, np.sqrt(squaredDeviations / safeCounts), 0.0)
+
+    def thresholds(self, barStds: np.ndarray, ivvStds: np.ndarray) -> np.ndarray:
+        return SlidingWindows.segmentThresholds(self.numWindows, barStds, ivvStds)
+
+    @staticmethod
+    def segmentThresholds(numWindows: np.ndarray, barStds: np.ndarray, ivvStds: np.ndarray) -> np.ndarray:
+        # Per address mean + 1.2 sample std of the window std differences (from the paper), 0 without windows
+        # The windows of all addresses are laid out one after another, numWindows of them per address
+        numSegments = len(numWindows)
+        windowSegments = np.repeat(np.arange(numSegments), numWindows)
+        diffs = barStds - ivvStds
+        safeWindows = np.maximum(numWindows, 1)
+        means = np.bincount(windowSegments, weights=diffs, minlength=numSegments) / safeWindows
+        squaredDeviations = np.bincount(windowSegments, weights=(diffs - means[windowSegments])**2, minlength=numSegments)
+        ddofs = np.where(numWindows > 1, 1, 0)
+        stds = np.sqrt(squaredDeviations / np.maximum(numWindows - ddofs, 1))
+        return np.where(numWindows > 0, means + 1.2 * stds, 0.0)
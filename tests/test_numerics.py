@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from mode_s.windows import SlidingWindows
+from mode_s.exceedance import exceedanceHistogram, kdeDensities, kdeGrid
+from mode_s.constants import ENGINE_CONSTANTS, DATA
+
+
+def referenceWindows(times: np.ndarray, bars: np.ndarray, ivvs: np.ndarray):
+    # Per window loop of the engine before the vectorized windows
+    slidingWindows = [duration * 60 for duration in range(int(max(times) / 60))]
+    counts, barStds, ivvStds = [], [], []
+    actualIndex = 0
+    for window in slidingWindows:
+        windowBars, windowIvvs = [], []
+        for dataIndex in range(actualIndex, len(times)):
+            if times[dataIndex] > window:
+                actualIndex = dataIndex
+                break
+            windowBars.append(bars[dataIndex])
+            windowIvvs.append(ivvs[dataIndex])
+        counts.append(len(windowBars))
+        if not windowBars:
+            windowBars, windowIvvs = [0, 0], [0, 0]
+        barStds.append(np.std(np.array(windowBars, dtype="float64")))
+        ivvStds.append(np.std(np.array(windowIvvs, dtype="float64")))
+
+    diffStds = np.array(barStds or [0, 0], dtype="float64") - np.array(ivvStds or [0, 0], dtype="float64")
+    threshold = np.average(diffStds) + 1.2 * np.std(diffStds, ddof=1 if len(diffStds) > 1 else 0)
+    return counts, barStds, ivvStds, float(threshold)
+
+
+def randomTracks(seed: int, numTracks: int):
+    rng = np.random.default_rng(seed)
+    tracks = []
+    for _ in range(numTracks):
+        length = int(rng.integers(1, 400))
+        gaps = rng.exponential(rng.choice([1.0, 5.0, 40.0]), length)
+        gaps[0] = 0
+        times = np.cumsum(gaps)
+        # Points right on the window boundaries belong to the earlier window
+        onBoundary = rng.random(length) < 0.05
+        times[onBoundary] = np.round(times[onBoundary] / 60) * 60
+        times = np.sort(times)
+        tracks.append((times, rng.normal(0, 300, length), rng.normal(0, 50, length)))
+    return tracks
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def testSlidingWindowsMatchPerWindowLoop(seed):
+    tracks = randomTracks(seed, 60)
+    windows = SlidingWindows([times for times, _, _ in tracks])
+    bars = np.concatenate([bars for _, bars, _ in tracks])
+    ivvs = np.concatenate([ivvs for _, _, ivvs in tracks])
+    barStds = windows.stds(bars)
+    ivvStds = windows.stds(ivvs)
+    thresholds = windows.thresholds(barStds, ivvStds)
+
+    for index, (counts, trackBarStds, trackIvvStds) in enumerate(zip(windows.split(windows.counts), windows.split(barStds), windows.split(ivvStds))):
+        referenceCounts, referenceBarStds, referenceIvvStds, referenceThreshold = referenceWindows(*tracks[index])
+        assert counts.tolist() == referenceCounts
+        np.testing.assert_allclose(trackBarStds, referenceBarStds, rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(trackIvvStds, referenceIvvStds, rtol=1e-9, atol=1e-9)
+        assert thresholds[index] == pytest.approx(referenceThreshold, rel=1e-9, abs=1e-9)
+
+
+def referenceHistogram(diffs: np.ndarray, threshold: float):
+    # Bucket search per exceed of the engine before the closed form KDE
+    distribution = [0] * len(ENGINE_CONSTANTS.EXCEEDANCE_BUCKETS)
+    exceeds = [100*(diff - threshold)/(1 if threshold == 0 else threshold) for diff in diffs if diff >= threshold]
+    for exceedingPercentage in exceeds:
+        bucket = next((dist for dist in ENGINE_CONSTANTS.EXCEEDANCE_BUCKETS if dist <= exceedingPercentage < dist + 10), 100)
+        distribution[bucket // 10] += 1
+    return distribution
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def testExceedanceHistogramMatchesBucketSearch(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(100):
+        threshold = float(rng.choice([0.0, rng.normal(0, 50), rng.uniform(1, 80)]))
+        diffs = np.append(rng.normal(threshold, 60, rng.integers(1, 200)), threshold)
+        assert exceedanceHistogram(diffs, threshold).tolist() == referenceHistogram(diffs.tolist(), threshold)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def testKdeDensitiesMatchKernelDensity(seed):
+    KernelDensity = pytest.importorskip("sklearn.neighbors").KernelDensity
+    rng = np.random.default_rng(seed)
+    grid = kdeGrid().reshape(-1, 1)
+    for _ in range(30):
+        threshold = float(rng.uniform(1, 80))
+        diffs = rng.normal(threshold, 60, rng.integers(1, 200))
+        bandwidth = float(rng.choice([0.2, 0.5, 1.0, 3.0]))
+        histogram = exceedanceHistogram(diffs, threshold)
+        if not histogram.any():
+            continue
+        exceeds = np.repeat(np.array(ENGINE_CONSTANTS.EXCEEDANCE_BUCKETS, dtype=np.float64) / ENGINE_CONSTANTS.EXCEEDANCE_SIZE_RATIO, histogram)
+        reference = np.exp(KernelDensity(kernel="gaussian", bandwidth=bandwidth).fit(exceeds.reshape(-1, 1)).score_samples(grid))
+        np.testing.assert_allclose(kdeDensities([histogram], bandwidth)[0], reference, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("median", [1, 3, 9, 51])
+def testBatchedMedianMatchesMedfilt(median):
+    medfilt = pytest.importorskip("scipy.signal").medfilt
+    pytest.importorskip("PySide2")
+    from mode_s.engine import Engine
+    from mode_s.logger import Logger
+
+    rng = np.random.default_rng(median)
+    data = []
+    for address, length in enumerate(rng.integers(1, 400, 100).tolist() + [0]):
+        times = np.arange(length, dtype=np.float64)
+        bars = rng.integers(-500, 500, length).astype(np.float64)
+        ivvs = rng.normal(0, 50, length)
+        data.append({"address": address, "points": [DATA(*point) for point in zip(times.tolist(), bars.tolist(), ivvs.tolist())],
+                     "times": times, "bars": bars, "ivvs": ivvs})
+
+    engine = Engine(Logger(False, False, False))
+    engine.setEngineParameters(median=median)
+    engine.prepareMedianFilter(data)
+
+    for addressData in data:
+        length = len(addressData["points"])
+        if not length:
+            continue
+        # A track shorter than the kernel is filtered with its longest odd length
+        kernel = min(median, length if length % 2 else length - 1)
+        np.testing.assert_array_equal(addressData["filteredBars"], medfilt(addressData["bars"], kernel))
+        np.testing.assert_array_equal(addressData["filteredIvvs"], medfilt(addressData["ivvs"], kernel))